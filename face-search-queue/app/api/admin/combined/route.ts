@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
-import redis from '@/lib/redis';
+import { fetchWorkers } from '@/lib/workers';
 
 export const dynamic = 'force-dynamic';
 
@@ -26,11 +26,11 @@ export async function GET(request: NextRequest) {
 }
 
 async function fetchQueueStats(includeJobs: boolean) {
-  const { faceSearchQueue } = await import('@/lib/queue');
+  const { faceSearchQueue, getQueuedCount, getQueuedJobs } = await import('@/lib/queue');
   
   // Always fetch counts
   const counts = await Promise.all([
-    faceSearchQueue.getWaitingCount(),
+    getQueuedCount(),
     faceSearchQueue.getActiveCount(),
     faceSearchQueue.getCompletedCount(),
     faceSearchQueue.getFailedCount(),
@@ -49,7 +49,7 @@ async function fetchQueueStats(includeJobs: boolean) {
       failedJobs,
       delayedJobs,
     ] = await Promise.all([
-      faceSearchQueue.getWaiting(0, limit),
+      getQueuedJobs(0, limit),
       faceSearchQueue.getActive(0, limit),
       faceSearchQueue.getCompleted(0, limit),
       faceSearchQueue.getFailed(0, limit),
@@ -89,33 +89,3 @@ async function fetchQueueStats(includeJobs: boolean) {
     jobs,
   };
 }
-
-async function fetchWorkers() {
-  const workersData = await redis.hgetall('workers');
-  const workerIds = Object.keys(workersData);
-  
-  // Batch get all pause statuses
-  const pipeline = redis.pipeline();
-  workerIds.forEach(id => pipeline.get(`worker:${id}:paused`));
-  const pauseResults = await pipeline.exec();
-  
-  const now = Date.now() / 1000;
-  const workers = workerIds.map((id, index) => {
-    const worker = JSON.parse(workersData[id]);
-    const isOnline = (now - worker.last_heartbeat) < 15;
-    const isPaused = pauseResults?.[index]?.[1] === '1';
-    
-    return {
-      ...worker,
-      status: isOnline ? 'online' : 'offline',
-      paused: isPaused,
-    };
-  });
-  
-  workers.sort((a, b) => {
-    if (a.status === b.status) return a.id.localeCompare(b.id);
-    return a.status === 'online' ? -1 : 1;
-  });
-  
-  return workers;
-}
@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { faceSearchQueue } from '@/lib/queue';
+import { faceSearchQueue, getQueuedCount, getQueuedJobs } from '@/lib/queue';
 
 // Get queue stats and job lists
 export async function GET(request: NextRequest) {
@@ -10,7 +10,7 @@ export async function GET(request: NextRequest) {
     
     // Always fetch counts
     const counts = await Promise.all([
-      faceSearchQueue.getWaitingCount(),
+      getQueuedCount(),
       faceSearchQueue.getActiveCount(),
       faceSearchQueue.getCompletedCount(),
       faceSearchQueue.getFailedCount(),
@@ -29,7 +29,7 @@ export async function GET(request: NextRequest) {
         failedJobs,
         delayedJobs,
       ] = await Promise.all([
-        faceSearchQueue.getWaiting(0, limit),
+        getQueuedJobs(0, limit),
         faceSearchQueue.getActive(0, limit),
         faceSearchQueue.getCompleted(0, limit),
         faceSearchQueue.getFailed(0, limit),
@@ -1,6 +1,6 @@
 import { NextResponse } from 'next/server';
-import { faceSearchQueue } from '@/lib/queue';
-import redis from '@/lib/redis';
+import { faceSearchQueue, getQueuedCount } from '@/lib/queue';
+import { fetchWorkers } from '@/lib/workers';
 
 export const dynamic = 'force-dynamic';
 
@@ -14,24 +14,17 @@ export async function GET() {
       failedCount,
       delayedCount,
       isPaused,
-      workersData,
+      workers,
     ] = await Promise.all([
-      faceSearchQueue.getWaitingCount(),
+      getQueuedCount(),
       faceSearchQueue.getActiveCount(),
       faceSearchQueue.getCompletedCount(),
       faceSearchQueue.getFailedCount(),
       faceSearchQueue.getDelayedCount(),
       faceSearchQueue.isPaused(),
-      redis.hgetall('workers'),
+      fetchWorkers(),
     ]);
     
-    const workers = Object.entries(workersData).map(([id, data]) => {
-      const worker = JSON.parse(data);
-      const now = Date.now() / 1000;
-      const isOnline = (now - worker.last_heartbeat) < 15;
-      return { ...worker, status: isOnline ? 'online' : 'offline' };
-    });
-    
     return NextResponse.json({
       stats: {
         waiting: waitingCount,
@@ -1,23 +1,23 @@
 import { NextResponse } from 'next/server';
 import redis from '@/lib/redis';
+import { fetchWorkers, HEARTBEAT_KEY, PAUSED_KEY } from '@/lib/workers';
 
 // Clean up stale worker data and counters
 export async function POST() {
   try {
     // Get all workers
-    const workersData = await redis.hgetall('workers');
+    const workers = await fetchWorkers();
     const now = Date.now() / 1000;
     
     let cleaned = 0;
     
-    // Remove offline workers (no heartbeat for 60+ seconds)
-    for (const [workerId, data] of Object.entries(workersData)) {
-      const worker = JSON.parse(data);
+    // Remove offline workers (heartbeat key expired, registration not refreshed for 60+ seconds)
+    for (const worker of workers) {
       const timeSinceHeartbeat = now - worker.last_heartbeat;
       
-      if (timeSinceHeartbeat > 60) {
-        await redis.hdel('workers', workerId);
-        await redis.del(`worker:${workerId}:paused`);
+      if (worker.status === 'offline' && timeSinceHeartbeat > 60) {
+        await redis.hdel('workers', worker.id);
+        await redis.del(PAUSED_KEY(worker.id), HEARTBEAT_KEY(worker.id));
         cleaned++;
       }
     }
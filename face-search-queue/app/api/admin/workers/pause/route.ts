@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
-import redis from '@/lib/redis';
+import { setWorkerPaused } from '@/lib/workers';
 
 export async function POST(request: NextRequest) {
   try {
@@ -12,8 +12,8 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Set pause flag in Redis
-    await redis.set(`worker:${workerId}:paused`, '1');
+    // Persist the flag and notify the worker over pub/sub
+    await setWorkerPaused(workerId, true);
 
     return NextResponse.json({ success: true, workerId, paused: true });
   } catch (error) {
@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
-import redis from '@/lib/redis';
+import { setWorkerPaused } from '@/lib/workers';
 
 export async function POST(request: NextRequest) {
   try {
@@ -12,8 +12,8 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Remove pause flag from Redis
-    await redis.del(`worker:${workerId}:paused`);
+    // Persist the flag and notify the worker over pub/sub
+    await setWorkerPaused(workerId, false);
 
     return NextResponse.json({ success: true, workerId, paused: false });
   } catch (error) {
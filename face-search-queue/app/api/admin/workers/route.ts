@@ -1,12 +1,13 @@
 import { NextResponse } from 'next/server';
 import redis from '@/lib/redis';
+import { fetchWorkers, HEARTBEAT_KEY } from '@/lib/workers';
 
 export const dynamic = 'force-dynamic';
 
 interface WorkerInfo {
   id: string;
   hostname: string;
-  status: 'online' | 'offline';
+  status: 'online' | 'warming' | 'draining' | 'offline';
   gpu_index?: number;
   gpu_name: string;
   use_cpu: boolean;
@@ -23,36 +24,14 @@ interface WorkerInfo {
   gpu_utilization?: number;
   gpu_memory_used_mb?: number;
   gpu_temperature?: number;
+  phase_latency?: Record<string, { count: number; p50_ms: number; p95_ms: number; p99_ms: number }>;
+  last_job_phases?: Record<string, number>;
 }
 
 export async function GET() {
   try {
-    const workersData = await redis.hgetall('workers');
-    const workerIds = Object.keys(workersData);
-    
-    // Batch get all pause statuses in one pipeline
-    const pipeline = redis.pipeline();
-    workerIds.forEach(id => pipeline.get(`worker:${id}:paused`));
-    const pauseResults = await pipeline.exec();
-    
-    const now = Date.now() / 1000; // Convert to seconds
-    const workers: WorkerInfo[] = workerIds.map((id, index) => {
-      const worker = JSON.parse(workersData[id]);
-      const isOnline = (now - worker.last_heartbeat) < 15; // 15 seconds timeout
-      const isPaused = pauseResults?.[index]?.[1] === '1';
-      
-      return {
-        ...worker,
-        status: isOnline ? 'online' : 'offline',
-        paused: isPaused,
-      };
-    });
-    
-    // Sort by status (online first) then by ID
-    workers.sort((a, b) => {
-      if (a.status === b.status) return a.id.localeCompare(b.id);
-      return a.status === 'online' ? -1 : 1;
-    });
+    // Registration hash merged with per-worker heartbeat and pause keys
+    const workers = (await fetchWorkers()) as unknown as WorkerInfo[];
     
     return NextResponse.json({ workers });
   } catch (error) {
@@ -72,6 +51,7 @@ export async function DELETE(request: Request) {
     }
     
     await redis.hdel('workers', workerId);
+    await redis.del(HEARTBEAT_KEY(workerId));
     return NextResponse.json({ success: true, message: 'Worker removed' });
   } catch (error) {
     console.error('Error removing worker:', error);
@@ -2,10 +2,13 @@ import { NextRequest, NextResponse } from 'next/server';
 import { createJob, checkRateLimit, checkExistingJob } from '@/lib/queue';
 import type { FaceSearchJobData } from '@/lib/queue';
 
+// Upper bound on stages searched by one job
+const MAX_STAGES = 20;
+
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
-    const { image, uid, stage } = body;
+    const { image, uid, stage, stages, stagePrefix, previousJobId } = body;
 
     // Validation
     if (!image || typeof image !== 'string') {
@@ -22,9 +25,33 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    if (!stage || typeof stage !== 'string') {
+    if (stages !== undefined && (
+      !Array.isArray(stages) || stages.length === 0 || stages.length > MAX_STAGES ||
+      !stages.every((s: unknown) => typeof s === 'string' && s.length > 0)
+    )) {
+      return NextResponse.json(
+        { error: 'Invalid request', message: `Stages must be a list of 1-${MAX_STAGES} stage names` },
+        { status: 400 }
+      );
+    }
+
+    if (stagePrefix !== undefined && (!stagePrefix || typeof stagePrefix !== 'string')) {
+      return NextResponse.json(
+        { error: 'Invalid request', message: 'Stage prefix must be a non-empty string' },
+        { status: 400 }
+      );
+    }
+
+    if (previousJobId !== undefined && (!previousJobId || typeof previousJobId !== 'string')) {
+      return NextResponse.json(
+        { error: 'Invalid request', message: 'Previous job ID must be a non-empty string' },
+        { status: 400 }
+      );
+    }
+
+    if ((!stage || typeof stage !== 'string') && !stages && !stagePrefix) {
       return NextResponse.json(
-        { error: 'Invalid request', message: 'Stage is required' },
+        { error: 'Invalid request', message: 'Stage, stages or stagePrefix is required' },
         { status: 400 }
       );
     }
@@ -69,7 +96,10 @@ export async function POST(request: NextRequest) {
     const jobData: FaceSearchJobData = {
       image,
       uid,
-      stage,
+      stage: typeof stage === 'string' && stage ? stage : stages ? stages.join(', ') : `${stagePrefix}*`,
+      ...(stages && { stages }),
+      ...(stagePrefix && { stagePrefix }),
+      ...(previousJobId && { previousJobId }),
       timestamp,
     };
 
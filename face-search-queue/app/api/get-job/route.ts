@@ -1,5 +1,5 @@
 import { NextRequest } from 'next/server';
-import { faceSearchQueue, queueEvents, clearActiveJob } from '@/lib/queue';
+import { faceSearchQueue, queueEvents, clearActiveJob, getQueuedCount, getQueuePosition } from '@/lib/queue';
 import type { JobStatus, JobResult, JobError } from '@/lib/types';
 
 /*
@@ -163,7 +163,7 @@ const startBroadcaster = async (jobId: string, resLimit: number) => {
   const pollStatus = async () => {
     try {
       // Fetch lightweight job state and position
-      const waitingCount = await faceSearchQueue.getWaitingCount();
+      const waitingCount = await getQueuedCount();
       const job = await faceSearchQueue.getJob(jobId);
       if (!job) {
         // If job missing (deleted), end broadcaster with an error event
@@ -178,10 +178,9 @@ const startBroadcaster = async (jobId: string, resLimit: number) => {
       }
 
       const currentState = await job.getState();
-      const waitingJobs = await faceSearchQueue.getWaiting();
-      const position = waitingJobs.findIndex((j) => j.id === jobId);
+      const position = await getQueuePosition(jobId);
       const status: JobStatus = {
-        position: position >= 0 ? position + 1 : 1,
+        position: position ?? 1,
         total_size: waitingCount + 1,
         start_time: job.timestamp,
         stage: job.data?.stage ?? 'search',
@@ -311,13 +310,12 @@ const addSubscriber = async (jobId: string, sub: Subscriber, resLimit: number) =
   // For simplicity, let the broadcaster's immediate poll fire and send the new subscriber a status via broadcastToSubscribers
   // However, to ensure immediate response, let's trigger a quick poll for the job (not expensive if only once)
   try {
-    const waitingCount = await faceSearchQueue.getWaitingCount();
+    const waitingCount = await getQueuedCount();
     const job = await faceSearchQueue.getJob(jobId);
     if (job) {
-      const waitingJobs = await faceSearchQueue.getWaiting();
-      const position = waitingJobs.findIndex((j) => j.id === jobId);
+      const position = await getQueuePosition(jobId);
       const status: JobStatus = {
-        position: position >= 0 ? position + 1 : 1,
+        position: position ?? 1,
         total_size: waitingCount + 1,
         start_time: job.timestamp,
         stage: job.data?.stage ?? 'search',
@@ -35,7 +35,7 @@ interface Job {
 interface WorkerInfo {
   id: string;
   hostname: string;
-  status: 'online' | 'offline';
+  status: 'online' | 'warming' | 'draining' | 'offline';
   gpu_index?: number;
   gpu_name: string;
   use_cpu: boolean;
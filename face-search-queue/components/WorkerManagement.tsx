@@ -5,7 +5,7 @@ import { useEffect, useState } from 'react';
 interface WorkerInfo {
   id: string;
   hostname: string;
-  status: 'online' | 'offline';
+  status: 'online' | 'warming' | 'draining' | 'offline';
   gpu_index?: number;
   gpu_name: string;
   use_cpu: boolean;
@@ -76,6 +76,8 @@ export default function WorkerManagement({ workers, onRemoveWorker }: WorkerMana
   };
 
   const onlineWorkers = workers.filter(w => w.status === 'online');
+  const warmingWorkers = workers.filter(w => w.status === 'warming');
+  const drainingWorkers = workers.filter(w => w.status === 'draining');
   const offlineWorkers = workers.filter(w => w.status === 'offline');
 
   const formatUptime = (seconds: number) => {
@@ -144,6 +146,16 @@ export default function WorkerManagement({ workers, onRemoveWorker }: WorkerMana
           <div className="px-4 py-2 bg-emerald-500/20 border border-emerald-400/70 text-emerald-300 rounded-lg text-xs font-bold uppercase tracking-wider shadow-lg shadow-emerald-500/20">
             ● {onlineWorkers.length} Online
           </div>
+          {warmingWorkers.length > 0 && (
+            <div className="px-4 py-2 bg-amber-500/20 border border-amber-400/70 text-amber-300 rounded-lg text-xs font-bold uppercase tracking-wider shadow-lg shadow-amber-500/20">
+              ◐ {warmingWorkers.length} Warming
+            </div>
+          )}
+          {drainingWorkers.length > 0 && (
+            <div className="px-4 py-2 bg-orange-500/20 border border-orange-400/70 text-orange-300 rounded-lg text-xs font-bold uppercase tracking-wider shadow-lg shadow-orange-500/20">
+              ◑ {drainingWorkers.length} Draining
+            </div>
+          )}
           {offlineWorkers.length > 0 && (
             <div className="px-4 py-2 bg-slate-600/30 border border-slate-500/70 text-slate-300 rounded-lg text-xs font-bold uppercase tracking-wider shadow-lg shadow-slate-500/10">
               ○ {offlineWorkers.length} Offline
@@ -158,14 +170,18 @@ export default function WorkerManagement({ workers, onRemoveWorker }: WorkerMana
             key={worker.id}
             className={`glass rounded-xl border p-5 transition-all transform hover:scale-105 ${worker.status === 'online'
               ? 'border-emerald-500/50 hover:border-emerald-500 hover:shadow-lg hover:shadow-emerald-500/20 bg-emerald-950/20'
-              : 'border-slate-500/30 opacity-60 hover:opacity-80 bg-slate-950/20'
+              : worker.status === 'warming'
+                ? 'border-amber-500/50 hover:border-amber-500 hover:shadow-lg hover:shadow-amber-500/20 bg-amber-950/20'
+                : worker.status === 'draining'
+                  ? 'border-orange-500/50 hover:border-orange-500 hover:shadow-lg hover:shadow-orange-500/20 bg-orange-950/20'
+                  : 'border-slate-500/30 opacity-60 hover:opacity-80 bg-slate-950/20'
               }`}
           >
             {/* Header */}
             <div className="flex items-start justify-between mb-4">
               <div className="flex-1 min-w-0">
                 <div className="flex items-center gap-2 mb-2">
-                  <div className={`w-3 h-3 rounded-full ${worker.status === 'online' ? 'bg-emerald-500 animate-pulse shadow-lg shadow-emerald-500/50' : 'bg-slate-500'}`}></div>
+                  <div className={`w-3 h-3 rounded-full ${worker.status === 'online' ? 'bg-emerald-500 animate-pulse shadow-lg shadow-emerald-500/50' : worker.status === 'warming' ? 'bg-amber-500 animate-pulse shadow-lg shadow-amber-500/50' : worker.status === 'draining' ? 'bg-orange-500 animate-pulse shadow-lg shadow-orange-500/50' : 'bg-slate-500'}`}></div>
                   <div className="text-sm font-bold text-white truncate">{worker.hostname}</div>
                 </div>
                 <div className="text-[11px] text-blue-300/60 font-mono truncate" title={worker.id}>
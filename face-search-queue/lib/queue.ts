@@ -1,10 +1,15 @@
 import { Queue, QueueEvents } from 'bullmq';
 import redis from './redis';
+import { COST_PRIORITY_ENABLED, costToPriority, estimateJobCostMs, priorityEpoch } from './stageCosts';
 
 export interface FaceSearchJobData {
   image: string;
   uid: string;
-  stage: string;
+  stage: string;          // Display label (the single stage, or a summary of stages/stagePrefix)
+  stages?: string[];      // Search several stages with one selfie encoding
+  stagePrefix?: string;   // Search every stage directory matching this prefix (e.g. "Day 1/Session 2/")
+  expectedCostMs?: number | null;  // Cost estimate used for the job's priority (COST_PRIORITY=1)
+  previousJobId?: string; // Earlier job with the same selfie: only photos added since it are scored
   timestamp: number;
 }
 
@@ -67,9 +72,46 @@ export async function checkExistingJob(uid: string): Promise<{ hasJob: boolean;
   return { hasJob: false };
 }
 
+// Jobs not yet picked up by a worker. Prioritized jobs live in their own set in BullMQ
+// and are only taken once the plain wait list is empty.
+const QUEUED_STATES = ['waiting', 'prioritized'] as const;
+
+export async function getQueuedCount(): Promise<number> {
+  return faceSearchQueue.getJobCountByTypes(...QUEUED_STATES);
+}
+
+export async function getQueuedJobs(start = 0, end = -1) {
+  return faceSearchQueue.getJobs([...QUEUED_STATES], start, end);
+}
+
+// 1-based position in processing order (wait list oldest first, then by priority), or null
+export async function getQueuePosition(jobId: string): Promise<number | null> {
+  const [waiting, prioritized] = await Promise.all([
+    faceSearchQueue.getRanges(['wait'], 0, -1, true),
+    faceSearchQueue.getRanges(['prioritized'], 0, -1, true),
+  ]);
+  const index = [...waiting, ...prioritized].indexOf(jobId);
+  return index >= 0 ? index + 1 : null;
+}
+
 export async function createJob(data: FaceSearchJobData) {
+  // Shortest-expected-job-first: cheaper (cached, smaller) stages get a better priority,
+  // later arrivals a worse one (aging)
+  let priority: number | undefined;
+  if (COST_PRIORITY_ENABLED) {
+    const stages = data.stages ?? (data.stagePrefix ? [] : [data.stage]);
+    const now = Date.now();
+    const [expectedCostMs, prioritized] = await Promise.all([
+      estimateJobCostMs(stages),
+      faceSearchQueue.getJobCountByTypes('prioritized'),
+    ]);
+    data.expectedCostMs = expectedCostMs;
+    priority = costToPriority(expectedCostMs, now - (await priorityEpoch(prioritized, now)));
+  }
+
   const job = await faceSearchQueue.add('process-face', data, {
     jobId: `job_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
+    ...(priority !== undefined && { priority }),
   });
   
   // Set rate limit
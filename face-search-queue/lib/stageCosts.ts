@@ -0,0 +1,78 @@
+import redis from './redis';
+
+// Written by workers (face-search-worker/core/stage_costs.py)
+export const STAGE_COSTS_KEY = 'stage_costs';
+export const STAGE_AFFINITY_KEY = (stage: string) => `stage_affinity:${stage}`;
+
+// Arrival time the priorities of all queued prioritized jobs are measured from
+export const PRIORITY_EPOCH_KEY = 'stage_costs:priority_epoch';
+
+export interface StageCost {
+  photos: number;
+  coverage: number;          // Cache coverage of the latest run (0-1)
+  cold_ms: number | null;    // Expected duration when no worker has the stage cached
+  warm_ms: number | null;    // Expected duration on a worker with the stage cached
+  overhead_ms: number;
+  jobs: number;
+  updated_at: number;
+}
+
+// Shortest-expected-job-first ordering is opt-in
+export const COST_PRIORITY_ENABLED = process.env.COST_PRIORITY === '1';
+
+// Cost assumed for stages with no estimate yet (and prefix jobs)
+const DEFAULT_COST_MS = parseInt(process.env.COST_PRIORITY_DEFAULT_MS || '60000');
+
+// Milliseconds of expected cost one millisecond of earlier arrival is worth. A job is only
+// overtaken by jobs arriving within (its cost - their cost) / aging of it; 0 = pure SJF
+const AGING = parseFloat(process.env.COST_PRIORITY_AGING || '1');
+
+// BullMQ accepts priorities 1 (highest) .. 2^21
+const MAX_PRIORITY = 2 ** 21;
+
+/**
+ * Expected duration of a job over `stages`, using the warm estimate when some
+ * worker advertises the stage as cached. Returns null if any stage is unknown.
+ */
+export async function estimateJobCostMs(stages: string[]): Promise<number | null> {
+  if (stages.length === 0) return null;
+
+  const pipeline = redis.pipeline();
+  pipeline.hmget(STAGE_COSTS_KEY, ...stages);
+  stages.forEach((stage) => pipeline.zcard(STAGE_AFFINITY_KEY(stage)));
+  const results = (await pipeline.exec()) ?? [];
+
+  const costs = (results[0]?.[1] as (string | null)[]) ?? [];
+  let total = 0;
+  for (let i = 0; i < stages.length; i++) {
+    if (!costs[i]) return null;
+    const cost: StageCost = JSON.parse(costs[i] as string);
+    const warm = ((results[i + 1]?.[1] as number) ?? 0) > 0;
+    const expected = warm ? cost.warm_ms ?? cost.cold_ms : cost.cold_ms ?? cost.warm_ms;
+    if (expected == null) return null;
+    total += expected;
+  }
+  return total;
+}
+
+/**
+ * Epoch for a job arriving at `now`. Reset whenever no prioritized job is queued, so every
+ * queued job shares it and priorities stay far below MAX_PRIORITY.
+ */
+export async function priorityEpoch(prioritizedCount: number, now: number): Promise<number> {
+  if (prioritizedCount > 0) {
+    const epoch = await redis.get(PRIORITY_EPOCH_KEY);
+    if (epoch) return parseInt(epoch);
+  }
+  await redis.set(PRIORITY_EPOCH_KEY, now.toString());
+  return now;
+}
+
+/**
+ * Map an expected duration to a BullMQ priority (100ms resolution, cheaper = sooner), aged by
+ * the job's arrival time since the epoch so an expensive job is never pushed back indefinitely
+ */
+export function costToPriority(costMs: number | null, arrivalMs = 0): number {
+  const ms = (costMs ?? DEFAULT_COST_MS) + AGING * Math.max(0, arrivalMs);
+  return Math.min(MAX_PRIORITY, Math.max(1, Math.ceil(ms / 100)));
+}
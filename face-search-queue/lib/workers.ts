@@ -0,0 +1,75 @@
+import redis from './redis';
+
+/*
+  Worker registry layout (written by face-search-worker):
+    workers                   hash  workerId -> static registration JSON (rarely rewritten);
+                                    its status is 'warming' until the engine is loaded and warmed up,
+                                    and 'draining' while it finishes its jobs on shutdown
+    worker:{id}:heartbeat     key   dynamic metrics JSON, expires 15s after the last heartbeat
+    worker:{id}:paused        key   '1' while the worker is paused
+    worker:{id}:control       pub/sub channel; 'pause' / 'resume' take effect immediately
+*/
+
+export const HEARTBEAT_KEY = (workerId: string) => `worker:${workerId}:heartbeat`;
+export const PAUSED_KEY = (workerId: string) => `worker:${workerId}:paused`;
+export const CONTROL_CHANNEL = (workerId: string) => `worker:${workerId}:control`;
+
+/** Persist the pause flag and notify the worker, which stops (or resumes) fetching jobs */
+export async function setWorkerPaused(workerId: string, paused: boolean): Promise<void> {
+  const pipeline = redis.multi();
+  if (paused) {
+    pipeline.set(PAUSED_KEY(workerId), '1');
+  } else {
+    pipeline.del(PAUSED_KEY(workerId));
+  }
+  pipeline.publish(CONTROL_CHANNEL(workerId), paused ? 'pause' : 'resume');
+  await pipeline.exec();
+}
+
+export interface WorkerRecord {
+  id: string;
+  status: 'online' | 'warming' | 'draining' | 'offline';
+  paused: boolean;
+  last_heartbeat: number;
+  [key: string]: any;
+}
+
+/**
+ * Fetch all registered workers merged with their heartbeat and pause state (one HGETALL + one pipeline)
+ */
+export async function fetchWorkers(): Promise<WorkerRecord[]> {
+  const workersData = await redis.hgetall('workers');
+  const workerIds = Object.keys(workersData);
+
+  const pipeline = redis.pipeline();
+  workerIds.forEach((id) => {
+    pipeline.get(HEARTBEAT_KEY(id));
+    pipeline.get(PAUSED_KEY(id));
+  });
+  const results = (await pipeline.exec()) ?? [];
+
+  const workers: WorkerRecord[] = workerIds.map((id, index) => {
+    const registration = JSON.parse(workersData[id]);
+    const heartbeat = results[index * 2]?.[1] as string | null;
+    const paused = results[index * 2 + 1]?.[1] === '1';
+
+    return {
+      ...registration,
+      ...(heartbeat ? JSON.parse(heartbeat) : {}),
+      // Heartbeat key expires automatically, so its presence means online (or warming up / draining)
+      status: heartbeat
+        ? (registration.status === 'warming' || registration.status === 'draining' ? registration.status : 'online')
+        : 'offline',
+      paused,
+    };
+  });
+
+  // Sort by status (online, warming, draining, offline) then by ID
+  const statusOrder = { online: 0, warming: 1, draining: 2, offline: 3 };
+  workers.sort((a, b) => {
+    if (a.status === b.status) return a.id.localeCompare(b.id);
+    return statusOrder[a.status] - statusOrder[b.status];
+  });
+
+  return workers;
+}
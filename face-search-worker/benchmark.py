@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Engine-agnostic micro-benchmarks for BaseEngine orchestration
+Uses the stub engine so chunking, thread pool, caching and sorting overhead
+can be measured without dlib or TensorFlow installed
+"""
+
+import os
+import sys
+import io
+import time
+import base64
+import logging
+import argparse
+
+import numpy as np
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.dirname(__file__))
+
+from engines.stub.engine import StubEngine
+
+EXCLUDE_FACES_DIR = os.path.join(os.path.dirname(__file__), 'exclude_faces')
+
+
+# ============================================================
+# Helper Functions
+# ============================================================
+def make_selfie_base64(size: int = 64, seed: int = 0) -> str:
+    """Generate a deterministic noise image as a base64 data URL"""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def make_gallery(count: int, photos_per_stage: int = 500) -> list:
+    """Build synthetic gallery entries shaped like the ones process_job builds"""
+    return [
+        {
+            'id': f"Stage {i // photos_per_stage}/IMG_{i:06d}.jpg",
+            'image': f"/synthetic/Stage {i // photos_per_stage}/IMG_{i:06d}.jpg"
+        }
+        for i in range(count)
+    ]
+
+
+def list_exclude_images() -> list:
+    if not os.path.exists(EXCLUDE_FACES_DIR):
+        return []
+    return [
+        os.path.join(EXCLUDE_FACES_DIR, f) for f in sorted(os.listdir(EXCLUDE_FACES_DIR))
+        if f.lower().endswith(('.png', '.jpg', '.jpeg'))
+    ]
+
+
+def time_search(engine, selfie: str, gallery: list, exclude_images: list):
+    start = time.perf_counter()
+    results = engine.search_faces(
+        selfie=selfie,
+        gallery_images=gallery,
+        exclude_images=exclude_images
+    )
+    return time.perf_counter() - start, results
+
+
+# ============================================================
+# Benchmarks
+# ============================================================
+def run_scale(scale: int, args, selfie: str, exclude_images: list) -> dict:
+    engine = StubEngine(
+        max_workers=args.workers,
+        embedding_dim=args.dim,
+        encode_delay=args.encode_delay
+    )
+    # Warm runs measure the gallery pass, not the repeated-search result cache
+    engine.result_cache = None
+    gallery = make_gallery(scale)
+
+    cold_time, results = time_search(engine, selfie, gallery, exclude_images)
+    assert len(results) == scale, f"Expected {scale} results, got {len(results)}"
+
+    warm_times = []
+    for _ in range(args.repeat):
+        elapsed, _ = time_search(engine, selfie, gallery, exclude_images)
+        warm_times.append(elapsed)
+
+    return {
+        'scale': scale,
+        'cold': cold_time,
+        'warm': min(warm_times) if warm_times else float('nan'),
+    }
+
+
+def print_report(rows: list):
+    print("\n" + "=" * 60)
+    print("BaseEngine Orchestration Benchmark (stub engine)")
+    print("=" * 60)
+    print(f"{'photos':>8} | {'cold (s)':>9} | {'warm (s)':>9} | {'warm img/s':>11} | {'warm µs/img':>11}")
+    print("-" * 60)
+    for row in rows:
+        per_image = row['warm'] / row['scale']
+        print(
+            f"{row['scale']:>8} | {row['cold']:>9.3f} | {row['warm']:>9.3f} | "
+            f"{1 / per_image:>11.0f} | {per_image * 1e6:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BaseEngine micro-benchmarks with a stub engine')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Gallery sizes to benchmark')
+    parser.add_argument('--workers', type=int, default=8, help='Engine thread pool size')
+    parser.add_argument('--dim', type=int, default=128, help='Synthetic embedding dimension')
+    parser.add_argument('--repeat', type=int, default=3, help='Warm (cached) runs per scale')
+    parser.add_argument('--encode-delay', type=float, default=0.0,
+                        help='Simulated model seconds per uncached gallery image')
+    parser.add_argument('--no-exclude', action='store_true', help='Skip exclude_faces loading')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname).1s-%(asctime)s: %(message)s', datefmt='%H:%M:%S')
+
+    selfie = make_selfie_base64()
+    exclude_images = [] if args.no_exclude else list_exclude_images()
+
+    rows = []
+    for scale in args.scales:
+        print(f"⏱️  Benchmarking {scale} photos...")
+        rows.append(run_scale(scale, args, selfie, exclude_images))
+
+    print_report(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Shared embedding cache compaction
+Lists cached embedding versions in Redis and deletes the obsolete ones
+
+Usage:
+    python compact_cache.py                      # list versions, delete nothing
+    python compact_cache.py --delete             # drop versions not seen in --max-age-days
+    python compact_cache.py --delete --drop stub:synthetic:0123456789
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+import redis
+from dotenv import load_dotenv
+
+# Add project root to path
+sys.path.append(os.path.dirname(__file__))
+
+from core.shared_cache import VERSIONS_KEY
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+
+
+def namespace_of(key: str) -> str:
+    """`emb:{engine}:{model}:{digest}:{photo id}` -> `{engine}:{model}:{digest}`"""
+    return ':'.join(key.split(':', 4)[1:4])
+
+
+def scan_namespaces(client) -> Counter:
+    """Count stored entries per namespace"""
+    counts: Counter = Counter()
+    for key in client.scan_iter(match='emb:*', count=1000):
+        counts[namespace_of(key)] += 1
+    return counts
+
+
+def obsolete_namespaces(client, counts: Counter, max_age_days: float, drop: list) -> list:
+    """Namespaces not registered by a worker within max_age_days, plus explicit drops"""
+    registered = {
+        namespace: json.loads(info)
+        for namespace, info in client.hgetall(VERSIONS_KEY).items()
+    }
+    cutoff = time.time() - max_age_days * 86400
+    obsolete = set(drop)
+    for namespace in set(counts) | set(registered):
+        info = registered.get(namespace)
+        if info is None or info.get('last_seen', 0) < cutoff:
+            obsolete.add(namespace)
+    return sorted(obsolete)
+
+
+def delete_namespace(client, namespace: str, batch_size: int = 500) -> int:
+    """Delete every entry of a namespace and its registration"""
+    deleted = 0
+    batch = []
+    for key in client.scan_iter(match=f'emb:{namespace}:*', count=1000):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            deleted += client.unlink(*batch)
+            batch = []
+    if batch:
+        deleted += client.unlink(*batch)
+    client.hdel(VERSIONS_KEY, namespace)
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact the shared embedding cache')
+    parser.add_argument('--max-age-days', type=float, default=30,
+                        help='Versions no worker registered within this many days are obsolete')
+    parser.add_argument('--drop', nargs='+', default=[], metavar='NAMESPACE',
+                        help='Additional namespaces to delete regardless of age')
+    parser.add_argument('--delete', action='store_true', help='Actually delete (default is a dry run)')
+    args = parser.parse_args()
+
+    client = redis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        password=REDIS_PASSWORD if REDIS_PASSWORD else None,
+        decode_responses=True
+    )
+
+    counts = scan_namespaces(client)
+    obsolete = obsolete_namespaces(client, counts, args.max_age_days, args.drop)
+
+    print(f"{'Namespace':<50} {'Entries':>10}  Status")
+    print("-" * 72)
+    for namespace in sorted(set(counts) | set(obsolete)):
+        status = 'obsolete' if namespace in obsolete else 'current'
+        print(f"{namespace:<50} {counts.get(namespace, 0):>10}  {status}")
+
+    if not obsolete:
+        print("\n✅ Nothing to compact")
+        return
+    if not args.delete:
+        print(f"\nDry run: {len(obsolete)} obsolete version(s). Re-run with --delete to remove them.")
+        return
+
+    for namespace in obsolete:
+        deleted = delete_namespace(client, namespace)
+        print(f"🗑️  {namespace}: deleted {deleted} entries")
+
+
+if __name__ == '__main__':
+    main()
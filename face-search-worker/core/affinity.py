@@ -0,0 +1,131 @@
+"""
+Stage Affinity
+Tracks which stages are warm in this worker's cache, advertises them in Redis,
+and decides when a cold worker should leave a job for a warm one
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class StageAffinity:
+    """Warm-stage bookkeeping and claim preference for face-search jobs"""
+
+    def __init__(
+        self,
+        redis_client,
+        worker_id: str,
+        timeout_ms: int = 10000,
+        defer_ms: int = 1000,
+        max_advertised: int = 64,
+        advert_ttl: int = 15
+    ):
+        """
+        Args:
+            redis_client: Redis client (decode_responses=True)
+            worker_id: This worker's ID
+            timeout_ms: Job age after which any worker processes it regardless of warmth
+            defer_ms: Delay applied when leaving a job for a warm worker
+            max_advertised: Most recently used warm stages advertised per worker
+            advert_ttl: Seconds an advertisement stays valid without a heartbeat
+        """
+        self.redis_client = redis_client
+        self.worker_id = worker_id
+        self.timeout_ms = timeout_ms
+        self.defer_ms = defer_ms
+        self.max_advertised = max_advertised
+        self.advert_ttl = advert_ttl
+
+        self._warm: 'OrderedDict[str, float]' = OrderedDict()  # stage -> last used
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stage_key(stage: str) -> str:
+        """Sorted set of worker IDs warm for a stage, scored by last advertisement time"""
+        return f'stage_affinity:{stage}'
+
+    # --- Local warm set ---------------------------------------------------------------
+
+    def mark_warm(self, stage: str):
+        """Record that every photo of `stage` is now in this worker's cache"""
+        with self._lock:
+            self._warm[stage] = time.time()
+            self._warm.move_to_end(stage)
+
+    def mark_cold(self):
+        """Forget every warm stage and withdraw their advertisements (the cache was dropped)"""
+        self.withdraw()
+        with self._lock:
+            self._warm.clear()
+
+    def is_warm(self, stage: str) -> bool:
+        with self._lock:
+            return stage in self._warm
+
+    def warm_stages(self) -> List[str]:
+        """Most recently used warm stages, newest first, capped at max_advertised"""
+        with self._lock:
+            return list(reversed(self._warm))[:self.max_advertised]
+
+    # --- Advertisement ----------------------------------------------------------------
+
+    def publish(self, pipe):
+        """Queue advertisement writes onto a heartbeat pipeline"""
+        now = time.time()
+        for stage in self.warm_stages():
+            key = self.stage_key(stage)
+            pipe.zadd(key, {self.worker_id: now})
+            # Drop entries from workers that stopped advertising
+            pipe.zremrangebyscore(key, '-inf', now - self.advert_ttl)
+            pipe.expire(key, self.advert_ttl * 4)
+
+    def withdraw(self):
+        """Remove this worker from every stage it advertised (on shutdown or when its cache is dropped)"""
+        stages = self.warm_stages()
+        if not stages:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for stage in stages:
+            pipe.zrem(self.stage_key(stage), self.worker_id)
+        pipe.execute()
+
+    # --- Claim preference -------------------------------------------------------------
+
+    def preferred_worker(self, stage: str, job_timestamp_ms: int) -> Optional[str]:
+        """
+        Pick an idle, ready, unpaused worker that is warm for `stage`
+
+        Returns None when this worker should just process the job: it is warm
+        itself, the job has waited past the timeout, or no warm worker is free.
+        """
+        if self.is_warm(stage):
+            return None
+        if job_timestamp_ms and time.time() * 1000 - job_timestamp_ms > self.timeout_ms:
+            return None
+
+        candidates = [
+            worker_id for worker_id in self.redis_client.zrangebyscore(
+                self.stage_key(stage), time.time() - self.advert_ttl, '+inf'
+            )
+            if worker_id != self.worker_id
+        ]
+        if not candidates:
+            return None
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for worker_id in candidates:
+            pipe.get(f'worker:{worker_id}:heartbeat')
+            pipe.get(f'worker:{worker_id}:paused')
+        results = pipe.execute()
+
+        for index, worker_id in enumerate(candidates):
+            heartbeat, paused = results[index * 2], results[index * 2 + 1]
+            if not heartbeat or paused == '1':
+                continue
+            heartbeat = json.loads(heartbeat)
+            if heartbeat.get('ready', True) and heartbeat.get('current_job') is None:
+                return worker_id
+        return None
@@ -0,0 +1,191 @@
+"""
+Concurrency Autoscaler
+Adjusts the engine thread pool and BullMQ concurrency from measured encode
+throughput and resource headroom
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyController:
+    """
+    Hill-climbing controller for `engine.max_workers` and `worker.opts['concurrency']`
+
+    Threads are raised one step at a time while encode throughput keeps
+    improving and RAM/GPU memory have headroom; a step that does not pay off
+    is reverted. Memory pressure shrinks both immediately.
+
+    Extra concurrency pays off because process_job runs each search in its own
+    thread: concurrent jobs overlap, each with a pool of `engine.max_workers`
+    threads, so it is only raised once the pool is maxed out and CPU is idle.
+    """
+
+    def __init__(
+        self,
+        engine,
+        manager,
+        min_threads: int = 2,
+        max_threads: int = 16,
+        min_concurrency: int = 1,
+        max_concurrency: int = 1,
+        interval: float = 15,
+        thread_step: int = 2,
+        min_samples: int = 200,
+        tolerance: float = 0.05,
+        ram_high: float = 85,
+        ram_low: float = 70,
+        gpu_memory_high: float = 90,
+        cpu_low: float = 60
+    ):
+        """
+        Args:
+            engine: Engine whose max_workers is tuned
+            manager: WorkerManager (latest system metrics, phase metrics, concurrency)
+            min_threads / max_threads: Bounds for engine.max_workers
+            min_concurrency / max_concurrency: Bounds for BullMQ concurrency (>= 1)
+            interval: Seconds between evaluations
+            thread_step: Threads added or removed per adjustment
+            min_samples: Encoded images required before throughput is trusted
+            tolerance: Relative throughput change treated as noise
+            ram_high / ram_low: RAM % above which to shrink / below which growth is allowed
+            gpu_memory_high: GPU memory % above which to shrink
+            cpu_low: CPU % below which concurrency may grow
+        """
+        self.engine = engine
+        self.manager = manager
+        self.worker = None  # BullMQ Worker, attached once created
+        self.min_threads = min_threads
+        self.max_threads = max(min_threads, max_threads)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.interval = interval
+        self.thread_step = thread_step
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.ram_high = ram_high
+        self.ram_low = ram_low
+        self.gpu_memory_high = gpu_memory_high
+        self.cpu_low = cpu_low
+
+        self.threads = min(max(engine.max_workers, self.min_threads), self.max_threads)
+        self.concurrency = min(max(manager.concurrency, self.min_concurrency), self.max_concurrency)
+
+        # Throughput bookkeeping
+        self._last_encoded = self._encoded_total()
+        self._last_gallery_seconds = manager.phase_metrics.total_seconds('gallery')
+        self._last_rate: Optional[float] = None
+        self._probing = False  # last change was a thread increase awaiting evaluation
+        self._hold_until = 0.0  # no thread increases before this time (after a failed probe)
+
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    # --- Measurements -----------------------------------------------------------------
+
+    def _encoded_total(self) -> int:
+        return self.engine.cache_stats['gallery_encodings']['misses']
+
+    def _pressure(self, metrics: Dict[str, Any]) -> Optional[str]:
+        """Reason to shrink, or None"""
+        ram = metrics['ram']['percent']
+        if ram >= self.ram_high:
+            return f"RAM {ram:.0f}%"
+        gpu = metrics.get('gpu')
+        if gpu and gpu.get('memory_total_mb'):
+            gpu_memory = 100 * gpu['memory_used_mb'] / gpu['memory_total_mb']
+            if gpu_memory >= self.gpu_memory_high:
+                return f"GPU memory {gpu_memory:.0f}%"
+        return None
+
+    def _headroom(self, metrics: Dict[str, Any]) -> bool:
+        return metrics['ram']['percent'] < self.ram_low
+
+    # --- Control loop -----------------------------------------------------------------
+
+    def evaluate(self):
+        """One control step (called every `interval` seconds)"""
+        metrics = self.manager.last_metrics
+        if not metrics:
+            return
+
+        threads, concurrency = self.threads, self.concurrency
+
+        pressure = self._pressure(metrics)
+        if pressure:
+            threads = max(self.min_threads, threads - self.thread_step)
+            concurrency = max(self.min_concurrency, concurrency - 1)
+            self._probing = False
+            self._last_rate = None
+            self._hold_until = time.time() + self.interval * 20
+            self._apply(threads, concurrency, pressure)
+            return
+
+        encoded = self._encoded_total()
+        gallery_seconds = self.manager.phase_metrics.total_seconds('gallery')
+        encoded_delta = encoded - self._last_encoded
+        seconds_delta = gallery_seconds - self._last_gallery_seconds
+        if encoded_delta < self.min_samples or seconds_delta <= 0:
+            return  # Not enough uncached work since the last decision
+        self._last_encoded, self._last_gallery_seconds = encoded, gallery_seconds
+        rate = encoded_delta / seconds_delta
+
+        if self._probing and self._last_rate and rate < self._last_rate * (1 + self.tolerance):
+            # The extra threads did not pay off - step back and stay there
+            threads = max(self.min_threads, threads - self.thread_step)
+            self._probing = False
+            self._hold_until = time.time() + self.interval * 20
+            reason = f"{rate:.1f} img/s did not beat {self._last_rate:.1f} img/s"
+        elif self._headroom(metrics) and threads < self.max_threads and time.time() >= self._hold_until:
+            threads = min(self.max_threads, threads + self.thread_step)
+            self._probing = True
+            reason = f"headroom at {rate:.1f} img/s"
+        else:
+            self._probing = False
+            reason = f"steady at {rate:.1f} img/s"
+
+        # More concurrent jobs only once the thread pool is settled at its maximum and the host is idle
+        if not self._probing and threads >= self.max_threads and self._headroom(metrics) and metrics['cpu_percent'] < self.cpu_low:
+            concurrency = min(self.max_concurrency, concurrency + 1)
+
+        self._last_rate = rate
+        self._apply(threads, concurrency, reason)
+
+    def _apply(self, threads: int, concurrency: int, reason: str):
+        if threads == self.threads and concurrency == self.concurrency:
+            return
+        logger.info(
+            f"⚖️  Autoscale: threads {self.threads} -> {threads}, "
+            f"concurrency {self.concurrency} -> {concurrency} ({reason})"
+        )
+        self.threads, self.concurrency = threads, concurrency
+        # Both are read per batch / per fetch loop, so changes apply without a restart
+        self.engine.max_workers = threads
+        self.manager.concurrency = concurrency
+        self.manager.worker_stats['engine_threads'] = threads
+        if self.worker is not None:
+            self.worker.opts['concurrency'] = concurrency
+
+    def loop(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.evaluate()
+            except Exception as e:
+                logger.warning(f"⚠️  Autoscale error: {e}")
+
+    def start(self):
+        """Start the controller thread"""
+        self.running = True
+        self.engine.max_workers = self.threads
+        self.manager.concurrency = self.concurrency
+        self.manager.worker_stats['engine_threads'] = self.threads
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
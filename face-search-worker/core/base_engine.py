@@ -4,23 +4,36 @@ All face recognition engines must implement this abstract class
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, List, Dict, Optional
-import base64
-import io
-from PIL import Image
+from contextlib import nullcontext
+from typing import Any, List, Dict, Optional, Union
 import numpy as np
-import cv2
 import hashlib
-import gc
+import json
 import logging
+import threading
+import contextvars
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from core.exclude_set import ExcludeSnapshot, Fingerprint, file_fingerprints
+from core.image_input import ImageInput, decode_image_bytes
+from core.prefetch import ImagePrefetcher
+from core.result_cache import ResultCache
+from core.search_results import SearchResults
+
 logger = logging.getLogger(__name__)
 
 
 class BaseEngine(ABC):
     """Abstract base class for face recognition engines"""
     
+    # Bump when the layout or the keys of cached embeddings change
+    CACHE_FORMAT_VERSION = 2
+    
+    # How gallery faces are matched against exclude faces: metric, and the distance below which a face is excluded
+    EXCLUDE_METRIC = 'euclidean'
+    EXCLUDE_THRESHOLD = 0.1
+    
     def __init__(self, use_gpu: bool = True, max_workers: int = 8, max_image_size: int = 640):
         """
         Initialize the engine
@@ -34,14 +47,56 @@ class BaseEngine(ABC):
         self.max_workers = max_workers
         self.max_image_size = max_image_size
         self.name = self.__class__.__name__
+        self.model_name = "default"
         
         # Initialize cache with separate sections
         self.cache = {
-            # 'selfie_encodings': {},      # hash -> encoding/embedding
-            'gallery_encodings': {},     # hash -> list of encodings/embeddings
-            'exclude_encodings': {},     # hash -> list of encodings/embeddings
+            'selfie_encodings': OrderedDict(),  # image digest -> encoding/embedding (LRU)
+            'gallery_encodings': {},     # hash of path + fingerprint (see gallery_hash) -> (faces, dim) embedding matrix
+            'exclude_encodings': {},     # hash of path + fingerprint -> (faces, dim) embedding matrix
         }
         
+        # Current exclude set (replaced by core.exclude_set.ExcludeSet when the directory changes)
+        self.exclude = ExcludeSnapshot({}, {}, self.EXCLUDE_METRIC, self.EXCLUDE_THRESHOLD)
+        
+        self.selfie_cache_size = 256
+        
+        # Finished results for repeated searches (None disables)
+        self.result_cache: Optional[ResultCache] = ResultCache()
+        
+        # Hit/miss counters per cache section
+        self.cache_stats = {section: {'hits': 0, 'misses': 0} for section in self.cache}
+        self._cache_stats_lock = threading.Lock()
+        
+        # Writes per cache section, so a saved copy can tell it is stale (see core.cache_snapshot)
+        self.cache_generation = {section: 0 for section in self.cache}
+        
+        # Optional core.shared_cache.SharedEmbeddingCache consulted after the local
+        # cache and before encoding (set by the worker)
+        self.shared_cache = None
+        self.cache_stats['shared_gallery_encodings'] = {'hits': 0, 'misses': 0}
+        self.cache_stats['results'] = {'hits': 0, 'misses': 0}
+        
+        # Optional core.cache_snapshot.CacheSnapshot journaling each chunk's new
+        # encodings to disk (set by the worker)
+        self.checkpoint = None
+        
+        # Read-ahead of uncached gallery files (0 threads disables it)
+        self.prefetch_threads = 0
+        self.prefetch_buffer_bytes = 256 * 1024 * 1024
+        self._prefetchers: List[ImagePrefetcher] = []
+        self._prefetch_lock = threading.Lock()
+        
+        # Namespace the cached entries were produced under (see cache_namespace)
+        self.cache_version: Optional[str] = None
+        
+        # Optional core.phase_metrics.PhaseMetrics for timing spans (set by the worker)
+        self.phase_metrics = None
+        
+        # Optional core.affinity.StageAffinity whose warm stages go cold when the
+        # gallery cache is dropped (set by the worker)
+        self.affinity = None
+        
         # Test for compatible environment
         if not self._is_environment_compatible():
             raise RuntimeError(f"Incompatible environment for {self.name}")
@@ -53,35 +108,168 @@ class BaseEngine(ABC):
         """
         return True
     
-    def _compute_image_hash(self, img_data: str) -> str:
-        """Compute SHA256 hash of image data for caching"""
-        if isinstance(img_data, str):
-            # For base64 strings
-            if ',' in img_data:
-                img_data = img_data.split(',')[1]
-            return hashlib.sha256(img_data.encode()).hexdigest()
-        else:
-            # For file paths
-            return hashlib.sha256(str(img_data).encode()).hexdigest()
+    def _phase(self, phase: str):
+        """Timing span for a phase, or a no-op when metrics are not attached"""
+        if self.phase_metrics is None:
+            return nullcontext()
+        return self.phase_metrics.span(phase)
+    
+    def _compute_image_hash(self, img_data: Union[str, ImageInput]) -> str:
+        """Cache key of an image: the content digest of an in-memory image, the SHA256 of a file path"""
+        if isinstance(img_data, ImageInput):
+            return img_data.digest
+        return hashlib.sha256(str(img_data).encode()).hexdigest()
 
-    def _get_cached_encoding(self, cache_key: str, img_data: str, cache_type: str = 'gallery'):
-        """Get cached encoding or compute and cache it"""
-        img_hash = self._compute_image_hash(img_data)
+    def _get_cached_encoding(self, cache_key: str, img_data: Union[str, ImageInput], cache_type: str = 'gallery',
+                             img_hash: Optional[str] = None):
+        """Get cached encoding or compute and cache it (`img_hash`: precomputed key, e.g. gallery_hash)"""
+        if img_hash is None:
+            img_hash = self._compute_image_hash(img_data)
         
         # Check cache
-        if img_hash in self.cache[cache_type]:
+        cached = self.cache[cache_type].get(img_hash)
+        with self._cache_stats_lock:
+            self.cache_stats[cache_type]['hits' if cached is not None else 'misses'] += 1
+        
+        if cached is not None:
             logger.debug(f"Cache hit for {cache_type}: {img_hash[:8]}...")
-            return self.cache[cache_type][img_hash]
+            return cached
         
         # Not in cache, compute it
         return None
 
-    def _cache_encoding(self, img_data: str, encoding, cache_type: str = 'gallery'):
-        """Cache an encoding"""
-        img_hash = self._compute_image_hash(img_data)
+    def _cache_encoding(self, img_data: Union[str, ImageInput], encoding, cache_type: str = 'gallery',
+                        img_hash: Optional[str] = None):
+        """Cache an encoding (`img_hash`: precomputed key, e.g. gallery_hash)"""
+        if img_hash is None:
+            img_hash = self._compute_image_hash(img_data)
         self.cache[cache_type][img_hash] = encoding
+        self._cache_written(cache_type)
         logger.debug(f"Cached {cache_type}: {img_hash[:8]}...")
+    
+    def _cache_written(self, cache_type: str):
+        """Count a change to a cache section (added, replaced or removed entries)"""
+        with self._cache_stats_lock:
+            self.cache_generation[cache_type] += 1
 
+    def cache_params(self) -> Dict[str, Any]:
+        """
+        Everything that changes the embeddings this engine produces.
+        Override to add engine-specific preprocessing parameters.
+        """
+        return {
+            'engine': self.name,
+            'model': self.model_name,
+            'max_image_size': self.max_image_size,
+            'format': self.CACHE_FORMAT_VERSION,
+        }
+    
+    def cache_namespace(self) -> str:
+        """Identifier separating cached embeddings of different engines/models/parameters"""
+        params = self.cache_params()
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+        return f"{self.name}:{self.model_name}:{digest}"
+    
+    def _ensure_cache_version(self):
+        """Drop local entries produced under different parameters so versions never mix"""
+        namespace = self.cache_namespace()
+        if namespace != self.cache_version:
+            if self.cache_version is not None:
+                logger.info(f"Engine parameters changed ({self.cache_version} -> {namespace}), clearing embedding cache")
+                for section, entries in self.cache.items():
+                    entries.clear()
+                    self._cache_written(section)
+                if self.result_cache is not None:
+                    self.result_cache.clear()
+                if self.affinity is not None:
+                    # Stages advertised as warm are no longer cached here
+                    try:
+                        self.affinity.mark_cold()
+                    except Exception as e:
+                        logger.warning(f"Failed to withdraw warm stages: {e}")
+            self.cache_version = namespace
+        
+        if self.shared_cache is not None:
+            self.shared_cache.namespace = namespace
+            self.shared_cache.register_version(self.cache_params())
+    
+    def gallery_hash(self, item: Dict[str, Any]) -> str:
+        """
+        Local cache (and checkpoint) key of a gallery photo: its path plus, for scanned
+        files, its fingerprint, so a photo replaced under the same name is a new entry
+        """
+        fingerprint = item.get('fingerprint')
+        if fingerprint is None:
+            return self._compute_image_hash(item['image'])
+        return self._compute_image_hash(self.file_cache_key(item['image'], fingerprint))
+    
+    def shared_key(self, item: Dict[str, Any]) -> str:
+        """Shared-tier key of a gallery photo: its id plus, for scanned files, its fingerprint"""
+        fingerprint = item.get('fingerprint')
+        if fingerprint is None:
+            return item['id']
+        return self.file_cache_key(item['id'], fingerprint)
+    
+    def _uncached_items(self, chunk) -> List[tuple]:
+        """(item, hash) pairs of a chunk missing from the local gallery cache"""
+        gallery_cache = self.cache['gallery_encodings']
+        missing = []
+        for item in chunk:
+            img_hash = self.gallery_hash(item)
+            if img_hash not in gallery_cache:
+                missing.append((item, img_hash))
+        return missing
+    
+    def _fetch_shared_encodings(self, missing: List[tuple]) -> List[tuple]:
+        """
+        Fill the local gallery cache from the shared tier for a chunk's uncached items
+        
+        Returns:
+            (item, hash) pairs still missing afterwards, i.e. those this worker encodes
+        """
+        if not missing:
+            return []
+        gallery_cache = self.cache['gallery_encodings']
+        
+        try:
+            found = self.shared_cache.get_many(self.shared_key(item) for item, _ in missing)
+        except Exception as e:
+            logger.warning(f"Shared cache lookup failed: {e}")
+            # Encoded here, then still published and journaled
+            return missing
+        
+        for item, img_hash in missing:
+            encodings = found.get(self.shared_key(item))
+            if encodings is not None:
+                gallery_cache[img_hash] = encodings
+        if found:
+            self._cache_written('gallery_encodings')
+        
+        with self._cache_stats_lock:
+            self.cache_stats['shared_gallery_encodings']['hits'] += len(found)
+            self.cache_stats['shared_gallery_encodings']['misses'] += len(missing) - len(found)
+        
+        return [(item, img_hash) for item, img_hash in missing if self.shared_key(item) not in found]
+    
+    def _store_encoded_chunk(self, missing: List[tuple]):
+        """Publish encodings computed for a chunk to the shared tier and the checkpoint journal"""
+        gallery_cache = self.cache['gallery_encodings']
+        encoded = [(item, img_hash) for item, img_hash in missing if img_hash in gallery_cache]
+        if not encoded:
+            return
+        
+        if self.shared_cache is not None:
+            try:
+                self.shared_cache.set_many({self.shared_key(item): gallery_cache[img_hash] for item, img_hash in encoded})
+            except Exception as e:
+                logger.warning(f"Shared cache write failed: {e}")
+        
+        if self.checkpoint is not None:
+            try:
+                self.checkpoint.record({img_hash: gallery_cache[img_hash] for _, img_hash in encoded})
+            except Exception as e:
+                logger.warning(f"Checkpoint write failed: {e}")
+    
     def _preprocess_image(self, img_array: np.ndarray) -> np.ndarray:
         """Preprocess image for faster face recognition"""
         h, w = img_array.shape[:2]
@@ -98,59 +286,91 @@ class BaseEngine(ABC):
             if new_size[0] < 10 or new_size[1] < 10:
                 raise ValueError(f"Resized image too small: {new_size}")
             
+            import cv2  # deferred: only needed once an image is resized
             img_array = cv2.resize(img_array, new_size, interpolation=cv2.INTER_AREA)
         
         return img_array
     
-    def _load_and_preprocess_image(self, img_path_or_base64: str) -> np.ndarray:
-        """Load image from path or base64 and preprocess"""
-        # Load image from path or decode from base64
-        if isinstance(img_path_or_base64, str) and (img_path_or_base64.strip().startswith('data:image') or len(img_path_or_base64.strip()) > 500):
-            # It's base64
-            img = self.decode_base64_image(img_path_or_base64)
+    def _load_and_preprocess_image(self, image: Union[str, ImageInput]) -> np.ndarray:
+        """Load an in-memory image or a file path and preprocess"""
+        if isinstance(image, ImageInput):
+            img = image.array
         else:
-            # It's a file path
-            img = self.load_image_from_path(img_path_or_base64)
+            # A file path - use the bytes read ahead by the prefetcher when there are any
+            data = self._take_prefetched(image)
+            img = self.decode_image_bytes(data) if data is not None else self.load_image_from_path(image)
         
         return self._preprocess_image(img)
     
-    def _process_batch_parallel(self, batch_items, selfie_encoding, exclude_encodings, show_progress=False):
-        """Process a batch of images in parallel with memory-safe result collection"""
-        results = []
+    def _start_prefetch(self, missing: List[tuple]) -> Optional[ImagePrefetcher]:
+        """Read the files of a chunk's uncached items ahead of the encode threads"""
+        paths = [item['image'] for item, _ in missing if isinstance(item['image'], str)]
+        if not paths:
+            return None
+        prefetcher = ImagePrefetcher(paths, io_threads=self.prefetch_threads, max_bytes=self.prefetch_buffer_bytes)
+        with self._prefetch_lock:
+            self._prefetchers.append(prefetcher)
+        return prefetcher
+    
+    def _stop_prefetch(self, prefetcher: ImagePrefetcher):
+        prefetcher.close()
+        with self._prefetch_lock:
+            self._prefetchers.remove(prefetcher)
+    
+    def _take_prefetched(self, path: str) -> Optional[bytes]:
+        """Prefetched bytes for `path` from whichever running job's prefetcher owns it"""
+        for prefetcher in tuple(self._prefetchers):
+            if prefetcher.owns(path):
+                return prefetcher.take(path)
+        return None
+    
+    def _process_batch_parallel(self, batch_items, selfie_encoding, exclude, scores: np.ndarray, show_progress=False,
+                                profile_session=None) -> int:
+        """
+        Process a batch of images in parallel, writing each similarity into `scores`
+        (aligned with `batch_items`); returns how many images were scored.
+        Pool threads are profiled into `profile_session` when one is given.
+        """
         total = len(batch_items)
         processed = 0
+        scored = 0
+        
+        process_single_image = self._process_single_image
+        if profile_session is not None:
+            process_single_image = profile_session.wrap(process_single_image)
         
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_item = {
-                executor.submit(self._process_single_image, 
-                              (item['id'], item['image'], selfie_encoding, exclude_encodings)): item
-                for item in batch_items
+            # Submit all tasks (in a copy of the job's context, so per-image spans count towards it)
+            future_to_index = {
+                executor.submit(contextvars.copy_context().run, process_single_image,
+                              (item['id'], item['image'], self.gallery_hash(item), selfie_encoding, exclude)): index
+                for index, item in enumerate(batch_items)
             }
             
             # Collect results as they complete with progress tracking
-            for future in as_completed(future_to_item):
+            for future in as_completed(future_to_index):
                 try:
-                    result = future.result()
-                    if result:
-                        results.append(result)
+                    similarity = future.result()
+                    if similarity is not None:
+                        scores[future_to_index[future]] = similarity
+                        scored += 1
                     processed += 1
                     
                     # Show progress every 10% or every 25 images
                     if show_progress and (processed % max(25, total // 10) == 0 or processed == total):
-                        logger.info(f"Progress: {processed}/{total} ({100*processed/total:.1f}%) - {len(results)} matches so far")
+                        logger.info(f"Progress: {processed}/{total} ({100*processed/total:.1f}%) - {scored} matches so far")
                 except Exception as e:
                     logger.warning(f"Error processing image: {e}")
                     processed += 1
                 finally:
                     # Cleanup reference to help GC
-                    del future_to_item[future]
+                    del future_to_index[future]
         
-        return results
+        return scored
     
-    def _process_in_chunks(self, gallery_images, selfie_encoding, exclude_encodings, chunk_size=500):
+    def _process_in_chunks(self, gallery_images, selfie_encoding, exclude, chunk_size=500, profile_session=None) -> SearchResults:
         """Process images with memory-safe chunking for large datasets"""
-        results = []
+        results = SearchResults.for_gallery(gallery_images)
         total = len(gallery_images)
         
         num_chunks = (total + chunk_size - 1) // chunk_size
@@ -168,27 +388,47 @@ class BaseEngine(ABC):
             if num_chunks > 1:
                 logger.info(f"Chunk {chunk_idx + 1}/{num_chunks}: Processing images {chunk_start + 1}-{chunk_end}...")
             
+            # Pull encodings other workers already computed
+            track = self.shared_cache is not None or self.checkpoint is not None
+            if track or self.prefetch_threads > 0:
+                missing = self._uncached_items(chunk)
+                if self.shared_cache is not None:
+                    missing = self._fetch_shared_encodings(missing)
+            
+            # Read the files still to be encoded ahead of the encode threads
+            prefetcher = self._start_prefetch(missing) if self.prefetch_threads > 0 else None
+            
             # Process chunk with progress tracking
-            chunk_results = self._process_batch_parallel(chunk, selfie_encoding, exclude_encodings, show_progress=(num_chunks == 1))
-            results.extend(chunk_results)
+            try:
+                chunk_matches = self._process_batch_parallel(
+                    chunk, selfie_encoding, exclude, results.scores[chunk_start:chunk_end],
+                    show_progress=(num_chunks == 1), profile_session=profile_session
+                )
+            finally:
+                if prefetcher is not None:
+                    self._stop_prefetch(prefetcher)
+            
+            # Persist this chunk's new encodings so a crash only loses the chunk in progress
+            if track:
+                self._store_encoded_chunk(missing)
             
-            # Memory cleanup between chunks
             if num_chunks > 1:
-                logger.info(f"Chunk {chunk_idx + 1}/{num_chunks} complete: Found {len(chunk_results)} matches")
-                gc.collect()
+                logger.info(f"Chunk {chunk_idx + 1}/{num_chunks} complete: Found {chunk_matches} matches")
         
         return results
     
     @abstractmethod
-    def _process_single_image(self, args) -> Optional[Dict[str, float]]:
+    def _process_single_image(self, args) -> Optional[float]:
         """
         Process a single image (engine-specific implementation)
         
         Args:
-            args: Tuple of (img_id, img_data, selfie_encoding, exclude_encodings)
+            args: Tuple of (img_id, img_data, img_hash, selfie_encoding, exclude) where
+                  img_hash is the photo's gallery cache key (see gallery_hash) and
+                  exclude is an ExcludeSnapshot (see _faces_to_compare)
         
         Returns:
-            Dict with 'id' and 'similarity' or None
+            Similarity, or None when the image was not scored
         """
         pass
     
@@ -220,73 +460,226 @@ class BaseEngine(ABC):
     
     def search_faces(
         self,
-        selfie_base64: str,
-        gallery_images: List[Dict[str, str]],
-        exclude_images: Optional[List[str]] = None
+        selfie: Union[ImageInput, str],
+        gallery_images: List[Dict[str, Any]],
+        exclude_images: Optional[List[str]] = None,
+        top_k: Optional[int] = None
     ) -> List[Dict[str, float]]:
         """
         Search for similar faces in gallery (template method pattern)
         
         Args:
-            selfie_base64: Base64 encoded selfie image
-            gallery_images: List of {'id': str, 'image': base64_str}
-            exclude_images: List of file paths to exclude faces
+            selfie: Ingested selfie image (a base64 string is ingested here)
+            gallery_images: List of {'id': str, 'image': file path or ImageInput}
+            exclude_images: List of file paths to exclude faces (the engine's current exclude set by default)
+            top_k: Return only the best `top_k` results (all by default)
         
         Returns:
             List of {'id': str, 'similarity': float} sorted by similarity (desc)
         """
-        # Decode and preprocess selfie
-        selfie_img = self.decode_base64_image(selfie_base64)
-        selfie_img = self._preprocess_image(selfie_img)
-        logger.info("✓ Selfie decoded and preprocessed")
+        exclude = None
+        if exclude_images is not None:
+            with self._phase('exclusion_load'):
+                exclude = self.build_exclude(file_fingerprints(exclude_images))
+        results = self.search(selfie, gallery_images, exclude)
         
-        # Encode selfie (engine-specific)
-        selfie_encoding = self._encode_selfie(selfie_img)
-        del selfie_img
+        # Sort by similarity in descending order (best matches first)
+        with self._phase('result_serialization'):
+            ranked = results.to_list(top_k)
+        
+        return ranked
+    
+    def search(
+        self,
+        selfie: Union[ImageInput, str],
+        gallery_images: List[Dict[str, Any]],
+        exclude: Optional[ExcludeSnapshot] = None,
+        previous: Optional[SearchResults] = None,
+        profile_session=None
+    ) -> SearchResults:
+        """
+        Score every gallery image against the selfie
+        
+        Args:
+            selfie: Ingested selfie image (a base64 string is ingested here)
+            gallery_images: List of {'id': str, 'image': file path or ImageInput}
+            exclude: Exclude set to apply (the engine's current one by default)
+            previous: Earlier results for the same selfie and exclude set; only
+                      photos it did not score are scored, the rest are carried over
+            profile_session: core.profiler.ProfileSession of this job (None when not profiled)
+        
+        Returns:
+            SearchResults aligned with `gallery_images`
+        """
+        self._ensure_cache_version()
+        
+        if isinstance(selfie, str):
+            selfie = ImageInput.from_base64(selfie)
+        
+        with self._phase('selfie_encode'):
+            selfie_encoding = self._get_selfie_encoding(selfie)
         
         if selfie_encoding is None:
             raise ValueError("No face detected in the provided selfie")
         
-        # Load exclude encodings with caching
-        exclude_encodings = []
-        if exclude_images:
-            for img_path in exclude_images:
-                try:
-                    # Check cache first
-                    cached_encodings = self._get_cached_encoding(img_path, img_path, 'exclude_encodings')
-                    
-                    if cached_encodings is not None:
-                        exclude_encodings.extend(cached_encodings)
-                    else:
-                        img = self.load_image_from_path(img_path)
-                        img = self._preprocess_image(img)
-                        encodings = self._encode_exclude_image(img)
-                        del img
-                        
-                        if encodings:
-                            # Cache the encodings
-                            self._cache_encoding(img_path, encodings, 'exclude_encodings')
-                            exclude_encodings.extend(encodings)
-                except Exception as e:
-                    logger.warning(f"Failed to load exclude image {img_path}: {e}")
-            
-            logger.info(f"✓ Loaded {len(exclude_encodings)} exclude face encodings")
+        if exclude is None:
+            exclude = self.exclude
+        if exclude.files and exclude.namespace != self.cache_version:
+            # Encoded under other engine parameters - the cache that held them was just cleared
+            stale, exclude = exclude, self.build_exclude(exclude.files)
+            if self.exclude is stale:
+                self.exclude = exclude
+        
+        # Repeated search (same or near-identical selfie, same gallery)
+        result_key = None
+        if self.result_cache is not None:
+            result_key = self.result_cache.make_key(self.cache_version, selfie_encoding, gallery_images, exclude.version)
+            cached_results = self.result_cache.get(result_key)
+            with self._cache_stats_lock:
+                self.cache_stats['results']['hits' if cached_results is not None else 'misses'] += 1
+            if cached_results is not None:
+                logger.info(f"✓ Returning cached results for {cached_results.scored()} images")
+                return cached_results
+        
+        if exclude.files:
+            logger.info(f"✓ Exclude set {exclude.version}: {len(exclude)} faces")
+        
+        # Only photos added since the previous search need scoring
+        results = SearchResults.for_gallery(gallery_images)
+        carried = results.carry_over(previous) if previous is not None else None
+        pending = gallery_images
+        if carried is not None:
+            pending = [item for item, known in zip(gallery_images, carried.tolist()) if not known]
+            logger.info(f"✓ Reusing {len(gallery_images) - len(pending)} scores from the previous search, "
+                        f"{len(pending)} photos to score")
         
         # Process images with chunking
-        results = self._process_in_chunks(gallery_images, selfie_encoding, exclude_encodings, chunk_size=500)
-        
-        logger.info(f"✓ Processed all {len(gallery_images)} images - {len([r for r in results if r['similarity'] <= 0])} had errors or no faces")
+        with self._phase('gallery'):
+            scored = self._process_in_chunks(pending, selfie_encoding, exclude, chunk_size=500,
+                                             profile_session=profile_session)
+        if carried is not None:
+            results.scores[~carried] = scored.scores
+        else:
+            results = scored
         
-        # Sort by similarity in descending order (best matches first)
-        results.sort(key=lambda x: x['similarity'], reverse=True)
+        logger.info(f"✓ Processed all {len(gallery_images)} images - {results.without_match()} had errors or no faces")
         
-        # Final cleanup
-        del selfie_encoding
-        del exclude_encodings
-        gc.collect()
+        if result_key is not None:
+            self.result_cache.put(result_key, results)  # type: ignore[union-attr]
         
         return results
     
+    def _get_selfie_encoding(self, selfie: ImageInput):
+        """Decode and encode the selfie, reusing the encoding of an identical image (without decoding it)"""
+        selfie_cache = self.cache['selfie_encodings']
+        cached = self._get_cached_encoding(selfie.digest, selfie, 'selfie_encodings')
+        if cached is not None:
+            selfie_cache.move_to_end(selfie.digest)
+            logger.info("✓ Selfie encoding reused from cache")
+            return cached
+        
+        # Decode and preprocess selfie
+        selfie_img = self._preprocess_image(selfie.array)
+        logger.info("✓ Selfie decoded and preprocessed")
+        
+        # Encode selfie (engine-specific)
+        selfie_encoding = self._encode_selfie(selfie_img)
+        del selfie_img
+        
+        if selfie_encoding is not None:
+            self._cache_encoding(selfie, selfie_encoding, 'selfie_encodings')
+            while len(selfie_cache) > self.selfie_cache_size:
+                selfie_cache.popitem(last=False)
+        return selfie_encoding
+    
+    @staticmethod
+    def file_cache_key(path: str, fingerprint: Fingerprint) -> str:
+        """Cache key of a file version: a replaced file (new mtime/size) never hits the old entry"""
+        return f"{path}|{fingerprint[0]}|{fingerprint[1]}"
+    
+    def build_exclude(self, files: Dict[str, Fingerprint]) -> ExcludeSnapshot:
+        """Load (with caching) every exclude image into a new exclude set version"""
+        self._ensure_cache_version()
+        encodings = {}
+        for img_path, fingerprint in files.items():
+            cache_key = self.file_cache_key(img_path, fingerprint)
+            try:
+                # Check cache first
+                cached_encodings = self._get_cached_encoding(cache_key, cache_key, 'exclude_encodings')
+                
+                if cached_encodings is not None:
+                    encodings[img_path] = cached_encodings
+                else:
+                    img = self.load_image_from_path(img_path)
+                    img = self._preprocess_image(img)
+                    encodings[img_path] = self.embedding_matrix(self._encode_exclude_image(img))
+                    del img
+                    
+                    if len(encodings[img_path]):
+                        # Cache the encodings
+                        self._cache_encoding(cache_key, encodings[img_path], 'exclude_encodings')
+            except Exception as e:
+                logger.warning(f"Failed to load exclude image {img_path}: {e}")
+        
+        return ExcludeSnapshot(encodings, files, self.EXCLUDE_METRIC, self.EXCLUDE_THRESHOLD, self.cache_version)
+    
+    def forget_exclude(self, path: str, fingerprint: Fingerprint):
+        """Drop the cached encodings of a removed or replaced exclude image"""
+        cache_key = self.file_cache_key(path, fingerprint)
+        if self.cache['exclude_encodings'].pop(self._compute_image_hash(cache_key), None) is not None:
+            self._cache_written('exclude_encodings')
+    
+    def _faces_to_compare(self, image: Union[str, ImageInput], faces: np.ndarray, exclude: ExcludeSnapshot,
+                          img_hash: Optional[str] = None) -> np.ndarray:
+        """A gallery photo's faces minus exclude faces (the mask is stored per exclude set version)"""
+        if not len(exclude):
+            return faces
+        return faces[exclude.kept_for(img_hash or self._compute_image_hash(image), faces)]
+    
+    @staticmethod
+    def embedding_matrix(encodings) -> np.ndarray:
+        """
+        A photo's face encodings as one contiguous (faces, dim) float32 matrix
+        ((0, 0) when there are none); cached values are always in this form
+        """
+        if len(encodings) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(encodings, dtype=np.float32)
+    
+    @staticmethod
+    def _cosine_distances(faces: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """(len(faces), len(others)) cosine distances (1.0 against zero vectors)"""
+        norms = np.outer(np.linalg.norm(faces, axis=1), np.linalg.norm(others, axis=1))
+        products = faces @ others.T
+        # A zero vector's products are already 0, i.e. distance 1.0
+        np.divide(products, norms, out=products, where=norms != 0)
+        return np.subtract(1.0, products, out=products)
+    
+    def warm_up(self):
+        """Load model weights and build graphs with a dummy inference"""
+        dummy = np.random.default_rng(0).integers(0, 256, (160, 160, 3), dtype=np.uint8)
+        for encode in (self._encode_exclude_image, self._encode_selfie):
+            try:
+                encode(dummy)
+            except Exception as e:
+                # No face in the dummy image is expected; the model is loaded either way
+                logger.debug(f"Warm-up inference raised: {e}")
+    
+    def preload_gallery(self, gallery_images: List[Dict[str, str]]):
+        """Encode (or fetch from the shared tier) gallery images into the cache and apply the exclude set, without scoring"""
+        self._ensure_cache_version()
+        self._process_in_chunks(gallery_images, None, self.exclude, chunk_size=500)
+        
+        # Exclude masks too, so the first job does no exclude work either
+        exclude = self.exclude
+        if len(exclude):
+            gallery_cache = self.cache['gallery_encodings']
+            for item in gallery_images:
+                img_hash = self.gallery_hash(item)
+                faces = gallery_cache.get(img_hash)
+                if faces is not None and len(faces):
+                    exclude.kept_for(img_hash, faces)
+    
     @staticmethod
     def decode_base64_image(base64_str: str) -> np.ndarray:
         """
@@ -298,24 +691,20 @@ class BaseEngine(ABC):
         Returns:
             RGB numpy array
         """
-        # Remove data:image prefix if present
-        if ',' in base64_str:
-            base64_str = base64_str.split(',')[1]
-        
-        # Add padding if needed (base64 strings must be padded to multiple of 4)
-        padding_needed = len(base64_str) % 4
-        if padding_needed:
-            base64_str += '=' * (4 - padding_needed)
-        
-        # Decode base64
-        image_data = base64.b64decode(base64_str)
-        image = Image.open(io.BytesIO(image_data))
+        return ImageInput.from_base64(base64_str).array
+    
+    @staticmethod
+    def decode_image_bytes(image_data: bytes) -> np.ndarray:
+        """
+        Decode encoded image file contents (JPEG/PNG/...) to numpy array (RGB)
         
-        # Convert to RGB
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        Args:
+            image_data: Raw file bytes
         
-        return np.array(image)
+        Returns:
+            RGB numpy array
+        """
+        return decode_image_bytes(image_data)
     
     @staticmethod
     def load_image_from_path(path: str) -> np.ndarray:
@@ -328,6 +717,7 @@ class BaseEngine(ABC):
         Returns:
             RGB numpy array
         """
+        from PIL import Image
         image = Image.open(path)
         
         if image.mode != 'RGB':
@@ -0,0 +1,181 @@
+"""
+Cache Snapshot
+Persists the in-memory embedding cache to disk (a snapshot on shutdown plus a
+per-chunk journal in between) and restores it on start
+"""
+
+import os
+import re
+import time
+import struct
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from core.shared_cache import SharedEmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Engine cache sections worth keeping across restarts (selfies are per-user and short-lived)
+SNAPSHOT_SECTIONS = ('gallery_encodings', 'exclude_encodings')
+
+# Journal record header: image hash, length of the encoded blob that follows
+_RECORD = struct.Struct('<64sI')
+
+
+class CacheSnapshot:
+    """
+    One .npz file per cache namespace holding, for each section, the image
+    hashes, the number of faces per image and all embeddings as one float32 matrix.
+
+    Gallery encodings computed between snapshots are appended to a journal
+    after every chunk, so a crash loses at most the chunk in progress.
+    """
+
+    def __init__(self, engine, cache_dir: str, compact_after: int = 20000):
+        """
+        Args:
+            engine: BaseEngine whose `cache` is saved and restored
+            cache_dir: Directory holding the snapshot files
+            compact_after: Journaled entries after which the snapshot is rewritten
+                           and the journal emptied
+        """
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.compact_after = compact_after
+        # Engine cache generation of the saved sections at the last load/save
+        self._saved_generation: Optional[Tuple[int, ...]] = None
+        self._journaled = 0
+        self._lock = threading.Lock()
+
+    def path(self) -> str:
+        """Snapshot file for the engine's current namespace (':' is not allowed on Windows)"""
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', self.engine.cache_namespace())
+        return os.path.join(self.cache_dir, f'{name}.npz')
+
+    def journal_path(self) -> str:
+        return f'{os.path.splitext(self.path())[0]}.journal'
+
+    def _generation(self) -> Tuple[int, ...]:
+        """Changes so far to the saved sections; a replaced entry counts even though the size stays the same"""
+        return tuple(self.engine.cache_generation[section] for section in SNAPSHOT_SECTIONS)
+
+    def load(self) -> int:
+        """Restore entries from the snapshot and the journal; returns how many were loaded"""
+        # Pin the namespace so the first search does not clear the restored entries
+        self.engine.cache_version = self.engine.cache_namespace()
+        loaded = self._load_snapshot() + self._replay_journal()
+        self._saved_generation = self._generation()
+        return loaded
+
+    def _load_snapshot(self) -> int:
+        path = self.path()
+        if not os.path.exists(path):
+            return 0
+
+        loaded = 0
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                for section in SNAPSHOT_SECTIONS:
+                    if f'{section}_keys' not in data:
+                        continue
+                    keys = data[f'{section}_keys']
+                    counts = data[f'{section}_counts']
+                    embeddings = data[f'{section}_embeddings']
+                    offsets = np.concatenate(([0], np.cumsum(counts)))
+                    cache = self.engine.cache[section]
+                    for index, key in enumerate(keys):
+                        img_hash = key.decode()
+                        if img_hash not in cache:
+                            # Views into the loaded matrix; no per-entry copies
+                            cache[img_hash] = embeddings[offsets[index]:offsets[index + 1]]
+                            loaded += 1
+        except Exception as e:
+            logger.warning(f"⚠️  Ignoring unreadable cache snapshot {path}: {e}")
+            return 0
+        return loaded
+
+    def _replay_journal(self) -> int:
+        path = self.journal_path()
+        if not os.path.exists(path):
+            return 0
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        cache = self.engine.cache['gallery_encodings']
+        offset = loaded = 0
+        while offset + _RECORD.size <= len(data):
+            key, length = _RECORD.unpack_from(data, offset)
+            end = offset + _RECORD.size + length
+            if end > len(data):
+                break
+            img_hash = key.decode()
+            if img_hash not in cache:
+                cache[img_hash] = SharedEmbeddingCache.decode(data[offset + _RECORD.size:end]).copy()
+                loaded += 1
+            offset = end
+            self._journaled += 1
+
+        if offset < len(data):
+            # Torn record from a crash mid-write; cut it so new records stay readable
+            logger.warning(f"⚠️  Truncating incomplete journal record in {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        return loaded
+
+    def record(self, entries: Dict[str, np.ndarray]):
+        """Append one chunk's newly computed gallery encodings to the journal"""
+        if not entries:
+            return
+        payload = b''.join(
+            _RECORD.pack(img_hash.encode(), len(blob)) + blob
+            for img_hash, blob in ((img_hash, SharedEmbeddingCache.encode(encodings)) for img_hash, encodings in entries.items())
+        )
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.journal_path(), 'ab') as f:
+                f.write(payload)
+            self._journaled += len(entries)
+            compact = self._journaled >= self.compact_after
+        if compact:
+            self.save()
+
+    def save(self) -> int:
+        """Write every cached entry (atomically) and empty the journal; returns how many were written, 0 if unchanged"""
+        with self._lock:
+            return self._save()
+
+    def _save(self) -> int:
+        # Read before copying: entries added meanwhile make the next save write again
+        generation = self._generation()
+        if generation == self._saved_generation:
+            return 0
+
+        arrays = {}
+        written = 0
+        for section in SNAPSHOT_SECTIONS:
+            # Copy first - engine threads may still be adding entries
+            entries = list(self.engine.cache[section].items())
+            matrices = [encodings for _, encodings in entries if len(encodings)]
+            arrays[f'{section}_keys'] = np.array([img_hash.encode() for img_hash, _ in entries], dtype='S64')
+            arrays[f'{section}_counts'] = np.array([len(encodings) for _, encodings in entries], dtype=np.int32)
+            arrays[f'{section}_embeddings'] = np.concatenate(matrices) if matrices else np.zeros((0, 0), dtype=np.float32)
+            written += len(entries)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path()
+        tmp_path = f'{path}.tmp'
+        start = time.perf_counter()
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        # Everything journaled so far is in the snapshot now
+        if os.path.exists(self.journal_path()):
+            os.remove(self.journal_path())
+        self._journaled = 0
+        logger.info(f"💾 Saved {written} cached encodings to {path} in {time.perf_counter() - start:.1f}s")
+
+        self._saved_generation = generation
+        return written
@@ -0,0 +1,201 @@
+"""
+Exclude Set
+Exclude faces loaded once into a versioned matrix, watched for changes and
+re-applied to the cached gallery photos off the job path
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) of an exclude image; a replaced file gets a new fingerprint
+Fingerprint = Tuple[int, int]
+
+
+def list_exclude_images(exclude_faces_dir: str) -> List[str]:
+    """Image paths under the exclude_faces directory"""
+    exclude_images = []
+    if os.path.exists(exclude_faces_dir):
+        valid_extensions = ('.png', '.jpg', '.jpeg')
+        for root, dirs, files in os.walk(exclude_faces_dir):
+            for f in files:
+                if f.lower().endswith(valid_extensions):
+                    exclude_images.append(os.path.join(root, f))
+    return exclude_images
+
+
+def file_fingerprints(paths: List[str]) -> Dict[str, Fingerprint]:
+    """Fingerprint per path (files that vanished meanwhile are left out)"""
+    fingerprints = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        fingerprints[path] = (stat.st_mtime_ns, stat.st_size)
+    return fingerprints
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Rows scaled to length 1 (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+
+class ExcludeSnapshot:
+    """
+    One immutable version of the exclude set: every exclude face as one
+    (faces, dim) matrix, pre-normalized for the engine's metric, plus per
+    gallery photo the mask of its faces that are not exclude faces.
+    """
+
+    def __init__(
+        self,
+        encodings: Dict[str, np.ndarray],
+        files: Dict[str, Fingerprint],
+        metric: str = 'euclidean',
+        threshold: float = 0.1,
+        namespace: Optional[str] = None
+    ):
+        """
+        Args:
+            encodings: Exclude image path -> (faces, dim) matrix
+            files: Fingerprint of every listed exclude image (including ones without faces)
+            metric: 'euclidean' or 'cosine'
+            threshold: Distance below which a gallery face counts as an exclude face
+            namespace: Engine cache namespace the encodings were produced under
+        """
+        self.encodings = encodings
+        self.files = files
+        self.metric = metric
+        self.threshold = threshold
+        self.namespace = namespace
+
+        matrices = [encodings[path] for path in sorted(encodings) if len(encodings[path])]
+        self.matrix = np.concatenate(matrices) if matrices else np.zeros((0, 0), dtype=np.float32)
+        if metric == 'cosine':
+            self._unit = _unit_rows(self.matrix)
+        else:
+            self._squared_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+        digest = hashlib.sha1(json.dumps([namespace, sorted(files.items())]).encode()).hexdigest()
+        self.version = digest[:12]
+
+        # Gallery image hash -> faces kept; filled on first use and carried over between versions
+        self.masks: Dict[str, np.ndarray] = {}
+
+    def kept(self, faces: np.ndarray) -> np.ndarray:
+        """Boolean mask of the `faces` not within `threshold` of any exclude face"""
+        if not len(self.matrix) or not len(faces):
+            return np.ones(len(faces), dtype=bool)
+        if self.metric == 'cosine':
+            # Cosine distance >= threshold, i.e. cosine similarity <= 1 - threshold
+            return (_unit_rows(faces) @ self._unit.T <= 1 - self.threshold).all(axis=1)
+        squared = faces @ self.matrix.T
+        squared *= -2
+        squared += np.einsum('ij,ij->i', faces, faces)[:, None]
+        squared += self._squared_norms[None, :]
+        return (squared >= self.threshold ** 2).all(axis=1)
+
+    def kept_for(self, img_hash: str, faces: np.ndarray) -> np.ndarray:
+        """Stored mask of a gallery photo, computed once per version"""
+        mask = self.masks.get(img_hash)
+        if mask is None or len(mask) != len(faces):
+            mask = self.masks[img_hash] = self.kept(faces)
+        return mask
+
+    def carry_masks(self, previous: 'ExcludeSnapshot', gallery_cache: Dict[str, np.ndarray]) -> int:
+        """
+        Re-apply this version to every photo `previous` had a mask for. When
+        exclude images were only added, just their faces are tested.
+
+        Returns:
+            Number of masks carried over
+        """
+        if (previous.namespace, previous.metric, previous.threshold) != (self.namespace, self.metric, self.threshold):
+            return 0
+        added = None
+        if all(self.files.get(path) == fingerprint for path, fingerprint in previous.files.items()):
+            added = ExcludeSnapshot(
+                {path: matrix for path, matrix in self.encodings.items() if path not in previous.files},
+                {}, self.metric, self.threshold, self.namespace
+            )
+
+        carried = 0
+        for img_hash, mask in list(previous.masks.items()):
+            faces = gallery_cache.get(img_hash)
+            if faces is None or len(faces) != len(mask):
+                continue
+            self.masks[img_hash] = mask & added.kept(faces) if added is not None else self.kept(faces)
+            carried += 1
+        return carried
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+
+class ExcludeSet:
+    """Keeps `engine.exclude` in sync with the exclude_faces directory"""
+
+    def __init__(self, engine, exclude_faces_dir: str, poll_interval: float = 10):
+        """
+        Args:
+            engine: BaseEngine whose `exclude` snapshot is replaced on changes
+            exclude_faces_dir: Path to exclude faces directory
+            poll_interval: Seconds between directory checks in the watcher thread
+        """
+        self.engine = engine
+        self.exclude_faces_dir = exclude_faces_dir
+        self.poll_interval = poll_interval
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Build and swap in a new version if the directory (or the engine version) changed"""
+        with self._lock:
+            current = self.engine.exclude
+            files = file_fingerprints(list_exclude_images(self.exclude_faces_dir))
+            if files == current.files and current.namespace == self.engine.cache_namespace():
+                return False
+
+            start = time.perf_counter()
+            snapshot = self.engine.build_exclude(files)
+            carried = snapshot.carry_masks(current, self.engine.cache['gallery_encodings'])
+
+            # Encodings of removed or replaced files can never be looked up again
+            for path, fingerprint in current.files.items():
+                if files.get(path) != fingerprint:
+                    self.engine.forget_exclude(path, fingerprint)
+
+            self.engine.exclude = snapshot
+            logger.info(f"🚫 Exclude set {snapshot.version}: {len(files)} images, {len(snapshot)} faces "
+                        f"({carried} photo masks re-applied in {time.perf_counter() - start:.2f}s)")
+            return True
+
+    def loop(self):
+        while self.running:
+            time.sleep(self.poll_interval)
+            if not self.running:
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️  Exclude set refresh failed: {e}")
+
+    def start(self):
+        """Start the watcher thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
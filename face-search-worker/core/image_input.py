@@ -0,0 +1,66 @@
+"""
+Image Input
+An in-memory image ingested once: raw bytes, their digest and the decoded array
+"""
+
+import io
+import base64
+import hashlib
+from typing import Optional
+
+import numpy as np
+
+
+def decode_image_bytes(image_data: bytes) -> np.ndarray:
+    """Decode encoded image file contents (JPEG/PNG/...) to an RGB numpy array"""
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.array(image)
+
+
+class ImageInput:
+    """
+    Image payload passed through the engine API instead of a base64 string.
+
+    The digest (SHA-256 of the decoded bytes) is the cache key; the RGB array
+    is decoded on first use, so a selfie whose encoding is cached is never decoded.
+    """
+
+    __slots__ = ('data', 'digest', '_array')
+
+    def __init__(self, data: bytes, digest: Optional[str] = None):
+        """
+        Args:
+            data: Encoded image file contents (JPEG/PNG/...)
+            digest: Precomputed SHA-256 hex digest of `data`
+        """
+        self.data = data
+        self.digest = digest or hashlib.sha256(data).hexdigest()
+        self._array: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_base64(cls, value: str) -> 'ImageInput':
+        """Decode a base64 payload, with or without a data:image/...;base64, prefix"""
+        payload = value.partition(',')[2] or value
+        # Browsers sometimes drop the padding
+        return cls(base64.b64decode(payload + '=' * (-len(payload) % 4)))
+
+    @classmethod
+    def from_path(cls, path: str) -> 'ImageInput':
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    @property
+    def array(self) -> np.ndarray:
+        """RGB numpy array (decoded once)"""
+        if self._array is None:
+            self._array = decode_image_bytes(self.data)
+        return self._array
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"ImageInput({len(self.data)} bytes, {self.digest[:8]})"
@@ -4,14 +4,130 @@ Handles BullMQ job processing logic
 """
 
 import os
+import sys
 import time
-from typing import Dict, Any, List
+import asyncio
+import functools
+from typing import Dict, Any, List, Optional
 from bullmq import Job, custom_errors
 
+from core.affinity import StageAffinity
+from core.exclude_set import file_fingerprints
+from core.image_input import ImageInput
+from core.phase_metrics import PhaseMetrics
+from core.profiler import JobProfiler
+from core.search_history import SearchHistory
+from core.stage_costs import StageCostModel
 
-class WorkerPausedError(Exception):
-    """Exception raised when worker is paused - prevents job completion"""
-    pass
+
+def resolve_stages(data: Dict[str, Any], convocation_photos_dir: str) -> List[str]:
+    """
+    Stages a job searches: an explicit `stages` list, every stage directory
+    matching `stagePrefix` (e.g. "Day 1/Session 2/"), or the single `stage`
+    
+    Raises:
+        UnrecoverableError: `stages` is not a list
+        OSError: The stagePrefix parent directory could not be listed
+    """
+    if data.get('stages'):
+        if not isinstance(data['stages'], list):
+            raise custom_errors.UnrecoverableError("'stages' must be a list of stage names")
+        stages = [str(stage) for stage in data['stages']]
+    elif data.get('stagePrefix'):
+        prefix = str(data['stagePrefix']).replace('\\', '/')
+        parent, leaf = prefix.rsplit('/', 1) if '/' in prefix else ('', prefix)
+        parent_dir = os.path.join(convocation_photos_dir, parent)
+        stages = sorted(
+            f"{parent}/{name}" if parent else name
+            for name in (os.listdir(parent_dir) if os.path.isdir(parent_dir) else [])
+            if name.startswith(leaf) and os.path.isdir(os.path.join(parent_dir, name))
+        )
+    else:
+        stages = [data.get('stage')] if data.get('stage') else []
+    
+    # Never walk outside the photos directory
+    root = os.path.abspath(convocation_photos_dir)
+    return list(dict.fromkeys(
+        stage for stage in stages
+        if os.path.abspath(os.path.join(root, stage)).startswith(root + os.sep)
+    ))
+
+
+def scan_gallery(stages: List[str], convocation_photos_dir: str, logger) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Gallery images per stage; a photo reachable from several stages is listed once.
+    Each carries its file fingerprint (mtime_ns, size), part of every cache key, so a
+    photo replaced under the same name is never served its old embedding or score.
+    """
+    valid_extensions = ('.png', '.jpg', '.jpeg')
+    seen = set()
+    galleries: Dict[str, List[Dict[str, Any]]] = {}
+    for stage in stages:
+        gallery_dir = os.path.join(convocation_photos_dir, stage).replace('\\', '/')
+        gallery_images = galleries[stage] = []
+        if not os.path.exists(gallery_dir):
+            logger.warning(f"Gallery directory does not exist: {gallery_dir}")
+            continue
+        photo_ids = {}
+        for root, dirs, files in os.walk(gallery_dir):
+            for f in files:
+                if f.lower().endswith(valid_extensions):
+                    image_path = os.path.join(root, f)
+                    # Interned: the same ids recur in every job, result cache key and SearchResults
+                    image_id = sys.intern(os.path.relpath(image_path, convocation_photos_dir))
+                    if image_id not in seen:
+                        seen.add(image_id)
+                        photo_ids[image_path] = image_id
+        for image_path, fingerprint in file_fingerprints(list(photo_ids)).items():
+            gallery_images.append({'id': photo_ids[image_path], 'image': image_path, 'fingerprint': fingerprint})
+    return galleries
+
+
+async def delay_job(job: Job, token: str, delay: int):
+    """Move an active job back to the delayed set so it is picked up again after `delay` ms"""
+    delay_until_ms = int(time.time() * 1000) + delay
+    await job.scripts.moveToDelayed(job.id, delay_until_ms, delay, token)
+
+
+async def return_job_to_queue(job: Job, token: str):
+    """Move an active job back to the front of the wait list (used when draining on shutdown)"""
+    scripts = job.scripts
+    # Shipped with bullmq but not wrapped by its Python Scripts class
+    command = scripts.redisClient.register_script(scripts.getScript('moveJobFromActiveToWait-9.lua'))
+    keys = scripts.getKeys(['active', 'wait', 'stalled', 'paused', 'meta', 'limiter', 'prioritized', 'marker', 'events'])
+    result = await command(keys=keys, args=[job.id, token, scripts.toKey(job.id)])
+    if isinstance(result, int) and result < 0:
+        raise scripts.finishedErrors({
+            'code': result,
+            'jobId': job.id,
+            'command': 'moveJobFromActiveToWait',
+            'state': 'active'
+        })
+
+
+async def defer_to_warm_worker(job: Job, token: str, affinity: StageAffinity, convocation_photos_dir: str, logger) -> bool:
+    """
+    Leave a job for a cold stage to an idle worker that already has it cached.
+    Runs before the job is processed, so a deferred job is only moved to the
+    delayed set and never reported as failed.
+    
+    Returns:
+        True when the job was moved to the delayed set
+    """
+    try:
+        stages = resolve_stages(job.data, convocation_photos_dir)
+        if len(stages) != 1:
+            # Invalid or unreadable stages fail in process_job
+            return False
+        preferred = affinity.preferred_worker(stages[0], job.timestamp)
+        if not preferred:
+            return False
+        await delay_job(job, token, affinity.defer_ms)
+    except Exception as e:
+        logger.warning(f"⚠️  Affinity deferral failed, processing job {job.id} here: {e}")
+        return False
+    logger.info(f"🧲 {stages[0]} is warm on {preferred}, deferred job {job.id}")
+    return True
 
 
 async def process_job(
@@ -21,7 +137,11 @@ async def process_job(
     redis_client,
     worker_id: str,
     worker_stats: Dict[str, Any],
-    exclude_faces_dir: str,
+    phase_metrics: PhaseMetrics,
+    profiler: Optional[JobProfiler],
+    affinity: Optional[StageAffinity],
+    stage_costs: Optional[StageCostModel],
+    search_history: Optional[SearchHistory],
     convocation_photos_dir: str,
     logger
 ) -> List[Dict[str, float]] | None:
@@ -35,86 +155,137 @@ async def process_job(
         redis_client: Redis client
         worker_id: Unique worker ID
         worker_stats: Worker statistics dict
-        exclude_faces_dir: Path to exclude faces directory
+        phase_metrics: Phase timing aggregator (shared with the engine)
+        profiler: Samples jobs for cProfile/tracemalloc capture (None disables)
+        affinity: Warm-stage tracking, marked after the job (None disables)
+        stage_costs: Per-stage cost estimates published for producers (None disables)
+        search_history: Stored per-job results for `previousJobId` searches (None disables)
         logger: Logger instance
     
     Returns:
         List of {'id': str, 'similarity': float} sorted by similarity
     """
-    # Check if worker is paused - delay and retry
-    if redis_client and redis_client.get(f'worker:{worker_id}:paused') == '1':
-        logger.info(f"⏸️  Worker is paused, re-queueing job {job.id}")
-        # Move job to delayed state - it will be picked up again after the delay
-        delay = 5000  # 5 seconds
-        delay_until_ms = int(time.time() * 1000) + delay  # 5 seconds from now
-        await job.scripts.moveToDelayed(job.id, delay_until_ms, delay, token)
-        # Raise custom exception to prevent job from completing
-        # BullMQ will not mark the job as completed when this exception is raised
-        raise WorkerPausedError("Worker is paused - job delayed for retry")
+    job_start = time.perf_counter()
+    phase_metrics.begin_job()
+    if job.timestamp:
+        phase_metrics.record('queue_wait', max(0.0, time.time() - job.timestamp / 1000))
     
     worker_stats['current_job'] = job.id
+    profile_session = profiler.maybe_start(job.id) if profiler else None
     
     try:
         data = job.data
         selfie_image = data.get('image')
         uid = data.get('uid')
-        stage = data.get('stage')
+        # Lists the share for stagePrefix jobs; errors fail the job like any other
+        stages = resolve_stages(data, convocation_photos_dir)
         
         logger.info(f"\n{'='*60}")
         logger.info(f"📋 Processing Job: {job.id}")
         logger.info(f"👤 User: {uid}")
-        logger.info(f"📍 Stage: {stage}")
+        logger.info(f"📍 Stage{'s' if len(stages) != 1 else ''}: {', '.join(stages) or '(none)'}")
         logger.info(f"🔧 Engine: {engine.name}")
         logger.info(f"{'='*60}\n")
         
         if not selfie_image:
             raise ValueError("No image provided")
+        if not stages:
+            raise ValueError("No stage provided")
         
-        # Get excluded face images from exclude_faces directory
-        exclude_images = []
-        if os.path.exists(exclude_faces_dir):
-            valid_extensions = ('.png', '.jpg', '.jpeg')
-            for root, dirs, files in os.walk(exclude_faces_dir):
-                for f in files:
-                    if f.lower().endswith(valid_extensions):
-                        exclude_images.append(os.path.join(root, f))
+        # Decoded and hashed once; the engine keys its caches on the digest
+        selfie = ImageInput.from_base64(selfie_image)
         
-        logger.info(f"📂 Found {len(exclude_images)} exclude faces")
+        # Loaded and kept current by core.exclude_set.ExcludeSet; one version for the whole job
+        exclude = engine.exclude
+        logger.info(f"🚫 Exclude set {exclude.version}: {len(exclude.files)} images")
         
-        # Fetch gallery images from convocation_photos_dir/stage
-        # gallery_dir = os.path.join(convocation_photos_dir, "").replace('\\', '/')   # testing: use all images in gallery
-        gallery_dir = os.path.join(convocation_photos_dir, stage).replace('\\', '/')
-        gallery_images = []
-        valid_extensions = ('.png', '.jpg', '.jpeg')
-        if os.path.exists(gallery_dir):
-            for root, dirs, files in os.walk(gallery_dir):
-                for f in files:
-                    if f.lower().endswith(valid_extensions):
-                        image_path = os.path.join(root, f)
-                        gallery_images.append({'id': os.path.relpath(image_path, convocation_photos_dir), 'image': image_path})
-        else:
-            logger.warning(f"Gallery directory does not exist: {gallery_dir}")
+        with phase_metrics.span('directory_scan'):
+            # Fetch gallery images from convocation_photos_dir/<stage> for every stage
+            galleries = scan_gallery(stages, convocation_photos_dir, logger)
+            gallery_images = [item for stage_images in galleries.values() for item in stage_images]
+        
+        logger.info(f"🖼️  Processing {len(gallery_images)} gallery images from {len(stages)} stage(s)")
+        
+        encoded_before = engine.cache_stats['gallery_encodings']['misses']
         
-        logger.info(f"🖼️  Processing {len(gallery_images)} gallery images")
+        # A repeat of an earlier job only scores the photos added or replaced since
+        history_context = None
+        fingerprints = {}
+        previous = None
+        if search_history is not None:
+            history_context = SearchHistory.context(engine.cache_namespace(), selfie.digest, exclude.version)
+            fingerprints = {item['id']: item['fingerprint'] for item in gallery_images}
+            if data.get('previousJobId'):
+                try:
+                    previous = search_history.load(str(data['previousJobId']), history_context, fingerprints)
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to load results of job {data['previousJobId']}: {e}")
         
-        # Perform face search
-        results = engine.search_faces(
-            selfie_base64=selfie_image,
+        # Perform face search (one selfie encoding scored against every stage) in a thread,
+        # so the event loop keeps renewing locks, running other jobs and draining meanwhile
+        search = functools.partial(
+            engine.search,
+            selfie=selfie,
             gallery_images=gallery_images,
-            exclude_images=exclude_images
+            exclude=exclude,
+            previous=previous,
+            profile_session=profile_session
         )
+        if profile_session is not None:
+            search = profile_session.wrap(search)
+        search_results = await asyncio.to_thread(search)
+        with phase_metrics.span('result_serialization'):
+            results = search_results.to_list()
         
-        logger.info(f"\n✅ Job completed: {len(results)} matches found\n")
+        if search_history is not None:
+            try:
+                search_history.save(job.id, search_results, history_context, fingerprints)  # type: ignore[arg-type]
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to store results for later searches: {e}")
+        
+        phase_metrics.record('job_total', time.perf_counter() - job_start)
+        worker_stats['last_job_phases'] = phase_metrics.end_job()
+        logger.info(f"\n✅ Job completed: {len(results)} matches found")
+        logger.info(f"⏱️  {PhaseMetrics.format_totals(worker_stats['last_job_phases'])}\n")
+        
+        if affinity:
+            for stage, stage_images in galleries.items():
+                if stage_images:
+                    affinity.mark_warm(stage)
+        
+        gallery_seconds = worker_stats['last_job_phases'].get('gallery')
+        if stage_costs and gallery_seconds:
+            try:
+                stage_costs.record(
+                    galleries,
+                    encoded=engine.cache_stats['gallery_encodings']['misses'] - encoded_before,
+                    gallery_seconds=gallery_seconds,
+                    job_seconds=worker_stats['last_job_phases']['job_total']
+                )
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to publish stage costs: {e}")
         
         worker_stats['jobs_processed'] += 1
+        worker_stats['images_processed'] += len(gallery_images)
+        if gallery_images and gallery_seconds:
+            worker_stats['images_per_sec'] = round(len(gallery_images) / gallery_seconds, 1)
         worker_stats['current_job'] = None
         
         return results
         
     except Exception as e:
+        phase_metrics.record('job_total', time.perf_counter() - job_start)
+        worker_stats['last_job_phases'] = phase_metrics.end_job()
         worker_stats['jobs_failed'] += 1
         worker_stats['current_job'] = None
         error_message = str(e)
         logger.error(f"\n❌ Job failed: {error_message}\n")
         # Re-raise with the error message so BullMQ can capture it as failedReason
         raise custom_errors.UnrecoverableError(error_message)
+    
+    finally:
+        if profile_session is not None:
+            try:
+                await asyncio.to_thread(profiler.finish, profile_session)  # type: ignore[union-attr]
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to save profile for job {job.id}: {e}")
@@ -0,0 +1,153 @@
+"""
+Metrics Server
+Optional Prometheus-compatible /metrics endpoint served from a stdlib HTTP thread
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from core.phase_metrics import HISTOGRAM_BUCKETS
+
+PREFIX = 'face_worker'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class MetricsServer:
+    """Renders worker state in the Prometheus text exposition format"""
+
+    def __init__(self, manager, engine=None, host: str = '0.0.0.0', port: int = 9400):
+        """
+        Args:
+            manager: WorkerManager (stats, phase metrics, latest system metrics)
+            engine: Engine instance for cache statistics
+            host: Interface to bind
+            port: Port to listen on
+        """
+        self.manager = manager
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    # --- Exposition -----------------------------------------------------------------
+
+    def render(self) -> str:
+        """Build the full exposition text"""
+        lines: List[str] = []
+        base = {'worker_id': self.manager.worker_id, 'engine': self.manager.engine_name}
+        stats = self.manager.worker_stats
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+            for suffix, labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f'{PREFIX}_{name}{suffix}{_format_labels({**base, **labels})} {float(value)}')
+
+        metric('jobs_processed_total', 'counter', 'Jobs completed successfully',
+               [('', {}, stats['jobs_processed'])])
+        metric('jobs_failed_total', 'counter', 'Jobs that raised an error',
+               [('', {}, stats['jobs_failed'])])
+        metric('images_processed_total', 'counter', 'Gallery images scored across all jobs',
+               [('', {}, stats.get('images_processed', 0))])
+        metric('images_per_second', 'gauge', 'Gallery throughput of the most recent job',
+               [('', {}, stats.get('images_per_sec'))])
+        metric('busy', 'gauge', 'Whether a job is currently being processed',
+               [('', {}, 1 if stats['current_job'] else 0)])
+        metric('uptime_seconds', 'gauge', 'Seconds since the worker started',
+               [('', {}, self.manager.uptime())])
+
+        # Phase latency histograms
+        samples = []
+        for phase, (cumulative, total, count) in self.manager.phase_metrics.histograms().items():
+            for bound, bucket_count in zip(HISTOGRAM_BUCKETS, cumulative):
+                samples.append(('_bucket', {'phase': phase, 'le': bound}, bucket_count))
+            samples.append(('_bucket', {'phase': phase, 'le': '+Inf'}, count))
+            samples.append(('_sum', {'phase': phase}, total))
+            samples.append(('_count', {'phase': phase}, count))
+        metric('phase_duration_seconds', 'histogram', 'Duration of job and per-image phases', samples)
+
+        # Engine cache statistics
+        if self.engine is not None:
+            cache_stats = {section: dict(counts) for section, counts in self.engine.cache_stats.items()}
+            metric('cache_hits_total', 'counter', 'Embedding cache hits', [
+                ('', {'cache': section}, counts['hits']) for section, counts in cache_stats.items()
+            ])
+            metric('cache_misses_total', 'counter', 'Embedding cache misses', [
+                ('', {'cache': section}, counts['misses']) for section, counts in cache_stats.items()
+            ])
+            metric('cache_hit_ratio', 'gauge', 'Embedding cache hit ratio since start', [
+                ('', {'cache': section}, counts['hits'] / (counts['hits'] + counts['misses']))
+                for section, counts in cache_stats.items() if counts['hits'] + counts['misses']
+            ])
+            metric('cache_entries', 'gauge', 'Entries held in the embedding cache', [
+                ('', {'cache': section}, len(entries)) for section, entries in self.engine.cache.items()
+            ])
+
+        # System gauges from the latest heartbeat sample (never sampled on scrape)
+        system = self.manager.last_metrics
+        if system:
+            gpu = system.get('gpu') or {}
+            metric('cpu_percent', 'gauge', 'Host CPU utilisation', [('', {}, system.get('cpu_percent'))])
+            metric('ram_percent', 'gauge', 'Host RAM utilisation', [('', {}, system['ram'].get('percent'))])
+            metric('ram_available_bytes', 'gauge', 'Host RAM available',
+                   [('', {}, system['ram'].get('available_gb', 0) * 1024 ** 3)])
+            metric('gpu_utilization_percent', 'gauge', 'GPU utilisation', [('', {}, gpu.get('utilization'))])
+            metric('gpu_temperature_celsius', 'gauge', 'GPU temperature', [('', {}, gpu.get('temperature'))])
+            metric('gpu_memory_used_bytes', 'gauge', 'GPU memory used', [
+                ('', {}, gpu['memory_used_mb'] * 1024 ** 2 if gpu.get('memory_used_mb') is not None else None)
+            ])
+            metric('gpu_memory_total_bytes', 'gauge', 'GPU memory total', [
+                ('', {}, gpu['memory_total_mb'] * 1024 ** 2 if gpu.get('memory_total_mb') is not None else None)
+            ])
+
+        return '\n'.join(lines) + '\n'
+
+    # --- HTTP server ----------------------------------------------------------------
+
+    def start(self):
+        """Start serving /metrics on a daemon thread"""
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                try:
+                    body = metrics_server.render().encode('utf-8')
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the HTTP server"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,200 @@
+"""
+Pause Control
+Suspends job fetching while a worker is paused (driven by Redis pub/sub) or draining
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+import redis as redis_lib
+from bullmq import Worker
+
+from core.job_processor import return_job_to_queue
+
+logger = logging.getLogger(__name__)
+
+
+def paused_key(worker_id: str) -> str:
+    """Durable pause flag ('1' while paused), also read by the dashboard and affinity"""
+    return f'worker:{worker_id}:paused'
+
+
+def control_channel(worker_id: str) -> str:
+    """Pub/sub channel carrying 'pause' / 'resume' for one worker"""
+    return f'worker:{worker_id}:control'
+
+
+class PauseControl:
+    """
+    Tracks the pause state of one worker
+
+    The flag key is read once on (re)subscribe and every RESYNC_INTERVAL
+    seconds as a safety net; changes normally arrive instantly as pub/sub
+    messages. Coroutines wait on an asyncio event that is set while running.
+    """
+
+    RESYNC_INTERVAL = 60  # seconds between flag reads when no message arrives
+
+    def __init__(self, redis_client: redis_lib.Redis, worker_id: str):
+        """
+        Args:
+            redis_client: Redis client (decode_responses=True)
+            worker_id: ID of this worker
+        """
+        self.redis_client = redis_client
+        self.worker_id = worker_id
+        self.paused = False
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._resumed: Optional[asyncio.Event] = None
+        self._released = False
+        self._last_sync = 0.0
+
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    # --- State ------------------------------------------------------------------------
+
+    def _sync(self):
+        """Read the durable flag (covers messages missed while disconnected)"""
+        self._set(self.redis_client.get(paused_key(self.worker_id)) == '1')
+        self._last_sync = time.monotonic()
+
+    def _set(self, paused: bool):
+        if paused != self.paused:
+            logger.info("⏸️  Worker paused - no new jobs will be fetched" if paused else "▶️  Worker resumed")
+        self.paused = paused
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._update_event)
+
+    def _update_event(self):
+        if self.paused and not self._released:
+            self._resumed.clear()  # type: ignore[union-attr]
+        else:
+            self._resumed.set()  # type: ignore[union-attr]
+
+    async def wait_until_resumed(self):
+        """Return immediately while running; block while paused"""
+        if self._resumed is not None:
+            await self._resumed.wait()
+
+    def release(self):
+        """Unblock every waiter for good (worker shutdown)"""
+        self._released = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._update_event)
+
+    # --- Listener ---------------------------------------------------------------------
+
+    def listen(self):
+        pubsub = None
+        while self.running:
+            try:
+                if pubsub is None:
+                    pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(control_channel(self.worker_id))
+                    self._sync()  # after subscribing, so no change falls in between
+                message = pubsub.get_message(timeout=1.0)
+                if message and message['data'] in ('pause', 'resume'):
+                    self._set(message['data'] == 'pause')
+                elif time.monotonic() - self._last_sync > self.RESYNC_INTERVAL:
+                    self._sync()
+            except redis_lib.RedisError as e:
+                logger.warning(f"⚠️  Pause listener error: {e}")
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except redis_lib.RedisError:
+                        pass
+                pubsub = None
+                time.sleep(1)
+        if pubsub is not None:
+            pubsub.close()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Read the current state and start listening (call from the event loop)"""
+        self._loop = loop
+        self._resumed = asyncio.Event()
+        self._sync()
+        self._update_event()
+        self.running = True
+        self.thread = threading.Thread(target=self.listen, name='pause-listener', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.release()
+
+
+class PausableWorker(Worker):
+    """
+    BullMQ worker that stops fetching jobs while paused (active jobs finish
+    normally), can drain, and can hand a fetched job back before processing it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        processor,
+        opts,
+        pause_control: PauseControl,
+        defer: Optional[Callable[..., Awaitable[bool]]] = None
+    ):
+        """
+        Args:
+            defer: `await defer(job, token)` before processing; True means the
+                   job was moved back to the queue and is not processed here
+        """
+        self.pause_control = pause_control
+        self.defer = defer
+        super().__init__(name, processor, opts)
+
+    async def getNextJob(self, token: str):
+        # Waiting here instead of taking and re-delaying jobs keeps the queue order intact
+        await self.pause_control.wait_until_resumed()
+        if self.closing:
+            return None
+        return await super().getNextJob(token)
+
+    async def processJob(self, job, token: str):
+        if self.closing:
+            # Fetched by a request that was already in flight when the drain started
+            await return_job_to_queue(job, token)
+            return
+        if self.defer is not None and not job.deferredFailure and await self.defer(job, token):
+            # No longer active, so BullMQ must not complete or fail it
+            return
+        return await super().processJob(job, token)
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Stop fetching, give active jobs `timeout` seconds to finish, then hand
+        the rest back to the front of the queue
+
+        Returns:
+            Number of jobs returned to the queue
+        """
+        self.closing = True
+        self.pause_control.release()
+        pending = [task for task in self.processing if not task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+        # Jobs still running are abandoned; stop BullMQ from completing or failing them later
+        self.forceClosing = True
+        returned = 0
+        for job, token in list(self.jobs):
+            try:
+                await return_job_to_queue(job, token)
+                returned += 1
+                logger.info(f"↩️  Returned job {job.id} to the queue")
+            except Exception as e:
+                logger.warning(f"⚠️  Could not return job {job.id} to the queue: {e}")
+        return returned
+
+    async def close(self, force: bool = False):
+        self.pause_control.release()
+        await super().close(force)
@@ -0,0 +1,154 @@
+"""
+Phase Metrics
+Timing spans for job phases aggregated into rolling latency histograms
+"""
+
+import time
+import bisect
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Job-level phases (wall clock, one sample per job)
+JOB_PHASES = (
+    'queue_wait',
+    'directory_scan',
+    'selfie_encode',
+    'exclusion_load',
+    'gallery',
+    'result_serialization',
+    'job_total',
+)
+
+# Per-image phases (one sample per gallery image, recorded from engine threads)
+IMAGE_PHASES = (
+    'image_load',
+    'gallery_encode',
+    'scoring',
+)
+
+# Cumulative histogram bucket upper bounds in seconds (Prometheus style, +Inf implied)
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class PhaseMetrics:
+    """
+    Thread-safe rolling latency samples per phase
+
+    Per-job totals live in a context variable, so concurrent jobs (asyncio
+    tasks and the threads they run their search in) each sum their own spans.
+    """
+
+    def __init__(self, window: int = 1000):
+        """
+        Args:
+            window: Number of most recent samples kept per phase
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._sums: Dict[str, float] = {}
+        self._buckets: Dict[str, List[int]] = {}
+        self._job_totals: contextvars.ContextVar[Optional[Dict[str, float]]] = \
+            contextvars.ContextVar('phase_job_totals', default=None)
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float):
+        """Record one duration sample for a phase"""
+        with self._lock:
+            samples = self._samples.get(phase)
+            if samples is None:
+                samples = self._samples[phase] = deque(maxlen=self.window)
+                self._counts[phase] = 0
+                self._sums[phase] = 0.0
+                self._buckets[phase] = [0] * len(HISTOGRAM_BUCKETS)
+            samples.append(seconds)
+            bucket = bisect.bisect_left(HISTOGRAM_BUCKETS, seconds)
+            if bucket < len(HISTOGRAM_BUCKETS):
+                self._buckets[phase][bucket] += 1
+            self._counts[phase] += 1
+            self._sums[phase] += seconds
+            job_totals = self._job_totals.get()
+            if job_totals is not None:
+                job_totals[phase] = job_totals.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def span(self, phase: str):
+        """Time the enclosed block and record it under `phase`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def begin_job(self):
+        """Start per-job phase totals for the current context (the job's task)"""
+        self._job_totals.set({})
+
+    def end_job(self) -> Dict[str, float]:
+        """
+        Get the phase totals accumulated since `begin_job`
+
+        Per-image phases are summed across engine threads, so they are
+        thread-seconds rather than wall time.
+        """
+        job_totals = self._job_totals.get()
+        with self._lock:
+            return dict(job_totals) if job_totals is not None else {}
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get rolling percentiles for every phase seen so far
+
+        Returns:
+            {phase: {'count', 'p50_ms', 'p95_ms', 'p99_ms'}}
+        """
+        with self._lock:
+            samples = {phase: list(values) for phase, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        snapshot = {}
+        for phase, values in samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+            snapshot[phase] = {
+                'count': counts[phase],
+                'p50_ms': round(float(p50), 2),
+                'p95_ms': round(float(p95), 2),
+                'p99_ms': round(float(p99), 2),
+            }
+        return snapshot
+
+    def total_seconds(self, phase: str) -> float:
+        """Cumulative seconds recorded under `phase` since start"""
+        with self._lock:
+            return self._sums.get(phase, 0.0)
+
+    def histograms(self) -> Dict[str, Tuple[List[int], float, int]]:
+        """
+        Get cumulative (since start) histograms for every phase
+        
+        Returns:
+            {phase: (cumulative counts per HISTOGRAM_BUCKETS bound, sum of seconds, count)}
+        """
+        with self._lock:
+            raw = {phase: (list(buckets), self._sums[phase], self._counts[phase]) for phase, buckets in self._buckets.items()}
+
+        histograms = {}
+        for phase, (buckets, total, count) in raw.items():
+            cumulative, running = [], 0
+            for bucket_count in buckets:
+                running += bucket_count
+                cumulative.append(running)
+            histograms[phase] = (cumulative, total, count)
+        return histograms
+
+    @staticmethod
+    def format_totals(totals: Dict[str, float]) -> str:
+        """Render phase totals as a compact log line"""
+        ordered = [p for p in JOB_PHASES + IMAGE_PHASES if p in totals]
+        ordered += sorted(p for p in totals if p not in ordered)
+        return ', '.join(f"{phase}={totals[phase] * 1000:.0f}ms" for phase in ordered)
@@ -0,0 +1,111 @@
+"""
+Image Prefetcher
+Reads upcoming gallery files into memory ahead of the decode threads, so
+remote (network share) latency overlaps with encoding
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Kernel read-ahead hints (POSIX only; Windows reads without them)
+_FADVISE = hasattr(os, 'posix_fadvise')
+
+
+class _Entry:
+    __slots__ = ('ready', 'data')
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.data: Optional[bytes] = None
+
+
+class ImagePrefetcher:
+    """
+    Raw file contents read in list order by a few I/O threads into a buffer
+    bounded by `max_bytes`. Consumers `take()` a path's bytes; a path the
+    readers have not reached yet is left to the consumer to read itself.
+    """
+
+    def __init__(self, paths: List[str], io_threads: int = 4, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            paths: Files in the order they will be consumed
+            io_threads: Concurrent reads (several requests in flight hide per-file latency)
+            max_bytes: Buffered bytes not yet taken above which readers pause
+        """
+        self.paths = paths
+        self.max_bytes = max_bytes
+        self._owned: Set[str] = set(paths)
+        self._next = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._claimed: Set[str] = set()
+        self._buffered = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.threads = [
+            threading.Thread(target=self._reader, name=f'prefetch-{index}', daemon=True)
+            for index in range(max(1, min(io_threads, len(paths))))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    @staticmethod
+    def _read(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                if _FADVISE:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                return f.read()
+        except OSError as e:
+            # The consumer reads it again and reports the error with the image
+            logger.debug(f"Prefetch failed for {path}: {e}")
+            return None
+
+    def _reader(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._buffered >= self.max_bytes:
+                    self._cond.wait()
+                if self._closed or self._next >= len(self.paths):
+                    return
+                path = self.paths[self._next]
+                self._next += 1
+                if path in self._claimed or path in self._entries:
+                    continue
+                entry = self._entries[path] = _Entry()
+
+            data = self._read(path)
+            with self._cond:
+                entry.data = data
+                self._buffered += len(data) if data else 0
+            entry.ready.set()
+
+    def owns(self, path: str) -> bool:
+        return path in self._owned
+
+    def take(self, path: str) -> Optional[bytes]:
+        """File contents, waiting if a read is in progress; None if the caller should read it"""
+        with self._cond:
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                self._claimed.add(path)
+                return None
+        entry.ready.wait()
+        with self._cond:
+            self._buffered -= len(entry.data) if entry.data else 0
+            self._cond.notify_all()
+        return entry.data
+
+    def close(self):
+        """Stop reading and drop anything not taken"""
+        with self._cond:
+            self._closed = True
+            self._entries.clear()
+            self._buffered = 0
+            self._cond.notify_all()
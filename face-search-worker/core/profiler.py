@@ -0,0 +1,202 @@
+"""
+Job Profiler
+Opt-in cProfile + tracemalloc capture for a sampled fraction of jobs
+"""
+
+import io
+import os
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc is process-wide: started with the first concurrent session, stopped with the last
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_sessions = 0
+_tracemalloc_started = False
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_sessions, _tracemalloc_started
+    with _tracemalloc_lock:
+        if not _tracemalloc_sessions and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            _tracemalloc_started = True
+        _tracemalloc_sessions += 1
+    tracemalloc.reset_peak()
+
+
+def _release_tracemalloc():
+    global _tracemalloc_sessions, _tracemalloc_started
+    with _tracemalloc_lock:
+        _tracemalloc_sessions -= 1
+        if not _tracemalloc_sessions and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+
+
+class ProfileSession:
+    """
+    Profiles one job's search thread and engine pool threads (whatever runs
+    through `wrap`); the event loop, shared by concurrent jobs, is not profiled
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _thread_profile(self) -> cProfile.Profile:
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self.profiles.append(profile)
+        return profile
+
+    def wrap(self, fn: Callable) -> Callable:
+        """Wrap a task so it is profiled on whichever pool thread runs it"""
+        def profiled(*args, **kwargs):
+            profile = self._thread_profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active on this thread
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return profiled
+
+    def start(self):
+        _acquire_tracemalloc()
+
+    def stop(self):
+        try:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.current_bytes, self.peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            _release_tracemalloc()
+        self.duration = time.time() - self.started_at
+
+    def stats(self) -> pstats.Stats:
+        """Merge the per-thread profiles into one Stats object"""
+        stats = pstats.Stats()
+        for profile in self.profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # Profile that never ran any code has no stats
+                pass
+        return stats
+
+
+class JobProfiler:
+    """Decides which jobs to profile and stores their reports"""
+
+    def __init__(
+        self,
+        worker_id: str,
+        redis_client=None,
+        sample_rate: float = 0.0,
+        output_dir: Optional[str] = 'profiles',
+        redis_ttl: int = 0,
+        top_n: int = 40
+    ):
+        """
+        Args:
+            worker_id: Worker ID used to tag reports
+            redis_client: Redis client for the toggle keys and report storage
+            sample_rate: Default fraction of jobs to profile (0 disables)
+            output_dir: Directory for .pstats/.txt reports (None to skip disk)
+            redis_ttl: Seconds to keep text reports in Redis (0 to skip Redis)
+            top_n: Number of functions / allocation sites in the text report
+        """
+        self.worker_id = worker_id
+        self.redis_client = redis_client
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.redis_ttl = redis_ttl
+        self.top_n = top_n
+
+    def current_sample_rate(self) -> float:
+        """
+        Effective sample rate: `worker:{id}:profile` overrides `workers:profile`,
+        which overrides the configured default
+        """
+        if self.redis_client:
+            try:
+                worker_rate, global_rate = self.redis_client.mget(
+                    f'worker:{self.worker_id}:profile', 'workers:profile'
+                )
+                override = worker_rate if worker_rate is not None else global_rate
+                if override is not None:
+                    return float(override)
+            except Exception as e:
+                logger.debug(f"Profile toggle lookup failed: {e}")
+        return self.sample_rate
+
+    def maybe_start(self, job_id: str) -> Optional[ProfileSession]:
+        """Start a profile session if this job is sampled"""
+        rate = self.current_sample_rate()
+        if rate <= 0 or random.random() >= rate:
+            return None
+
+        session = ProfileSession(job_id)
+        try:
+            session.start()
+        except Exception as e:
+            logger.warning(f"Could not start profiler: {e}")
+            return None
+        logger.info(f"🔬 Profiling job {job_id}")
+        return session
+
+    def finish(self, session: ProfileSession):
+        """Stop a session and persist its report (blocking file and Redis writes - run off the event loop)"""
+        session.stop()
+        report = self.render(session)
+
+        if self.output_dir:
+            directory = os.path.join(self.output_dir, self.worker_id)
+            os.makedirs(directory, exist_ok=True)
+            base_path = os.path.join(directory, str(session.job_id))
+            session.stats().dump_stats(base_path + '.pstats')
+            with open(base_path + '.txt', 'w', encoding='utf-8') as f:
+                f.write(report)
+            logger.info(f"🔬 Profile saved: {base_path}.txt")
+
+        if self.redis_client and self.redis_ttl > 0:
+            try:
+                self.redis_client.set(f'profile:{self.worker_id}:{session.job_id}', report, ex=self.redis_ttl)
+            except Exception as e:
+                logger.warning(f"Failed to store profile in Redis: {e}")
+
+    def render(self, session: ProfileSession) -> str:
+        """Human-readable report: hottest functions and top allocation sites"""
+        out = io.StringIO()
+        out.write(f"Job: {session.job_id}\n")
+        out.write(f"Worker: {self.worker_id}\n")
+        out.write(f"Duration: {session.duration:.3f}s\n")
+        out.write(f"Threads profiled: {len(session.profiles)}\n")
+        out.write(f"Traced memory: current {session.current_bytes / 1024 ** 2:.1f}MB, "
+                  f"peak {session.peak_bytes / 1024 ** 2:.1f}MB\n")
+
+        out.write(f"\n{'=' * 30} cProfile (cumulative) {'=' * 30}\n")
+        stats = session.stats()
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+
+        out.write(f"\n{'=' * 30} tracemalloc (top allocations) {'=' * 30}\n")
+        for stat in session.snapshot.statistics('lineno')[:self.top_n]:
+            out.write(f"{stat}\n")
+
+        return out.getvalue()
@@ -0,0 +1,87 @@
+"""
+Result Cache
+Short-lived cache of finished search results so repeated searches return instantly
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from core.search_results import SearchResults
+
+
+class ResultCache:
+    """Bounded TTL cache of finished SearchResults"""
+
+    def __init__(self, max_entries: int = 64, ttl: float = 300, bucket_size: float = 0.02):
+        """
+        Args:
+            max_entries: Most results held at once (least recently used are evicted)
+            ttl: Seconds a result stays valid
+            bucket_size: Quantization step for selfie embeddings; near-identical
+                         selfies that land in the same bucket share results
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bucket_size = bucket_size
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (expires_at, results)
+        self._lock = threading.Lock()
+
+    def embedding_bucket(self, embedding) -> bytes:
+        """Quantized selfie embedding"""
+        quantized = np.round(np.asarray(embedding, dtype=np.float64) / self.bucket_size).astype(np.int32)
+        return quantized.tobytes()
+
+    def make_key(
+        self,
+        namespace: str,
+        selfie_embedding,
+        gallery_images: Iterable[Dict[str, Any]],
+        exclude_version: str
+    ) -> str:
+        """
+        Key over (embedding bucket, gallery photos, exclude set version, engine version);
+        a photo's file fingerprint (mtime_ns, size) is part of it when the item has one,
+        so replacing a photo under the same name misses instead of returning its old score
+        """
+        digest = hashlib.sha256(namespace.encode())
+        digest.update(self.embedding_bucket(selfie_embedding))
+        for item in gallery_images:
+            digest.update(item['id'].encode())
+            fingerprint = item.get('fingerprint')
+            if fingerprint is not None:
+                digest.update(b'|%d|%d' % fingerprint)
+            digest.update(b'\0')
+        digest.update(b'\1')
+        digest.update(exclude_version.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[SearchResults]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def put(self, key: str, results: SearchResults):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,81 @@
+"""
+Search History
+Every job's full score vector (and the fingerprint of each photo it scored)
+kept in Redis, so a repeated search over a stage that gained or replaced photos
+only scores those photos
+"""
+
+import json
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+from core.exclude_set import Fingerprint
+from core.search_results import SearchResults
+
+logger = logging.getLogger(__name__)
+
+
+class SearchHistory:
+    """Stored SearchResults per job id, reusable by later jobs with the same selfie, model and exclude set"""
+
+    def __init__(self, redis_client, ttl: int = 24 * 3600):
+        """
+        Args:
+            redis_client: Redis client created with decode_responses=False
+            ttl: Seconds a job's results stay reusable
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    @staticmethod
+    def key(job_id: str) -> str:
+        return f'search_results:{job_id}'
+
+    @staticmethod
+    def context(namespace: str, selfie_digest: str, exclude_version: str) -> Dict[str, str]:
+        """What must match for stored scores to be reused: engine version, selfie and exclude set version"""
+        return {'namespace': namespace, 'selfie': selfie_digest, 'exclude': exclude_version}
+
+    def save(self, job_id: str, results: SearchResults, context: Dict[str, str], fingerprints: Dict[str, Fingerprint]):
+        """
+        Args:
+            fingerprints: Photo id -> (mtime_ns, size) of the file that was scored
+        """
+        missing = (0, 0)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(self.key(job_id), mapping={
+            'context': json.dumps(context, sort_keys=True),
+            'ids': '\n'.join(results.ids),
+            'scores': results.scores.astype('<f8').tobytes(),
+            'fingerprints': np.array([fingerprints.get(photo_id, missing) for photo_id in results.ids], dtype='<i8').tobytes(),
+        })
+        pipe.expire(self.key(job_id), self.ttl)
+        pipe.execute()
+
+    def load(self, job_id: str, context: Dict[str, str], fingerprints: Dict[str, Fingerprint]) -> Optional[SearchResults]:
+        """
+        The job's results, or None when they expired or were produced for a
+        different context. Photos whose file changed since (another fingerprint
+        than in `fingerprints`) come back unscored, so they are scored again.
+        """
+        stored_context, ids, scores, stored_fingerprints = self.redis_client.hmget(
+            self.key(job_id), ['context', 'ids', 'scores', 'fingerprints']
+        )
+        if stored_context is None or stored_fingerprints is None:
+            logger.info(f"No stored results for job {job_id}, scoring every photo")
+            return None
+        if json.loads(stored_context) != context:
+            logger.info(f"Job {job_id} used a different selfie, model or exclude set, scoring every photo")
+            return None
+        ids = ids.decode().split('\n') if ids else []
+        scores = np.frombuffer(scores, dtype='<f8').astype(np.float64)
+        
+        stored_fingerprints = np.frombuffer(stored_fingerprints, dtype='<i8').reshape(-1, 2)
+        current = np.array([fingerprints.get(photo_id, (0, 0)) for photo_id in ids], dtype=np.int64).reshape(-1, 2)
+        changed = (stored_fingerprints != current).any(axis=1)
+        if changed.any():
+            logger.info(f"{int(changed.sum())} photos changed since job {job_id}, scoring them again")
+            scores[changed] = np.nan
+        return SearchResults(ids, scores)
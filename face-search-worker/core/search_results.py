@@ -0,0 +1,71 @@
+"""
+Search Results
+Per-job similarity scores kept as one NumPy array aligned with the gallery's photo ids
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class SearchResults:
+    """
+    Similarity per gallery photo, in gallery order. NaN marks a photo that was
+    not scored (failed to process); -1.0 / 0.0 keep their engine meaning
+    (no face / only excluded faces). Result dicts are only built by `to_list`.
+    """
+
+    __slots__ = ('ids', 'scores')
+
+    def __init__(self, ids: List[str], scores: Optional[np.ndarray] = None):
+        """
+        Args:
+            ids: Photo ids (shared with the gallery listing, not copied)
+            scores: Existing scores aligned with `ids`; all NaN when omitted
+        """
+        self.ids = ids
+        self.scores = scores if scores is not None else np.full(len(ids), np.nan)
+
+    @classmethod
+    def for_gallery(cls, gallery_images: List[Dict[str, Any]]) -> 'SearchResults':
+        return cls([item['id'] for item in gallery_images])
+
+    def scored(self) -> int:
+        """Number of photos with a score"""
+        return int(np.count_nonzero(~np.isnan(self.scores)))
+
+    def without_match(self) -> int:
+        """Scored photos that had errors or no (non-excluded) faces"""
+        return int(np.count_nonzero(self.scores <= 0))
+
+    def carry_over(self, previous: 'SearchResults') -> np.ndarray:
+        """
+        Copy the scores `previous` has for photos still in this gallery
+
+        Returns:
+            Boolean mask of the photos that got a score (the rest still need scoring)
+        """
+        positions = {photo_id: index for index, photo_id in enumerate(previous.ids)}
+        source = np.fromiter((positions.get(photo_id, -1) for photo_id in self.ids), dtype=np.intp, count=len(self.ids))
+        carried = source >= 0
+        carried[carried] = ~np.isnan(previous.scores[source[carried]])
+        self.scores[carried] = previous.scores[source[carried]]
+        return carried
+
+    def order(self, top_k: Optional[int] = None) -> np.ndarray:
+        """Indices of scored photos, best first (ties keep gallery order)"""
+        scored = np.flatnonzero(~np.isnan(self.scores))
+        order = scored[np.argsort(-self.scores[scored], kind='stable')]
+        return order if top_k is None else order[:top_k]
+
+    def to_list(self, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """External format: [{'id': str, 'similarity': float}] sorted by similarity (desc)"""
+        ids = self.ids
+        order = self.order(top_k)
+        return [
+            {'id': ids[index], 'similarity': similarity}
+            for index, similarity in zip(order.tolist(), self.scores[order].tolist())
+        ]
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,101 @@
+"""
+Shared Embedding Cache
+Redis-backed second cache tier so one worker's encodings warm every other host
+"""
+
+import json
+import time
+import struct
+import logging
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Hash of namespace -> {"params": ..., "last_seen": ...} for every version in use
+VERSIONS_KEY = 'emb_versions'
+
+# Blob header: number of faces, embedding dimension (little-endian uint16 each)
+_HEADER = struct.Struct('<HH')
+
+
+class SharedEmbeddingCache:
+    """Binary float32 embedding blobs in Redis, keyed by photo key and model namespace"""
+
+    # Seconds between refreshes of this namespace's last_seen in VERSIONS_KEY
+    REGISTER_INTERVAL = 3600
+
+    def __init__(self, redis_client, namespace: str, ttl: int = 7 * 24 * 3600, batch_size: int = 500):
+        """
+        Args:
+            redis_client: Redis client created with decode_responses=False
+            namespace: Engine/model identifier; embeddings from different models never mix
+            ttl: Seconds each entry lives (refreshed whenever it is rewritten)
+            batch_size: Keys per MGET / pipeline round trip
+        """
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._registered = None
+        self._registered_at = 0.0
+
+    def key(self, photo_key: str) -> str:
+        return f'emb:{self.namespace}:{photo_key}'
+
+    def register_version(self, params: Dict[str, Any]):
+        """
+        Record that this namespace is in use (the compaction tool keeps recent ones).
+        Throttled, so it is cheap to call once per job.
+        """
+        now = time.time()
+        if self._registered == self.namespace and now - self._registered_at < self.REGISTER_INTERVAL:
+            return
+        try:
+            self.redis_client.hset(VERSIONS_KEY, self.namespace, json.dumps({
+                'params': params,
+                'last_seen': now
+            }))
+            self._registered, self._registered_at = self.namespace, now
+        except Exception as e:
+            logger.warning(f"Failed to register cache version {self.namespace}: {e}")
+
+    @staticmethod
+    def encode(encodings: List[np.ndarray]) -> bytes:
+        """Serialize a photo's face encodings (possibly none) into one blob"""
+        if len(encodings) == 0:
+            return _HEADER.pack(0, 0)
+        matrix = np.asarray(encodings, dtype=np.float32)
+        return _HEADER.pack(matrix.shape[0], matrix.shape[1]) + matrix.tobytes()
+
+    @staticmethod
+    def decode(blob: bytes) -> np.ndarray:
+        """Inverse of `encode`; returns a read-only (faces, dim) float32 matrix"""
+        count, dim = _HEADER.unpack_from(blob)
+        return np.frombuffer(blob, dtype=np.float32, count=count * dim, offset=_HEADER.size).reshape(count, dim)
+
+    def get_many(self, photo_keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Fetch every available entry with pipelined MGETs"""
+        photo_keys = list(photo_keys)
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(photo_keys), self.batch_size):
+            batch = photo_keys[start:start + self.batch_size]
+            blobs = self.redis_client.mget([self.key(k) for k in batch])
+            for photo_key, blob in zip(batch, blobs):
+                if blob is None:
+                    continue
+                try:
+                    found[photo_key] = self.decode(blob)
+                except (struct.error, ValueError) as e:
+                    logger.warning(f"Corrupt shared cache entry for {photo_key}: {e}")
+        return found
+
+    def set_many(self, entries: Dict[str, np.ndarray]):
+        """Store entries with TTL in pipelined batches"""
+        items = list(entries.items())
+        for start in range(0, len(items), self.batch_size):
+            pipe = self.redis_client.pipeline(transaction=False)
+            for photo_key, encodings in items[start:start + self.batch_size]:
+                pipe.set(self.key(photo_key), self.encode(encodings), ex=self.ttl)
+            pipe.execute()
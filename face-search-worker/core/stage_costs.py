@@ -0,0 +1,85 @@
+"""
+Stage Cost Model
+Per-stage cost estimates (photo count, cache coverage, observed durations)
+published to Redis so producers can order or route jobs by expected cost
+"""
+
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Hash of stage -> JSON cost estimate, shared by every worker
+STAGE_COSTS_KEY = 'stage_costs'
+
+
+class StageCostModel:
+    """Exponentially weighted per-photo timings, split into cold and warm runs"""
+
+    def __init__(self, redis_client, alpha: float = 0.3, warm_coverage: float = 0.5):
+        """
+        Args:
+            redis_client: Redis client (decode_responses=True)
+            alpha: Weight of the newest observation in the moving averages
+            warm_coverage: Cache coverage at or above which a run counts as warm
+        """
+        self.redis_client = redis_client
+        self.alpha = alpha
+        self.warm_coverage = warm_coverage
+
+    def _blend(self, previous: Optional[float], value: float) -> float:
+        if previous is None:
+            return value
+        return previous + self.alpha * (value - previous)
+
+    def record(
+        self,
+        galleries: Dict[str, List[Any]],
+        encoded: int,
+        gallery_seconds: float,
+        job_seconds: float
+    ):
+        """
+        Fold one finished job into the estimates of every stage it searched
+
+        Args:
+            galleries: Stage -> gallery images scanned for it
+            encoded: Gallery images this job had to encode (cache misses)
+            gallery_seconds: Wall time of the gallery pass
+            job_seconds: Wall time of the whole job
+        """
+        photos = sum(len(images) for images in galleries.values())
+        stages = [stage for stage, images in galleries.items() if images]
+        if not photos or not stages:
+            return
+
+        coverage = 1 - min(encoded, photos) / photos
+        per_photo_ms = gallery_seconds * 1000 / photos
+        overhead_ms = max(0.0, job_seconds - gallery_seconds) * 1000
+        kind = 'warm' if coverage >= self.warm_coverage else 'cold'
+
+        def update(pipe):
+            # Read under WATCH; a concurrent update from another worker makes redis-py retry
+            previous = pipe.hmget(STAGE_COSTS_KEY, stages)
+            updates = {}
+            for stage, raw in zip(stages, previous):
+                entry = json.loads(raw) if raw else {}
+                stage_photos = len(galleries[stage])
+                entry['photos'] = stage_photos
+                entry['coverage'] = round(coverage, 3)
+                entry[f'{kind}_ms_per_photo'] = round(self._blend(entry.get(f'{kind}_ms_per_photo'), per_photo_ms), 3)
+                entry['overhead_ms'] = round(self._blend(entry.get('overhead_ms'), overhead_ms), 1)
+                entry['jobs'] = entry.get('jobs', 0) + 1
+                entry['updated_at'] = time.time()
+                # Expected job durations for the producer
+                for run in ('cold', 'warm'):
+                    per_photo = entry.get(f'{run}_ms_per_photo')
+                    entry[f'{run}_ms'] = round(entry['overhead_ms'] + stage_photos * per_photo) if per_photo is not None else None
+                updates[stage] = json.dumps(entry)
+            pipe.multi()
+            pipe.hset(STAGE_COSTS_KEY, mapping=updates)
+
+        # Read-modify-write of shared entries: WATCH/MULTI so no worker's job is lost
+        self.redis_client.transaction(update, STAGE_COSTS_KEY)
@@ -0,0 +1,180 @@
+"""
+Thread Budget
+Gives each worker process on a host its own set of cores and sizes every
+thread pool inside it (engine threads, BLAS, OpenCV, TensorFlow) to fit
+"""
+
+import os
+import sys
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Read by the BLAS / OpenMP runtimes when numpy, dlib or TensorFlow first load them
+BLAS_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+)
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cores = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cores.update(range(int(first), int(last or first) + 1))
+    return sorted(cores)
+
+
+def split_cores(cores: List[int], parts: int, index: int) -> List[int]:
+    """The `index`-th of `parts` contiguous, near-equal slices of `cores`"""
+    if parts > len(cores):
+        # Fewer cores than workers: they have to share
+        return [cores[index % len(cores)]]
+    size, extra = divmod(len(cores), parts)
+    start = index * size + min(index, extra)
+    return cores[start:start + size + (1 if index < extra else 0)]
+
+
+def claim_slot(workers_per_host: int):
+    """
+    Lowest free slot on this host, held by an exclusive lock on a temp file
+    for the life of the process (released by the OS even on a crash)
+
+    Returns:
+        (slot, open lock file) or (None, None) when every slot is taken
+    """
+    for slot in range(workers_per_host):
+        path = os.path.join(tempfile.gettempdir(), f'face-search-worker-slot-{slot}.lock')
+        handle = open(path, 'a+')
+        try:
+            if sys.platform == 'win32':
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return slot, handle
+        except OSError:
+            handle.close()
+    return None, None
+
+
+class ThreadBudget:
+    """
+    Core set and thread counts for one worker process
+
+    The engine pool gets `engine_threads` threads; each of them may use
+    `library_threads` BLAS / OpenCV / TF intra-op threads, so the process keeps
+    roughly one runnable thread per core it owns.
+    """
+
+    def __init__(self, cores: List[int], engine_threads: Optional[int] = None, pin: bool = False, slot: Optional[int] = None):
+        """
+        Args:
+            cores: CPU ids this worker may use
+            engine_threads: Engine thread pool size (defaults to one per core)
+            pin: Restrict the process to `cores` (otherwise only size the pools)
+            slot: Slot on the host the cores were derived from, for reporting
+        """
+        self.cores = cores
+        self.engine_threads = max(1, engine_threads or len(cores))
+        self.library_threads = max(1, len(cores) // self.engine_threads)
+        self.pin = pin
+        self.slot = slot
+        self._slot_lock = None
+
+    @classmethod
+    def from_env(cls) -> 'ThreadBudget':
+        """
+        CPU_CORES: explicit core list ('0-3,8'); otherwise the cores this process
+            may run on are split evenly between WORKERS_PER_HOST workers, each taking
+            the first free slot (or WORKER_SLOT)
+        ENGINE_THREADS: engine pool size (default: one per core in the set)
+        """
+        available = sorted(psutil.Process().cpu_affinity() or range(psutil.cpu_count() or 1))
+        engine_threads = int(os.getenv('ENGINE_THREADS') or 0) or None
+
+        if os.getenv('CPU_CORES'):
+            return cls(parse_cpu_list(os.environ['CPU_CORES']), engine_threads, pin=True)
+
+        workers_per_host = max(1, int(os.getenv('WORKERS_PER_HOST') or 1))
+        if workers_per_host == 1:
+            return cls(available, engine_threads)
+
+        slot_lock = None
+        if os.getenv('WORKER_SLOT'):
+            slot = int(os.environ['WORKER_SLOT']) % workers_per_host
+        else:
+            slot, slot_lock = claim_slot(workers_per_host)
+        if slot is None:
+            # More workers than slots: share everything, but only take one worker's share of threads
+            share = split_cores(available, workers_per_host, 0)
+            logger.warning(f"⚠️  All {workers_per_host} worker slots on this host are taken - not pinning")
+            return cls(available, engine_threads or len(share))
+
+        budget = cls(split_cores(available, workers_per_host, slot), engine_threads, pin=True, slot=slot)
+        budget._slot_lock = slot_lock
+        return budget
+
+    def apply(self):
+        """Pin the process and export thread counts; call before numpy / OpenCV / TF are imported"""
+        if self.pin and hasattr(psutil.Process, 'cpu_affinity'):
+            try:
+                psutil.Process().cpu_affinity(self.cores)
+            except (OSError, ValueError, psutil.Error) as e:
+                logger.warning(f"⚠️  Could not pin to cores {self.cores}: {e}")
+
+        # setdefault: explicitly configured values win
+        threads = str(self.library_threads)
+        for name in BLAS_ENV_VARS:
+            os.environ.setdefault(name, threads)
+        os.environ.setdefault('OPENCV_FOR_THREADS_NUM', threads)
+        os.environ.setdefault('TF_NUM_INTRAOP_THREADS', threads)
+        # One scheduling thread per engine thread calling into TF concurrently
+        os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(self.engine_threads))
+
+    def configure_frameworks(self):
+        """Apply the counts to OpenCV and TensorFlow directly once the engine has loaded them"""
+        try:
+            import cv2
+            cv2.setNumThreads(self.library_threads)
+        except ImportError:
+            pass
+
+        tf = sys.modules.get('tensorflow')
+        if tf is not None:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(int(os.environ['TF_NUM_INTRAOP_THREADS']))
+                tf.config.threading.set_inter_op_parallelism_threads(int(os.environ['TF_NUM_INTEROP_THREADS']))
+            except (RuntimeError, KeyError, ValueError):
+                pass  # Runtime already initialized; it read the environment variables instead
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'cores': self.cores,
+            'slot': self.slot,
+            'engine_threads': self.engine_threads,
+            'library_threads': self.library_threads,
+        }
+
+    def __str__(self) -> str:
+        if self.pin:
+            where = f"cores {','.join(map(str, self.cores))}"
+            if self.slot is not None:
+                where += f" (slot {self.slot})"
+        else:
+            where = f"{len(self.cores)} cores"
+        return f"{where}: {self.engine_threads} engine threads x {self.library_threads} BLAS/OpenCV/TF threads"
@@ -0,0 +1,60 @@
+"""
+Warm-up
+Loads the model, runs a dummy inference and preloads stage caches before a
+worker starts taking jobs
+"""
+
+import json
+import time
+from typing import List, Optional
+
+from core.affinity import StageAffinity
+from core.job_processor import scan_gallery
+from core.stage_costs import STAGE_COSTS_KEY
+
+
+def most_requested_stages(redis_client, top_n: int) -> List[str]:
+    """Stages with the most completed jobs according to the published stage costs"""
+    if top_n <= 0:
+        return []
+    costs = redis_client.hgetall(STAGE_COSTS_KEY)
+    ranked = sorted(costs, key=lambda stage: json.loads(costs[stage]).get('jobs', 0), reverse=True)
+    return ranked[:top_n]
+
+
+def warm_up(
+    engine,
+    stages: List[str],
+    convocation_photos_dir: str,
+    affinity: Optional[StageAffinity],
+    logger
+) -> float:
+    """
+    Get the engine ready for its first job
+
+    Args:
+        engine: Face recognition engine instance
+        stages: Stages whose gallery encodings (and exclude masks) are preloaded into the cache
+        convocation_photos_dir: Root of the stage directories
+        affinity: Marks preloaded stages warm (None disables)
+        logger: Logger instance
+
+    Returns:
+        Seconds spent warming up
+    """
+    start = time.perf_counter()
+
+    step = time.perf_counter()
+    engine.warm_up()
+    logger.info(f"🔥 Model warmed up in {time.perf_counter() - step:.1f}s")
+
+    for stage, gallery_images in scan_gallery(stages, convocation_photos_dir, logger).items():
+        if not gallery_images:
+            continue
+        step = time.perf_counter()
+        engine.preload_gallery(gallery_images)
+        if affinity:
+            affinity.mark_warm(stage)
+        logger.info(f"🔥 Preloaded {stage}: {len(gallery_images)} images in {time.perf_counter() - step:.1f}s")
+
+    return time.perf_counter() - start
@@ -9,13 +9,22 @@ import json
 import socket
 import signal
 import threading
+import psutil
 import redis as redis_lib
+from contextlib import contextmanager
 from typing import Optional, Dict, Any
 
+from core.affinity import StageAffinity
+from core.phase_metrics import PhaseMetrics
+
 
 class WorkerManager:
     """Manages worker lifecycle and Redis registration"""
     
+    HEARTBEAT_INTERVAL = 5  # seconds between heartbeats
+    HEARTBEAT_TTL = 15  # heartbeat key expiry; a worker without one is offline
+    STATIC_REFRESH_INTERVAL = 60  # rewrite the `workers` hash entry at least this often
+    
     def __init__(
         self,
         redis_host: str,
@@ -45,12 +54,41 @@ class WorkerManager:
         self.worker_stats = {
             'jobs_processed': 0,
             'jobs_failed': 0,
+            'images_processed': 0,
+            'images_per_sec': None,
+            'engine_threads': None,
             'current_job': None,
+            'last_job_phases': {},
             'start_time': time.time()
         }
         
+        # Rolling per-phase latency histograms, shared with the engine
+        self.phase_metrics = PhaseMetrics()
+        
+        # Latest MetricsCollector sample (reused by the /metrics endpoint)
+        self.last_metrics: Optional[Dict[str, Any]] = None
+        
+        # Static registration last written to the `workers` hash
+        self._last_static_info: Optional[Dict[str, Any]] = None
+        self._last_static_write = 0.0
+        
+        # Warm-stage advertisement (attached by the worker once the ID is known)
+        self.affinity: Optional[StageAffinity] = None
+        
+        # 'warming' until the engine is loaded and warmed up, then 'online'; 'draining' on shutdown
+        self.status = 'warming'
+        
+        # Seconds per startup step (imports, redis, engine_load, warmup, total)
+        self.process_start = psutil.Process().create_time()
+        self.startup_timings: Dict[str, float] = {}
+        
+        # Cores and thread counts (core.thread_budget.ThreadBudget.describe)
+        self.thread_budget: Dict[str, Any] = {}
+        
         self.heartbeat_thread: Optional[threading.Thread] = None
+        # Heartbeat runs until cleanup(); a shutdown signal only sets `draining`
         self.running = True
+        self.draining = False
     
     def initialize_redis(self) -> redis_lib.Redis:
         """Initialize Redis connection and generate worker ID"""
@@ -75,9 +113,8 @@ class WorkerManager:
         engine_suffix = f'_{self.engine_name.lower().replace("engine", "")}'
         
         # Get current active workers to determine next available number
-        workers_data = client.hgetall('workers')
         existing_workers = [
-            k for k in workers_data.keys() # type: ignore
+            k for k in client.hkeys('workers') # type: ignore
             if k.startswith(f"{self.hostname}_{worker_type}{engine_suffix}_")
         ]
         
@@ -93,71 +130,144 @@ class WorkerManager:
         
         return client
     
-    def register_worker(self):
-        """Register worker with Redis"""
-        if not self.metrics_collector or not self.redis_client:
-            return
-        
-        gpu_info = self.metrics_collector.get_gpu_metrics()
-        
-        worker_info = {
+    def create_binary_client(self) -> redis_lib.Redis:
+        """Second connection returning raw bytes (for binary embedding blobs)"""
+        return redis_lib.Redis(
+            host=self.redis_host,
+            port=self.redis_port,
+            password=self.redis_password if self.redis_password else None,
+            decode_responses=False,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True
+        )
+    
+    def heartbeat_key(self) -> str:
+        """Per-worker key holding the dynamic heartbeat payload"""
+        return f'worker:{self.worker_id}:heartbeat'
+    
+    def _static_info(self) -> Dict[str, Any]:
+        """Fields that rarely change - stored in the shared `workers` hash"""
+        gpu_name = self.metrics_collector.gpu_name if self.metrics_collector else None
+        return {
             'id': self.worker_id,
             'hostname': self.hostname,
-            'status': 'online',
+            'status': self.status,
             'gpu_index': self.gpu_index if not self.use_cpu else None,
-            'gpu_name': gpu_info['name'] if gpu_info else 'CPU',
+            'gpu_name': gpu_name or 'CPU',
             'use_cpu': self.use_cpu,
             'concurrency': self.concurrency,
             'engine': self.engine_name,
             'start_time': self.worker_stats['start_time'],
+            'startup': dict(self.startup_timings),
+            'threads': dict(self.thread_budget),
+        }
+    
+    def _dynamic_info(self, metrics: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fields refreshed on every heartbeat - stored in the per-worker TTL key"""
+        gpu = metrics['gpu'] if metrics else None
+        return {
+            'ready': self.status == 'online',
+            'uptime': self.uptime(),
             'last_heartbeat': time.time(),
-            'jobs_processed': 0,
-            'jobs_failed': 0,
-            'current_job': None
+            'jobs_processed': self.worker_stats['jobs_processed'],
+            'jobs_failed': self.worker_stats['jobs_failed'],
+            'images_processed': self.worker_stats['images_processed'],
+            'images_per_sec': self.worker_stats['images_per_sec'],
+            'engine_threads': self.worker_stats['engine_threads'],
+            'current_job': self.worker_stats['current_job'],
+            'cpu_percent': metrics['cpu_percent'] if metrics else None,
+            'ram_percent': metrics['ram']['percent'] if metrics else None,
+            'ram_available_gb': metrics['ram']['available_gb'] if metrics else None,
+            'gpu_utilization': gpu['utilization'] if gpu else None,
+            'gpu_memory_used_mb': gpu['memory_used_mb'] if gpu else None,
+            'gpu_temperature': gpu['temperature'] if gpu else None,
+            'warm_stages': self.affinity.warm_stages() if self.affinity else [],
+            'phase_latency': self.phase_metrics.snapshot(),
+            'last_job_phases': {
+                phase: round(seconds * 1000, 1)
+                for phase, seconds in self.worker_stats['last_job_phases'].items()
+            }
         }
+    
+    def _publish(self, metrics: Optional[Dict[str, Any]], force_static: bool = False):
+        """Write the heartbeat key, plus the static hash entry when it changed, in one round trip"""
+        static_info = self._static_info()
+        static_changed = (
+            force_static
+            or static_info != self._last_static_info
+            or time.time() - self._last_static_write > self.STATIC_REFRESH_INTERVAL
+        )
+        
+        pipe = self.redis_client.pipeline(transaction=False)  # type: ignore[union-attr]
+        if static_changed:
+            # last_heartbeat is kept in the hash for registration time / stale-worker cleanup
+            pipe.hset('workers', self.worker_id, json.dumps({**static_info, 'last_heartbeat': time.time()}))
+        pipe.set(self.heartbeat_key(), json.dumps(self._dynamic_info(metrics)), ex=self.HEARTBEAT_TTL)
+        if self.affinity:
+            self.affinity.publish(pipe)
+        pipe.execute()
+        
+        if static_changed:
+            self._last_static_info = static_info
+            self._last_static_write = time.time()
+    
+    def register_worker(self):
+        """Register worker with Redis"""
+        if not self.metrics_collector or not self.redis_client:
+            return
         
-        self.redis_client.hset('workers', self.worker_id, json.dumps(worker_info))
+        self._publish(None, force_static=True)
         self.logger.info(f"✅ Worker registered: {self.worker_id}\n")
     
+    @contextmanager
+    def startup_step(self, step: str):
+        """Record how long a startup step takes in startup_timings"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[step] = round(time.perf_counter() - started, 2)
+    
+    def set_ready(self):
+        """Switch from 'warming' to 'online' and publish it immediately"""
+        self.status = 'online'
+        # Measured from process creation, so interpreter start and imports are included
+        self.startup_timings['total'] = round(time.time() - self.process_start, 2)
+        if self.metrics_collector and self.redis_client:
+            self._publish(self.last_metrics, force_static=True)
+        steps = ', '.join(f"{step} {seconds:.1f}s" for step, seconds in self.startup_timings.items() if step != 'total')
+        self.logger.info(f"🟢 Worker is ready (startup {self.startup_timings['total']:.1f}s: {steps})\n")
+    
+    def set_draining(self):
+        """Switch to 'draining' (no new jobs, active ones finishing) and publish it immediately"""
+        self.status = 'draining'
+        if self.metrics_collector and self.redis_client:
+            try:
+                self._publish(self.last_metrics, force_static=True)
+            except Exception as e:
+                self.logger.warning(f"⚠️  Failed to publish draining status: {e}")
+    
     def heartbeat_loop(self):
-        """Send heartbeat to Redis every 5 seconds"""
+        """Send heartbeat to Redis every HEARTBEAT_INTERVAL seconds"""
         while self.running:
             try:
                 if not self.metrics_collector or not self.redis_client:
-                    time.sleep(5)
+                    time.sleep(self.HEARTBEAT_INTERVAL)
                     continue
                 
                 metrics = self.metrics_collector.get_all_metrics()
-                
-                worker_info = {
-                    'id': self.worker_id,
-                    'hostname': self.hostname,
-                    'status': 'online',
-                    'gpu_index': self.gpu_index if not self.use_cpu else None,
-                    'gpu_name': metrics['gpu']['name'] if metrics['gpu'] else 'CPU',
-                    'use_cpu': self.use_cpu,
-                    'concurrency': self.concurrency,
-                    'engine': self.engine_name,
-                    'start_time': self.worker_stats['start_time'],
-                    'uptime': time.time() - self.worker_stats['start_time'],
-                    'last_heartbeat': time.time(),
-                    'jobs_processed': self.worker_stats['jobs_processed'],
-                    'jobs_failed': self.worker_stats['jobs_failed'],
-                    'current_job': self.worker_stats['current_job'],
-                    'cpu_percent': metrics['cpu_percent'],
-                    'ram_percent': metrics['ram']['percent'],
-                    'ram_available_gb': metrics['ram']['available_gb'],
-                    'gpu_utilization': metrics['gpu']['utilization'] if metrics['gpu'] else None,
-                    'gpu_memory_used_mb': metrics['gpu']['memory_used_mb'] if metrics['gpu'] else None,
-                    'gpu_temperature': metrics['gpu']['temperature'] if metrics['gpu'] else None
-                }
-                
-                self.redis_client.hset('workers', self.worker_id, json.dumps(worker_info))
+                self.last_metrics = metrics
+                self._publish(metrics)
                 
             except Exception as e:
                 self.logger.warning(f"⚠️  Heartbeat error: {e}")
             
-            time.sleep(5)
+            time.sleep(self.HEARTBEAT_INTERVAL)
+    
+    def uptime(self) -> float:
+        """Seconds since the worker started"""
+        return time.time() - self.worker_stats['start_time']
     
     def start_heartbeat(self):
         """Start heartbeat thread"""
@@ -174,8 +284,11 @@ class WorkerManager:
             try:
                 # Remove worker from Redis
                 self.redis_client.hdel('workers', self.worker_id)
-                # Remove pause flag if exists
-                self.redis_client.delete(f'worker:{self.worker_id}:paused')
+                # Remove pause flag and heartbeat if they exist
+                self.redis_client.delete(f'worker:{self.worker_id}:paused', self.heartbeat_key())
+                # Stop attracting jobs for stages cached here
+                if self.affinity:
+                    self.affinity.withdraw()
                 self.logger.info(f"✅ Worker {self.worker_id} removed from Redis")
             except Exception as e:
                 self.logger.error(f"Error during cleanup: {e}")
@@ -186,9 +299,17 @@ class WorkerManager:
         self.logger.info("👋 Shutdown complete\n")
     
     def setup_signal_handlers(self):
-        """Setup signal handlers for graceful shutdown"""
+        """
+        Setup signal handlers for graceful shutdown: the first signal sets
+        `draining` so the main loop stops and the worker drains (heartbeat
+        still running), a second one exits immediately
+        """
         def signal_handler(signum, frame):
             self.logger.info(f"\n\n⚠️  Received signal {signum}")
+            if not self.draining:
+                self.draining = True
+                self.logger.info("🚰 Draining - send the signal again to exit immediately")
+                return
             self.cleanup()
             os._exit(0)
         
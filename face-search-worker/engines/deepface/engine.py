@@ -5,41 +5,60 @@ Unique implementation on top of BaseEngine template
 
 import os
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import numpy as np
-from deepface import DeepFace
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from core.base_engine import BaseEngine
 
-try:
-    import tensorflow as tf  # type: ignore
-    TF_AVAILABLE = True
-except ImportError:  # pragma: no cover
-    tf = None  # type: ignore
-    TF_AVAILABLE = False
-
 logger = logging.getLogger(__name__)
 
+# DeepFace/TensorFlow are imported by load_framework() - TF reads
+# CUDA_VISIBLE_DEVICES on import and takes seconds to load
+DeepFace = None
+tf = None
+
+
+def load_framework(use_gpu: bool = True) -> None:
+    """Import DeepFace and TensorFlow (safe to call from a background thread)"""
+    global DeepFace, tf
+    if DeepFace is not None:
+        return
+    if not use_gpu:
+        os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+    try:
+        import tensorflow as tf_module  # type: ignore
+        tf = tf_module
+    except ImportError:  # pragma: no cover
+        tf = None
+    from deepface import DeepFace as deepface_module
+    DeepFace = deepface_module
+
 
 class DeepFaceEngine(BaseEngine):
     """Face matching powered by DeepFace/TF"""
 
+    # Facenet embeddings are compared by cosine distance
+    EXCLUDE_METRIC = 'cosine'
+    EXCLUDE_THRESHOLD = 0.05
+
     def __init__(self, use_gpu: bool = True, max_workers: int = 6, max_image_size: int = 640):
         super().__init__(use_gpu=use_gpu, max_workers=max_workers, max_image_size=max_image_size)
         self.name = "DeepFace"
         self.model_name = "Facenet"
+        self.detector_backend = "opencv"
 
-        if not use_gpu:
-            os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-
+        load_framework(use_gpu)
         self._configure_tensorflow()
         logger.info(f"✅ {self.name} engine initialized (Model: {self.model_name}, GPU: {use_gpu}, Workers: {max_workers})")
 
+    def cache_params(self) -> Dict[str, object]:
+        return {**super().cache_params(), 'detector_backend': self.detector_backend}
+
     def _configure_tensorflow(self) -> None:
-        if not TF_AVAILABLE or tf is None:
+        if tf is None:
             return
         devices = tf.config.list_physical_devices('GPU')
         for device in devices:
@@ -58,6 +77,7 @@ class DeepFaceEngine(BaseEngine):
         data = DeepFace.represent(
             img_path=selfie_img,
             model_name=self.model_name,
+            detector_backend=self.detector_backend,
             enforce_detection=True
         )
         if not data:
@@ -68,6 +88,7 @@ class DeepFaceEngine(BaseEngine):
         data = DeepFace.represent(
             img_path=img,
             model_name=self.model_name,
+            detector_backend=self.detector_backend,
             enforce_detection=False
         )
         if not data:
@@ -76,57 +97,51 @@ class DeepFaceEngine(BaseEngine):
 
     # --- Per-image processing -----------------------------------------------------
 
-    def _process_single_image(self, args):
-        img_id, img_path_or_base64, selfie_embedding, exclude_embeddings = args
+    def _process_single_image(self, args) -> Optional[float]:
+        img_id, image, img_hash, selfie_embedding, exclude = args
 
         try:
-            cached = self._get_cached_encoding(img_id, img_path_or_base64, 'gallery_encodings')
+            cached = self._get_cached_encoding(img_id, image, 'gallery_encodings', img_hash)
             if cached is not None:
                 processed_embeddings = cached
             else:
-                gallery_img = self._load_and_preprocess_image(img_path_or_base64)
-                raw_embeddings = DeepFace.represent(
-                    img_path=gallery_img,
-                    model_name=self.model_name,
-                    enforce_detection=False
-                )
+                with self._phase('image_load'):
+                    gallery_img = self._load_and_preprocess_image(image)
+                with self._phase('gallery_encode'):
+                    raw_embeddings = DeepFace.represent(
+                        img_path=gallery_img,
+                        model_name=self.model_name,
+                        detector_backend=self.detector_backend,
+                        enforce_detection=False
+                    )
                 del gallery_img
 
                 if not raw_embeddings:
-                    return {'id': img_id, 'similarity': 0.0}
+                    return 0.0
 
-                processed_embeddings = [
+                processed_embeddings = self.embedding_matrix([
                     self._ensure_numpy_embedding(emb)
                     for emb in raw_embeddings
-                ]
-                self._cache_encoding(img_path_or_base64, processed_embeddings, 'gallery_encodings')
-
-            faces_to_compare: List[np.ndarray] = []
-            if exclude_embeddings:
-                for gallery_emb in processed_embeddings:
-                    is_excluded = any(
-                        self._cosine_distance(gallery_emb, exclude_emb) < 0.05
-                        for exclude_emb in exclude_embeddings
-                    )
-                    if not is_excluded:
-                        faces_to_compare.append(gallery_emb)
-            else:
-                faces_to_compare = processed_embeddings
+                ])
+                self._cache_encoding(image, processed_embeddings, 'gallery_encodings', img_hash)
+
+            if selfie_embedding is None:
+                return None  # Cache warm-up only (BaseEngine.preload_gallery)
 
-            if not faces_to_compare:
-                return {'id': img_id, 'similarity': 0.0}
+            with self._phase('scoring'):
+                faces_to_compare = self._faces_to_compare(image, processed_embeddings, exclude, img_hash)
 
-            min_distance = min(
-                self._cosine_distance(selfie_embedding, gallery_emb)
-                for gallery_emb in faces_to_compare
-            )
-            similarity = 1 - float(min_distance)
+                if not len(faces_to_compare):
+                    return 0.0
 
-            return {'id': img_id, 'similarity': round(similarity, 4)}
+                min_distance = self._cosine_distances(faces_to_compare, selfie_embedding[None, :]).min()
+                similarity = 1 - float(min_distance)
+
+            return round(similarity, 4)
 
         except Exception as err:
             logger.warning(f"Error processing {img_id}: {err}")
-            return {'id': img_id, 'similarity': 0.0}
+            return 0.0
 
     # --- Helpers ------------------------------------------------------------------
 
@@ -134,14 +149,3 @@ class DeepFaceEngine(BaseEngine):
     def _ensure_numpy_embedding(embedding) -> np.ndarray:
         arr = embedding.get("embedding") if isinstance(embedding, dict) else embedding
         return np.array(arr, dtype=np.float32)
-
-    @staticmethod
-    def _cosine_distance(embedding1: np.ndarray, embedding2: np.ndarray) -> float:
-        emb1 = np.array(embedding1, dtype=np.float32)
-        emb2 = np.array(embedding2, dtype=np.float32)
-        dot_product = float(np.dot(emb1, emb2))
-        denom = float(np.linalg.norm(emb1) * np.linalg.norm(emb2))
-        if denom == 0:
-            return 1.0
-        cosine_similarity = dot_product / denom
-        return 1.0 - cosine_similarity
@@ -7,7 +7,6 @@ import os
 import logging
 from typing import List, Dict, Optional
 
-import face_recognition
 import numpy as np
 
 import sys
@@ -16,6 +15,20 @@ from core.base_engine import BaseEngine
 
 logger = logging.getLogger(__name__)
 
+# face_recognition is imported by load_framework() - importing it loads the dlib models
+face_recognition = None
+
+
+def load_framework(use_gpu: bool = True) -> None:
+    """Import face_recognition/dlib (safe to call from a background thread)"""
+    global face_recognition
+    if face_recognition is not None:
+        return
+    if use_gpu:
+        os.environ["CUDA_VISIBLE_DEVICES"] = "0"
+    import face_recognition as face_recognition_module
+    face_recognition = face_recognition_module
+
 
 class FaceRecognitionEngine(BaseEngine):
     """Face recognition engine powered by dlib/face_recognition"""
@@ -23,12 +36,17 @@ class FaceRecognitionEngine(BaseEngine):
     def __init__(self, use_gpu: bool = True, max_workers: int = 8, max_image_size: int = 640):
         super().__init__(use_gpu=use_gpu, max_workers=max_workers, max_image_size=max_image_size)
         self.name = "face_recognition"
+        self.model_name = "dlib_resnet_v1"
+        self.landmark_model = "large"
+        self.num_jitters = 4
 
-        if use_gpu:
-            os.environ["CUDA_VISIBLE_DEVICES"] = "0"
+        load_framework(use_gpu)
 
         logger.info(f"✅ {self.name} engine initialized (GPU: {use_gpu}, Workers: {max_workers})")
 
+    def cache_params(self) -> Dict[str, object]:
+        return {**super().cache_params(), 'landmark_model': self.landmark_model, 'num_jitters': self.num_jitters}
+
     def _is_environment_compatible(self) -> bool:
         try:
             import face_recognition  # noqa: F401
@@ -39,7 +57,7 @@ class FaceRecognitionEngine(BaseEngine):
     # --- Engine-specific encoders -------------------------------------------------
 
     def _encode_selfie(self, selfie_img: np.ndarray):
-        encodings = face_recognition.face_encodings(selfie_img, num_jitters=4, model='large')
+        encodings = face_recognition.face_encodings(selfie_img, num_jitters=self.num_jitters, model=self.landmark_model)
         return encodings[0] if encodings else None
 
     def _encode_exclude_image(self, img: np.ndarray) -> List:
@@ -47,45 +65,43 @@ class FaceRecognitionEngine(BaseEngine):
 
     # --- Per-image processing -----------------------------------------------------
 
-    def _process_single_image(self, args) -> Optional[Dict[str, float]]:
-        img_id, img_path_or_base64, selfie_encoding, exclude_encodings = args
+    def _process_single_image(self, args) -> Optional[float]:
+        img_id, image, img_hash, selfie_encoding, exclude = args
 
         try:
-            cached_encodings = self._get_cached_encoding(img_id, img_path_or_base64, 'gallery_encodings')
+            cached_encodings = self._get_cached_encoding(img_id, image, 'gallery_encodings', img_hash)
             if cached_encodings is not None:
                 img_encodings = cached_encodings
             else:
-                gallery_img = self._load_and_preprocess_image(img_path_or_base64)
-                img_encodings = face_recognition.face_encodings(gallery_img, num_jitters=4, model='large')
+                with self._phase('image_load'):
+                    gallery_img = self._load_and_preprocess_image(image)
+                with self._phase('gallery_encode'):
+                    img_encodings = self.embedding_matrix(
+                        face_recognition.face_encodings(gallery_img, num_jitters=self.num_jitters, model=self.landmark_model)
+                    )
                 del gallery_img
 
-                if img_encodings:
-                    self._cache_encoding(img_path_or_base64, img_encodings, 'gallery_encodings')
-
-            if not img_encodings:
-                return {'id': img_id, 'similarity': -1.0}
-
-            faces_to_compare: List[np.ndarray] = []
-            if exclude_encodings:
-                for gallery_enc in img_encodings:
-                    is_excluded = False
-                    for exclude_enc in exclude_encodings:
-                        if face_recognition.face_distance([exclude_enc], gallery_enc)[0] < 0.1:
-                            is_excluded = True
-                            break
-                    if not is_excluded:
-                        faces_to_compare.append(gallery_enc)
-            else:
-                faces_to_compare = img_encodings
+                # Photos without faces are cached too so they are not re-encoded
+                self._cache_encoding(image, img_encodings, 'gallery_encodings', img_hash)
+
+            if selfie_encoding is None:
+                return None  # Cache warm-up only (BaseEngine.preload_gallery)
+
+            if not len(img_encodings):
+                return -1.0
+
+            with self._phase('scoring'):
+                # face_recognition.face_distance is the Euclidean distance, taken over all of the photo's faces at once
+                faces_to_compare = self._faces_to_compare(image, img_encodings, exclude, img_hash)
 
-            if not faces_to_compare:
-                return {'id': img_id, 'similarity': 0.0}
+                if not len(faces_to_compare):
+                    return 0.0
 
-            distances = face_recognition.face_distance(faces_to_compare, selfie_encoding)
-            similarity = 1 - float(min(distances))
+                distances = np.linalg.norm(faces_to_compare - selfie_encoding, axis=1)
+                similarity = 1 - float(distances.min())
 
-            return {'id': img_id, 'similarity': round(similarity, 4)}
+            return round(similarity, 4)
 
         except Exception as err:
             logger.warning(f"Error processing {img_id}: {err}")
-            return {'id': img_id, 'similarity': 0.0}
\ No newline at end of file
+            return 0.0
\ No newline at end of file
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Queue -> worker load test
+Enqueues synthetic face-search jobs into a local Redis at a chosen arrival rate
+and stage mix, runs N real worker processes with the stub engine, and reports
+throughput, queue wait and completion latency percentiles
+
+Redis: an existing server (--redis-url, never production - jobs are consumed
+and the `face-search` queue is shared), else a throwaway `redis-server` on a
+free port. fakeredis won't do: BullMQ needs INFO and blocking commands it lacks
+
+Usage:
+    python loadtest.py                                            # 500 jobs, 3 workers
+    python loadtest.py --jobs 5000 --workers 4 --rate 25 --stages 12 --photos 800
+    python loadtest.py --redis-url redis://localhost:6380 --encode-delay 0.005 --json report.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import signal
+import tempfile
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+import redis
+from bullmq import Queue
+
+# Add project root to path
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark import make_selfie_base64
+
+QUEUE_NAME = 'face-search'
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+
+
+# ============================================================
+# Redis
+# ============================================================
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_redis():
+    """
+    Throwaway Redis for the run
+
+    Returns:
+        (host, port, stop callable)
+    """
+    binary = shutil.which('redis-server')
+    if not binary:
+        sys.exit("❌ No redis-server on PATH - install Redis or pass --redis-url")
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, '--port', str(port), '--save', '', '--appendonly', 'no'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    print(f"🗄️  Started redis-server on port {port}")
+    return '127.0.0.1', port, process.terminate
+
+
+def wait_for_redis(client: redis.Redis, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            client.ping()
+            return
+        except redis.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+# ============================================================
+# Synthetic event
+# ============================================================
+def make_event(root: str, stages: int, photos: int) -> List[str]:
+    """Empty photo files per stage (the stub engine never decodes gallery images)"""
+    names = [f"Day {1 + index // 4}/Stage {index % 4 + 1}" for index in range(stages)]
+    for name in names:
+        stage_dir = os.path.join(root, name)
+        os.makedirs(stage_dir, exist_ok=True)
+        for photo in range(photos):
+            open(os.path.join(stage_dir, f"IMG_{photo:05d}.jpg"), 'wb').close()
+    return names
+
+
+def stage_weights(count: int, skew: float) -> np.ndarray:
+    """Zipf-like popularity: stage i gets weight 1 / (i + 1)^skew (0 = uniform)"""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+# ============================================================
+# Workers
+# ============================================================
+def start_workers(args, client: redis.Redis, host: str, port: int, password: str, photos_dir: str, log_dir: str,
+                  workers: List[subprocess.Popen]):
+    """Start the workers one after another (IDs are picked from the registered ones, so they must not race)"""
+    env = {
+        **os.environ,
+        'REDIS_HOST': host,
+        'REDIS_PORT': str(port),
+        'REDIS_PASSWORD': password,
+        'CONVOCATION_PHOTOS_DIR': photos_dir,
+        'STUB_ENCODE_DELAY': str(args.encode_delay),
+        'WORKER_CONCURRENCY': str(args.concurrency),
+        'ENGINE_THREADS': str(args.engine_threads),
+        'WORKERS_PER_HOST': str(args.workers),
+        'SHARED_CACHE_ENABLED': '1' if args.shared_cache else '0',
+        'USE_CPU': '1',
+        'WARMUP_ENABLED': '0',
+        'SNAPSHOT_ENABLED': '0',
+        'METRICS_PORT': '0',
+        'PYTHONUNBUFFERED': '1',
+    }
+    registered = set(client.hkeys('workers'))
+    for index in range(args.workers):
+        with open(os.path.join(log_dir, f'worker-{index + 1}.log'), 'w') as log:
+            workers.append(subprocess.Popen(
+                [sys.executable, WORKER_SCRIPT, '--engine', 'stub'],
+                env=env, stdout=log, stderr=subprocess.STDOUT
+            ))
+        registered.add(wait_for_worker(client, workers[-1], registered))
+
+
+def wait_for_worker(client: redis.Redis, worker: subprocess.Popen, known: set, timeout: float = 120) -> str:
+    """Block until `worker` registered itself as online; returns its ID"""
+    deadline = time.monotonic() + timeout
+    while True:
+        for worker_id, info in client.hgetall('workers').items():
+            if worker_id not in known and json.loads(info).get('status') == 'online':
+                return worker_id
+        if worker.poll() is not None:
+            raise RuntimeError("A worker exited during startup - see its log")
+        if time.monotonic() > deadline:
+            raise TimeoutError("A worker did not come online - see its log")
+        time.sleep(0.5)
+
+
+def stop_workers(workers: List[subprocess.Popen], timeout: float = 30):
+    for worker in workers:
+        if worker.poll() is None:
+            worker.terminate()  # first signal drains
+    deadline = time.monotonic() + timeout
+    for worker in workers:
+        try:
+            worker.wait(max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+# ============================================================
+# Load
+# ============================================================
+async def enqueue(args, connection: Dict, stages: List[str], run_id: str) -> List[str]:
+    """Add `args.jobs` jobs with exponential inter-arrival times (Poisson arrivals at `args.rate`)"""
+    rng = np.random.default_rng(args.seed)
+    weights = stage_weights(len(stages), args.skew)
+    selfies = [make_selfie_base64(seed=seed) for seed in range(args.selfies)]
+    queue = Queue(QUEUE_NAME, {'connection': connection})
+
+    job_ids = []
+    next_at = time.monotonic()
+    try:
+        for index in range(args.jobs):
+            picked = [stages[i] for i in rng.choice(len(stages), size=args.stages_per_job, replace=False, p=weights)]
+            data = {
+                'image': selfies[index % len(selfies)],
+                'uid': f'loadtest-{index}',
+                'stage': picked[0] if len(picked) == 1 else f"{len(picked)} stages",
+                'timestamp': int(time.time() * 1000),
+            }
+            if len(picked) > 1:
+                data['stages'] = picked
+            job_id = f'loadtest_{run_id}_{index}'
+            await queue.add('process-face', data, {'jobId': job_id, 'attempts': 1})
+            job_ids.append(job_id)
+
+            if args.rate > 0:
+                next_at += rng.exponential(1 / args.rate)
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+    finally:
+        await queue.close()
+    return job_ids
+
+
+def job_key(job_id: str) -> str:
+    return f'bull:{QUEUE_NAME}:{job_id}'
+
+
+def wait_for_jobs(client: redis.Redis, job_ids: List[str], timeout: float):
+    """Poll until every job finished (completed or failed) or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    pending = list(job_ids)
+    while pending and time.monotonic() < deadline:
+        pipe = client.pipeline()
+        for job_id in pending:
+            pipe.hget(job_key(job_id), 'finishedOn')
+        pending = [job_id for job_id, finished in zip(pending, pipe.execute()) if finished is None]
+        done = len(job_ids) - len(pending)
+        print(f"\r⏳ {done}/{len(job_ids)} jobs finished", end='', flush=True)
+        if pending:
+            time.sleep(0.5)
+    print()
+    return pending
+
+
+# ============================================================
+# Report
+# ============================================================
+def collect(client: redis.Redis, job_ids: List[str]) -> List[Dict]:
+    pipe = client.pipeline()
+    for job_id in job_ids:
+        pipe.hmget(job_key(job_id), 'timestamp', 'processedOn', 'finishedOn', 'failedReason', 'data')
+    rows = []
+    for job_id, (created, processed, finished, failed, data) in zip(job_ids, pipe.execute()):
+        if finished is None:
+            continue
+        rows.append({
+            'id': job_id,
+            'stage': json.loads(data)['stage'] if data else '?',
+            'failed': failed is not None,
+            'wait_ms': int(processed) - int(created) if processed else None,
+            'total_ms': int(finished) - int(created),
+            'created': int(created),
+            'finished': int(finished),
+        })
+    return rows
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(p50), 'p95': round(p95), 'p99': round(p99), 'max': max(values)}
+
+
+def summarize(rows: List[Dict], submitted: int) -> Dict:
+    completed = [row for row in rows if not row['failed']]
+    span = (max(row['finished'] for row in rows) - min(row['created'] for row in rows)) / 1000 if rows else 0
+    by_stage = defaultdict(list)
+    for row in completed:
+        by_stage[row['stage']].append(row['total_ms'])
+    return {
+        'submitted': submitted,
+        'completed': len(completed),
+        'failed': len(rows) - len(completed),
+        'unfinished': submitted - len(rows),
+        'seconds': round(span, 1),
+        'jobs_per_sec': round(len(completed) / span, 2) if span else None,
+        'queue_wait_ms': percentiles([row['wait_ms'] for row in completed if row['wait_ms'] is not None]),
+        'completion_ms': percentiles([row['total_ms'] for row in completed]),
+        'stages': {stage: {'jobs': len(values), **percentiles(values)} for stage, values in sorted(by_stage.items())},
+    }
+
+
+def print_report(summary: Dict):
+    print("\n" + "=" * 60)
+    print("📊 Load Test Results")
+    print("=" * 60)
+    print(f"Jobs: {summary['completed']} completed, {summary['failed']} failed, "
+          f"{summary['unfinished']} unfinished of {summary['submitted']}")
+    print(f"Throughput: {summary['jobs_per_sec']} jobs/s over {summary['seconds']}s")
+    print(f"\n{'':<18} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'max':>8}")
+    print("-" * 60)
+    for label, key in (('Queue wait (ms)', 'queue_wait_ms'), ('Completion (ms)', 'completion_ms')):
+        stats = summary[key]
+        print(f"{label:<18} | " + ' | '.join(f"{str(stats[p]):>8}" for p in ('p50', 'p95', 'p99', 'max')))
+    print(f"\n{'Stage':<24} | {'jobs':>6} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 60)
+    for stage, stats in summary['stages'].items():
+        print(f"{stage:<24} | {stats['jobs']:>6} | {stats['p50']:>8} | {stats['p99']:>8}")
+
+
+# ============================================================
+# Main
+# ============================================================
+def main():
+    parser = argparse.ArgumentParser(description='Queue -> worker load test with the stub engine')
+    parser.add_argument('--jobs', type=int, default=500, help='Jobs to enqueue')
+    parser.add_argument('--workers', type=int, default=3, help='Worker processes')
+    parser.add_argument('--concurrency', type=int, default=1, help='BullMQ concurrency per worker')
+    parser.add_argument('--engine-threads', type=int, default=4, help='Engine threads per worker')
+    parser.add_argument('--rate', type=float, default=10.0, help='Mean arrivals per second (0 = all at once)')
+    parser.add_argument('--stages', type=int, default=8, help='Stages in the synthetic event')
+    parser.add_argument('--photos', type=int, default=500, help='Photos per stage')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of stage popularity (0 = uniform)')
+    parser.add_argument('--stages-per-job', type=int, default=1, help='Stages searched by each job')
+    parser.add_argument('--selfies', type=int, default=50, help='Distinct selfies (fewer = more result-cache hits)')
+    parser.add_argument('--encode-delay', type=float, default=0.002,
+                        help='Simulated model seconds per uncached gallery photo')
+    parser.add_argument('--shared-cache', action='store_true', help='Share gallery embeddings between workers')
+    parser.add_argument('--redis-url', help='Use this Redis instead of starting one (never production)')
+    parser.add_argument('--timeout', type=float, default=600, help='Seconds to wait for jobs after enqueueing')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for arrivals and stage picks')
+    parser.add_argument('--json', help='Also write the summary to this file')
+    args = parser.parse_args()
+    args.stages_per_job = min(args.stages_per_job, args.stages)
+    # Run the cleanup below (stop workers and Redis) when killed too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+
+    stop_redis = None
+    if args.redis_url:
+        url = urlparse(args.redis_url)
+        host, port, password = url.hostname or 'localhost', url.port or 6379, url.password or ''
+    else:
+        host, port, stop_redis = start_redis()
+        password = ''
+    client = redis.Redis(host=host, port=port, password=password or None, decode_responses=True)
+    connection = {'host': host, 'port': port, 'password': password or None}
+
+    work_dir = tempfile.mkdtemp(prefix='face-search-loadtest-')
+    workers: List[subprocess.Popen] = []
+    clean = False
+    try:
+        wait_for_redis(client)
+        stages = make_event(os.path.join(work_dir, 'photos'), args.stages, args.photos)
+        print(f"📂 {args.stages} stages x {args.photos} photos in {work_dir}")
+
+        start_workers(args, client, host, port, password, os.path.join(work_dir, 'photos'), work_dir, workers)
+        print(f"👷 {args.workers} workers online")
+
+        run_id = str(int(time.time()))
+        print(f"📨 Enqueueing {args.jobs} jobs" + (f" at ~{args.rate}/s" if args.rate > 0 else ""))
+        job_ids = asyncio.run(enqueue(args, connection, stages, run_id))
+        wait_for_jobs(client, job_ids, args.timeout)
+
+        summary = summarize(collect(client, job_ids), len(job_ids))
+        print_report(summary)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(summary, f, indent=2)
+            print(f"\n💾 Summary written to {args.json}")
+        clean = summary['failed'] == 0 and summary['unfinished'] == 0
+    finally:
+        stop_workers(workers)
+        if stop_redis is not None:
+            stop_redis()
+        if clean:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"\n📝 Worker logs kept in {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,19 +5,20 @@
 import psutil
 import platform
 import time
+import threading
 from typing import Dict, Optional
 import logging
 
-# Try to import NVML (py3nvml). If it's not present, we'll fall back gracefully.
-_NVML_IMPORTED = False
-try:
-    import py3nvml.py3nvml as nvml  # type: ignore
-    _NVML_IMPORTED = True
-except Exception:
-    nvml = None  # type: ignore
+# NVML (py3nvml) is imported and initialized on the first GPU sample, so
+# constructing the collector costs nothing at startup. Stays None if unavailable.
+nvml = None  # type: ignore
 
 logging.getLogger().setLevel(logging.INFO)
 
+# Host properties never change while the worker runs
+_HOSTNAME = platform.node()
+_PLATFORM = platform.system()
+
 
 class MetricsCollector:
     """Collects system metrics (CPU, RAM, GPU)"""
@@ -27,23 +28,58 @@ class MetricsCollector:
         self.has_gpu = False
         self.gpu_handle = None  # type: Optional[object]
 
-        # If NVML is importable, try to initialize it and acquire a handle.
-        if _NVML_IMPORTED:
+        # Static GPU properties, queried once per NVML handle
+        self.gpu_name = None  # type: Optional[str]
+        self.gpu_memory_total_mb = None  # type: Optional[float]
+
+        # NVML is probed lazily by the first get_gpu_metrics() call (heartbeat thread)
+        self._gpu_probed = False
+        self._gpu_lock = threading.Lock()
+
+        # Prime psutil's counters so later non-blocking calls measure since the previous call
+        psutil.cpu_percent(interval=None)
+
+    def _ensure_gpu(self):
+        """Import and initialize NVML once, on first use"""
+        global nvml
+        if self._gpu_probed:
+            return
+        with self._gpu_lock:
+            if self._gpu_probed:
+                return
+            self._gpu_probed = True
+
+            # Try to import NVML (py3nvml). If it's not present, we'll fall back gracefully.
+            try:
+                import py3nvml.py3nvml as py3nvml  # type: ignore
+                nvml = py3nvml
+            except Exception:
+                logging.info("py3nvml not available - GPU metrics disabled.")
+                return
+
             try:
-                nvml.nvmlInit()
-                self.gpu_handle = nvml.nvmlDeviceGetHandleByIndex(gpu_index)
-                self.has_gpu = True
+                self._init_gpu()
                 logging.info("NVML initialized - GPU metrics enabled.")
             except Exception as e:
                 # NVML present but failed (no driver, missing DLL, no GPU, etc.)
                 self.has_gpu = False
                 logging.warning(f"NVML import succeeded but initialization failed: {e}")
-        else:
-            logging.info("py3nvml not available - GPU metrics disabled.")
+
+    def _init_gpu(self):
+        """Initialize NVML, acquire the device handle and cache static properties"""
+        nvml.nvmlInit()
+        self.gpu_handle = nvml.nvmlDeviceGetHandleByIndex(self.gpu_index)
+
+        gpu_name = nvml.nvmlDeviceGetName(self.gpu_handle)
+        if isinstance(gpu_name, bytes):
+            gpu_name = gpu_name.decode("utf-8")
+        self.gpu_name = gpu_name
+        self.gpu_memory_total_mb = nvml.nvmlDeviceGetMemoryInfo(self.gpu_handle).total / (1024 ** 2)
+        self.has_gpu = True
 
     def get_cpu_usage(self) -> float:
-        """Get CPU usage percentage"""
-        return psutil.cpu_percent(interval=0.1)
+        """Get CPU usage percentage since the previous call (non-blocking)"""
+        return psutil.cpu_percent(interval=None)
 
     def get_ram_usage(self) -> Dict[str, float]:
         """Get RAM usage details"""
@@ -55,12 +91,28 @@ class MetricsCollector:
             "total_gb": mem.total / (1024 ** 3),
         }
 
+    def _read_gpu(self) -> Dict:
+        """Query the dynamic GPU counters (utilization, temperature, memory)"""
+        util = nvml.nvmlDeviceGetUtilizationRates(self.gpu_handle)
+        temp = nvml.nvmlDeviceGetTemperature(self.gpu_handle, nvml.NVML_TEMPERATURE_GPU)
+        mem_info = nvml.nvmlDeviceGetMemoryInfo(self.gpu_handle)
+
+        return {
+            "name": self.gpu_name,
+            "utilization": util.gpu if util is not None else None,
+            "temperature": temp,
+            "memory_used_mb": mem_info.used / (1024 ** 2),
+            "memory_free_mb": mem_info.free / (1024 ** 2),
+            "memory_total_mb": self.gpu_memory_total_mb,
+        }
+
     def get_gpu_metrics(self) -> Dict:
         """Get GPU metrics (utilization, temp, memory)
 
         Returns a dict of None values if GPU / NVML not available.
         """
-        if not self.has_gpu or not _NVML_IMPORTED:
+        self._ensure_gpu()
+        if not self.has_gpu or nvml is None:
             return {
                 "name": None,
                 "utilization": None,
@@ -71,32 +123,7 @@ class MetricsCollector:
             }
 
         try:
-            # Utilization
-            util = nvml.nvmlDeviceGetUtilizationRates(self.gpu_handle)
-            gpu_utilization = util.gpu if util is not None else None
-
-            # Temperature
-            temp = nvml.nvmlDeviceGetTemperature(self.gpu_handle, nvml.NVML_TEMPERATURE_GPU)
-
-            # Memory
-            mem_info = nvml.nvmlDeviceGetMemoryInfo(self.gpu_handle)
-            memory_used_mb = mem_info.used / (1024 ** 2)
-            memory_free_mb = mem_info.free / (1024 ** 2)
-            memory_total_mb = mem_info.total / (1024 ** 2)
-
-            # Name
-            gpu_name = nvml.nvmlDeviceGetName(self.gpu_handle)
-            if isinstance(gpu_name, bytes):
-                gpu_name = gpu_name.decode("utf-8")
-
-            return {
-                "name": gpu_name,
-                "utilization": gpu_utilization,
-                "temperature": temp,
-                "memory_used_mb": memory_used_mb,
-                "memory_free_mb": memory_free_mb,
-                "memory_total_mb": memory_total_mb,
-            }
+            return self._read_gpu()
 
         except Exception as e:
             logging.warning(f"Failed to get GPU metrics (will retry init once): {e}")
@@ -108,30 +135,10 @@ class MetricsCollector:
                 except Exception:
                     pass
 
-                nvml.nvmlInit()
-                self.gpu_handle = nvml.nvmlDeviceGetHandleByIndex(self.gpu_index)
+                self._init_gpu()
 
                 # Try to collect once more
-                util = nvml.nvmlDeviceGetUtilizationRates(self.gpu_handle)
-                gpu_utilization = util.gpu if util is not None else None
-                temp = nvml.nvmlDeviceGetTemperature(self.gpu_handle, nvml.NVML_TEMPERATURE_GPU)
-                mem_info = nvml.nvmlDeviceGetMemoryInfo(self.gpu_handle)
-                memory_used_mb = mem_info.used / (1024 ** 2)
-                memory_free_mb = mem_info.free / (1024 ** 2)
-                memory_total_mb = mem_info.total / (1024 ** 2)
-
-                gpu_name = nvml.nvmlDeviceGetName(self.gpu_handle)
-                if isinstance(gpu_name, bytes):
-                    gpu_name = gpu_name.decode("utf-8")
-
-                return {
-                    "name": gpu_name,
-                    "utilization": gpu_utilization,
-                    "temperature": temp,
-                    "memory_used_mb": memory_used_mb,
-                    "memory_free_mb": memory_free_mb,
-                    "memory_total_mb": memory_total_mb,
-                }
+                return self._read_gpu()
             except Exception as e2:
                 logging.error(f"Retried and failed to get GPU metrics: {e2}")
                 # mark GPU as unavailable going forward
@@ -151,14 +158,14 @@ class MetricsCollector:
             "cpu_percent": self.get_cpu_usage(),
             "ram": self.get_ram_usage(),
             "gpu": self.get_gpu_metrics(),
-            "hostname": platform.node(),
-            "platform": platform.system(),
+            "hostname": _HOSTNAME,
+            "platform": _PLATFORM,
             "timestamp": time.time(),
         }
 
     def cleanup(self):
         """Cleanup NVML if initialized"""
-        if _NVML_IMPORTED and self.has_gpu:
+        if nvml is not None and self.has_gpu:
             try:
                 nvml.nvmlShutdown()
             except Exception:
@@ -168,6 +175,7 @@ class MetricsCollector:
 if __name__ == "__main__":
     # Test metrics collection
     collector = MetricsCollector()
+    time.sleep(0.5)  # let the non-blocking CPU sample cover a real interval
     metrics = collector.get_all_metrics()
 
     print("=" * 50)
@@ -14,6 +14,7 @@ from dotenv import load_dotenv
 
 # Add project root to path
 sys.path.append(os.path.dirname(__file__))
+from core.image_input import ImageInput
 
 print("=" * 60)
 print("Face Search Worker - Test Suite")
@@ -73,8 +74,8 @@ def load_image_base64(image_path: str) -> str:
         img.save(buffer, format='JPEG')
         return base64.b64encode(buffer.getvalue()).decode('utf-8')
     
-def convert_gallery_to_base64(gallery_images: list) -> list:
-    """Convert gallery images to base64 format expected by engine (FAST)"""
+def load_gallery_for_engine(gallery_images: list) -> list:
+    """Read gallery images into the in-memory format expected by engine (FAST)"""
     gallery_for_engine = []
     valid_extensions = ('.png', '.jpg', '.jpeg')
     for img_data in gallery_images:
@@ -83,7 +84,7 @@ def convert_gallery_to_base64(gallery_images: list) -> list:
                 img_bytes = f.read()
             gallery_for_engine.append({
                 'id': img_data['id'],
-                'image': base64.b64encode(img_bytes).decode('utf-8')
+                'image': ImageInput(img_bytes)
             })
         except Exception as e:
             print(f"⚠️  Skipping {img_data['image_path']}: {e}")
@@ -223,7 +224,7 @@ def test_face_recognition_engine():
         # Prepare data
         gallery_images = prepare_gallery_images(stage)
         selfie_base64 = load_image_base64(TEST_SELFIE)
-        gallery_for_engine = convert_gallery_to_base64(gallery_images)
+        gallery_for_engine = load_gallery_for_engine(gallery_images)
         exclude_images = [os.path.join(EXCLUDE_IMAGES_DIR, f) for f in os.listdir(EXCLUDE_IMAGES_DIR) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
         
         # Initialize engine
@@ -236,7 +237,7 @@ def test_face_recognition_engine():
         start_time = time.time()
         logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(message)s', datefmt='%H:%M:%S')
         results = engine.search_faces(
-            selfie_base64=selfie_base64,
+            selfie=selfie_base64,
             gallery_images=gallery_for_engine,
             exclude_images=exclude_images
         )
@@ -273,13 +274,13 @@ def test_deepface_engine():
         # Prepare data
         gallery_images = prepare_gallery_images(stage)
         selfie_base64 = load_image_base64(TEST_SELFIE)
-        gallery_for_engine = convert_gallery_to_base64(gallery_images)
+        gallery_for_engine = load_gallery_for_engine(gallery_images)
         exclude_images = [os.path.join(EXCLUDE_IMAGES_DIR, f) for f in os.listdir(EXCLUDE_IMAGES_DIR) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
         
         # Initialize engine (suppress stderr warnings)
         with contextlib.redirect_stderr(open(os.devnull, 'w')):
             from engines.deepface.engine import DeepFaceEngine
-        engine = DeepFaceEngine(use_gpu=True)
+            engine = DeepFaceEngine(use_gpu=True)
         print(f"✓ Engine initialized: {engine.name}")
         
         # Perform search
@@ -287,7 +288,7 @@ def test_deepface_engine():
         start_time = time.time()
         logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(message)s', datefmt='%H:%M:%S')
         results = engine.search_faces(
-            selfie_base64=selfie_base64,
+            selfie=selfie_base64,
             gallery_images=gallery_for_engine,
             exclude_images=exclude_images
         )
@@ -309,6 +310,250 @@ def test_deepface_engine():
         raise RuntimeError("DeepFace engine test skipped due to incorrect environment.")
 
 
+# ============================================================
+# Test 5: Stub Engine (Synthetic Embeddings)
+# ============================================================
+def test_stub_engine():
+    print("\n🧪 Test 5: Stub Engine (Synthetic Embeddings)")
+    print("-" * 60)
+    
+    from engines.stub.engine import StubEngine
+    from benchmark import make_selfie_base64, make_gallery
+    
+    engine = StubEngine(max_workers=4)
+    selfie_base64 = make_selfie_base64()
+    gallery_for_engine = make_gallery(1200)
+    print(f"✓ Engine initialized: {engine.name}")
+    
+    start_time = time.time()
+    results = engine.search_faces(selfie=selfie_base64, gallery_images=gallery_for_engine)
+    cached_results = engine.search_faces(selfie=selfie_base64, gallery_images=gallery_for_engine)
+    
+    assert len(results) == len(gallery_for_engine), "Not every gallery image was scored!"
+    assert results == sorted(results, key=lambda r: r['similarity'], reverse=True), "Results not sorted!"
+    assert {r['id']: r['similarity'] for r in results} == {r['id']: r['similarity'] for r in cached_results}, \
+        "Cached run returned different results!"
+    assert engine.cache_stats['selfie_encodings']['hits'] == 1, "Selfie was re-encoded for a repeated search!"
+    assert engine.cache_stats['results']['hits'] == 1, "Repeated search was not served from the result cache!"
+    
+    # A photo replaced under the same name must not be answered from the result cache
+    import shutil
+    import tempfile
+    from core.job_processor import scan_gallery
+    photos_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(photos_dir, 'Stage A'))
+        for index in range(20):
+            with open(os.path.join(photos_dir, 'Stage A', f'photo_{index}.jpg'), 'wb') as f:
+                f.write(b'original')
+        scan = lambda: scan_gallery(['Stage A'], photos_dir, logging.getLogger(__name__))['Stage A']
+        engine.search_faces(selfie=selfie_base64, gallery_images=scan())
+        engine.search_faces(selfie=selfie_base64, gallery_images=scan())
+        hits = engine.cache_stats['results']['hits']
+        assert hits == 2, "Unchanged photos were not answered from the result cache!"
+        with open(os.path.join(photos_dir, 'Stage A', 'photo_3.jpg'), 'wb') as f:
+            f.write(b'replaced by a retake')
+        engine.search_faces(selfie=selfie_base64, gallery_images=scan())
+        assert engine.cache_stats['results']['hits'] == hits, "Replaced photo was answered from the result cache!"
+    finally:
+        shutil.rmtree(photos_dir, ignore_errors=True)
+    
+    show_top_results(results, time.time() - start_time, top_n=5)
+    print("\n✅ Stub engine test passed!")
+
+
+# ============================================================
+# Test 6: Shared Embedding Cache (fakeredis stand-in)
+# ============================================================
+def test_shared_cache():
+    print("\n🧪 Test 6: Shared Embedding Cache")
+    print("-" * 60)
+    
+    try:
+        import fakeredis
+    except ImportError:
+        print("⚠️  Skipping test - fakeredis is not installed (pip install fakeredis)")
+        return
+    
+    from engines.stub.engine import StubEngine
+    from core.shared_cache import SharedEmbeddingCache
+    from benchmark import make_selfie_base64, make_gallery
+    
+    server = fakeredis.FakeServer()
+    selfie_base64 = make_selfie_base64()
+    gallery_for_engine = make_gallery(600)
+    
+    # Two "hosts" with separate local caches sharing one Redis
+    first, second = StubEngine(max_workers=4), StubEngine(max_workers=4)
+    for engine in (first, second):
+        engine.shared_cache = SharedEmbeddingCache(
+            fakeredis.FakeRedis(server=server), engine.cache_namespace(), ttl=60
+        )
+    
+    first_results = first.search_faces(selfie=selfie_base64, gallery_images=gallery_for_engine)
+    second_results = second.search_faces(selfie=selfie_base64, gallery_images=gallery_for_engine)
+    
+    shared_stats = second.cache_stats['shared_gallery_encodings']
+    print(f"✓ Second worker shared-tier hits: {shared_stats['hits']}/{len(gallery_for_engine)}")
+    assert shared_stats['hits'] == len(gallery_for_engine), "Second worker re-encoded shared photos!"
+    assert {r['id']: r['similarity'] for r in first_results} == {r['id']: r['similarity'] for r in second_results}, \
+        "Shared embeddings produced different results!"
+    
+    # Different model parameters must never read another version's entries
+    other = StubEngine(max_workers=4, embedding_dim=64)
+    other.shared_cache = SharedEmbeddingCache(fakeredis.FakeRedis(server=server), other.cache_namespace(), ttl=60)
+    other.search_faces(selfie=selfie_base64, gallery_images=gallery_for_engine)
+    assert other.cache_namespace() != first.cache_namespace(), "Namespaces ignore model parameters!"
+    assert other.cache_stats['shared_gallery_encodings']['hits'] == 0, "Mixed embeddings across versions!"
+    print(f"✓ Versions isolated: {first.cache_namespace()} / {other.cache_namespace()}")
+
+    # A failed lookup must not stop a chunk's new encodings from being published and journaled
+    class FailingLookupRedis(fakeredis.FakeRedis):
+        def mget(self, *args, **kwargs):
+            raise ConnectionError("shared tier unavailable")
+
+    class RecordingCheckpoint:
+        def __init__(self):
+            self.journaled = {}
+
+        def record(self, entries):
+            self.journaled.update(entries)
+
+    isolated_server = fakeredis.FakeServer()
+    offline = StubEngine(max_workers=4)
+    offline.shared_cache = SharedEmbeddingCache(
+        FailingLookupRedis(server=isolated_server), offline.cache_namespace(), ttl=60
+    )
+    offline.checkpoint = RecordingCheckpoint()
+    offline.search_faces(selfie=selfie_base64, gallery_images=gallery_for_engine)
+    published = len(fakeredis.FakeRedis(server=isolated_server).keys('*'))
+    print(f"✓ Lookup failure: {len(offline.checkpoint.journaled)} journaled, {published} keys published")
+    assert len(offline.checkpoint.journaled) == len(gallery_for_engine), "Chunk was not journaled after a failed lookup!"
+    assert published >= len(gallery_for_engine), "Chunk was not published after a failed lookup!"
+
+    print("\n✅ Shared cache test passed!")
+
+
+# ============================================================
+# Test 7: Search History (fakeredis stand-in)
+# ============================================================
+def test_search_history():
+    print("\n🧪 Test 7: Search History")
+    print("-" * 60)
+    
+    try:
+        import fakeredis
+    except ImportError:
+        print("⚠️  Skipping test - fakeredis is not installed (pip install fakeredis)")
+        return
+    
+    from engines.stub.engine import StubEngine
+    from core.search_history import SearchHistory
+    from benchmark import make_selfie_base64, make_gallery
+    
+    history = SearchHistory(fakeredis.FakeRedis(), ttl=60)
+    selfie = ImageInput.from_base64(make_selfie_base64())
+    gallery_for_engine = make_gallery(1200)
+    
+    # File fingerprints (mtime_ns, size) of the synthetic photos, as scan_gallery attaches them
+    for index, item in enumerate(gallery_for_engine):
+        item['fingerprint'] = (1, 1000 + index)
+    fingerprints = {item['id']: item['fingerprint'] for item in gallery_for_engine}
+    
+    # First search before the last 200 photos were uploaded
+    first = StubEngine(max_workers=4)
+    context = SearchHistory.context(first.cache_namespace(), selfie.digest, first.exclude.version)
+    history.save('job_1', first.search(selfie, gallery_for_engine[:1000]), context, fingerprints)
+    
+    # Repeat on a worker with a cold cache: only the new photos are encoded
+    second = StubEngine(max_workers=4)
+    previous = history.load('job_1', context, fingerprints)
+    diffed = second.search(selfie, gallery_for_engine, previous=previous).to_list()
+    encoded = second.cache_stats['gallery_encodings']['misses']
+    print(f"✓ Repeat search encoded {encoded}/{len(gallery_for_engine)} photos")
+    assert encoded == 200, "Photos scored by the previous job were encoded again!"
+    
+    full = StubEngine(max_workers=4).search_faces(selfie=selfie, gallery_images=gallery_for_engine)
+    assert diffed == full, "Merged results differ from a full search!"
+    
+    # A photo replaced under the same name is encoded again, even on the warm worker
+    replaced_gallery = [dict(item) for item in gallery_for_engine]
+    replaced_gallery[1100]['fingerprint'] = (2, 2100)  # one of the photos this worker encoded
+    changed = history.load('job_1', context, {item['id']: item['fingerprint'] for item in replaced_gallery})
+    encoded_before = second.cache_stats['gallery_encodings']['misses']
+    second.search(selfie, replaced_gallery, previous=changed)
+    encoded = second.cache_stats['gallery_encodings']['misses'] - encoded_before
+    print(f"✓ After replacing one photo, repeat search on the same worker encoded {encoded} photo(s)")
+    assert encoded == 1, "Replaced photo kept its old embedding!"
+    
+    other_context = SearchHistory.context(first.cache_namespace(), selfie.digest, 'another-exclude-set')
+    assert history.load('job_1', other_context, fingerprints) is None, "Reused results computed with another exclude set!"
+    assert history.load('job_missing', context, fingerprints) is None, "Loaded results of an unknown job!"
+    
+    print("\n✅ Search history test passed!")
+
+
+# ============================================================
+# Test 8: Exclude Set Hot Reload
+# ============================================================
+def test_exclude_reload():
+    print("\n🧪 Test 8: Exclude Set Hot Reload")
+    print("-" * 60)
+    
+    import shutil
+    import tempfile
+    import numpy as np
+    from engines.stub.engine import StubEngine
+    from core.exclude_set import ExcludeSet
+    from benchmark import make_selfie_base64, make_gallery
+    
+    exclude_dir = tempfile.mkdtemp()
+    try:
+        def add_exclude_face(name, seed):
+            pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(os.path.join(exclude_dir, name))
+        
+        selfie = ImageInput.from_base64(make_selfie_base64())
+        gallery_for_engine = make_gallery(600)
+        engine = StubEngine(max_workers=4)
+        # A generous threshold so the synthetic faces actually get excluded
+        engine.EXCLUDE_THRESHOLD = 0.85
+        exclude_set = ExcludeSet(engine, exclude_dir)
+        
+        add_exclude_face('guest_1.png', 1)
+        assert exclude_set.refresh(), "Initial exclude set was not loaded!"
+        assert not exclude_set.refresh(), "Unchanged directory produced a new version!"
+        engine.search(selfie, gallery_for_engine)
+        first_version = engine.exclude.version
+        
+        # Added mid-event: masks are carried over and only the new face is tested
+        add_exclude_face('guest_2.png', 2)
+        assert exclude_set.refresh() and engine.exclude.version != first_version, "New exclude face not picked up!"
+        print(f"✓ Version {first_version} -> {engine.exclude.version}, "
+              f"{len(engine.exclude.masks)} photo masks re-applied")
+        assert len(engine.exclude.masks) > 0, "Stored masks were dropped instead of re-applied!"
+        reloaded = engine.search(selfie, gallery_for_engine).to_list()
+        
+        fresh = StubEngine(max_workers=4)
+        fresh.EXCLUDE_THRESHOLD = 0.85
+        expected = fresh.search_faces(
+            selfie=selfie,
+            gallery_images=gallery_for_engine,
+            exclude_images=[os.path.join(exclude_dir, name) for name in ('guest_1.png', 'guest_2.png')]
+        )
+        assert reloaded == expected, "Re-applied masks differ from a fresh search!"
+        assert sum(r['similarity'] == 0.0 for r in reloaded) > 0, "Test threshold excluded nothing!"
+        
+        # Removed: the set shrinks and stale encodings are dropped
+        os.remove(os.path.join(exclude_dir, 'guest_2.png'))
+        assert exclude_set.refresh() and len(engine.exclude.files) == 1, "Removed exclude face still applied!"
+        assert len(engine.cache['exclude_encodings']) == 1, "Encodings of the removed face were kept!"
+    finally:
+        shutil.rmtree(exclude_dir, ignore_errors=True)
+    
+    print("\n✅ Exclude reload test passed!")
+
+
 # ============================================================
 # Run All Tests
 # ============================================================
@@ -318,6 +563,10 @@ def run_all_tests():
         ("Worker ID Generation", test_worker_id_generation),
         ("face_recognition Engine", test_face_recognition_engine),
         ("DeepFace Engine", test_deepface_engine),
+        ("Stub Engine", test_stub_engine),
+        ("Shared Embedding Cache", test_shared_cache),
+        ("Search History", test_search_history),
+        ("Exclude Set Hot Reload", test_exclude_reload),
     ]
     
     passed = 0
@@ -6,23 +6,44 @@ GPU-powered face recognition worker for BullMQ queue processing
 
 import os
 import sys
+import time
 import asyncio
 import logging
 import argparse
+import importlib
+import threading
+from typing import Optional
 from dotenv import load_dotenv
-from bullmq import Worker
 
 # Add project root to path
 sys.path.append(os.path.dirname(__file__))
 
-from core.worker_manager import WorkerManager
-from core.job_processor import process_job
-from metrics import MetricsCollector
-
 # Load environment variables
 load_dotenv()
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
+# Core set and thread counts - exported before numpy / OpenCV / TF load their thread pools
+from core.thread_budget import ThreadBudget
+THREAD_BUDGET = ThreadBudget.from_env()
+THREAD_BUDGET.apply()
+
+from core.worker_manager import WorkerManager
+from core.job_processor import process_job, defer_to_warm_worker
+from core.profiler import JobProfiler
+from core.affinity import StageAffinity
+from core.pause import PauseControl, PausableWorker
+from core.cache_snapshot import CacheSnapshot
+from core.result_cache import ResultCache
+from core.stage_costs import StageCostModel
+from core.search_history import SearchHistory
+from core.exclude_set import ExcludeSet
+from core.warmup import warm_up, most_requested_stages
+from metrics import MetricsCollector
+
+# Optional components (metrics server, shared cache, autoscaler) and the engine
+# itself are imported only when used
+IMPORTED_AT = time.time()
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -38,8 +59,43 @@ REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
 GPU_INDEX = int(os.getenv('GPU_INDEX', 0))
 WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', 1))
 USE_CPU = os.getenv('USE_CPU', '0') == '1'
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # 0 disables the /metrics endpoint
+METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # fraction of jobs to profile
+PROFILE_REDIS_TTL = int(os.getenv('PROFILE_REDIS_TTL', 0))  # seconds, 0 keeps reports on disk only
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+AFFINITY_ENABLED = os.getenv('AFFINITY_ENABLED', '0') == '1'  # prefer workers with a warm stage cache
+AFFINITY_TIMEOUT_MS = int(os.getenv('AFFINITY_TIMEOUT_MS', 10000))  # job age after which any worker takes it
+AFFINITY_DEFER_MS = int(os.getenv('AFFINITY_DEFER_MS', 1000))
+SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', '0') == '1'  # share gallery embeddings via Redis
+SHARED_CACHE_TTL = int(os.getenv('SHARED_CACHE_TTL', 7 * 24 * 3600))  # seconds
+SELFIE_CACHE_SIZE = int(os.getenv('SELFIE_CACHE_SIZE', 256))  # selfie embeddings kept per worker
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', 300))  # seconds, 0 disables repeated-search results
+SEARCH_HISTORY_TTL = int(os.getenv('SEARCH_HISTORY_TTL', 0))  # seconds job results stay reusable by previousJobId, 0 disables
+AUTOSCALE_ENABLED = os.getenv('AUTOSCALE_ENABLED', '0') == '1'  # tune threads/concurrency at runtime
+AUTOSCALE_MIN_THREADS = int(os.getenv('AUTOSCALE_MIN_THREADS', 2))
+AUTOSCALE_MAX_THREADS = int(os.getenv('AUTOSCALE_MAX_THREADS', len(THREAD_BUDGET.cores) * 2))
+AUTOSCALE_MAX_CONCURRENCY = int(os.getenv('AUTOSCALE_MAX_CONCURRENCY', WORKER_CONCURRENCY))
+STAGE_COSTS_ENABLED = os.getenv('STAGE_COSTS_ENABLED', '1') == '1'  # publish per-stage cost estimates
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', '1') == '1'  # dummy inference + preload before taking jobs
+WARMUP_STAGES = [stage.strip() for stage in os.getenv('WARMUP_STAGES', '').split(',') if stage.strip()]
+WARMUP_TOP_STAGES = int(os.getenv('WARMUP_TOP_STAGES', 0))  # also preload the N most-requested stages
+PREFETCH_THREADS = int(os.getenv('PREFETCH_THREADS', 4))  # concurrent gallery file reads ahead of encoding, 0 disables
+PREFETCH_BUFFER_MB = int(os.getenv('PREFETCH_BUFFER_MB', 256))  # read-ahead bytes held in memory
+DRAIN_TIMEOUT = float(os.getenv('DRAIN_TIMEOUT', 60))  # seconds active jobs get to finish on shutdown
+SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', '1') == '1'  # keep encodings across restarts
+CACHE_DIR = os.getenv('CACHE_DIR') or os.path.join(os.path.dirname(__file__), 'cache')
 EXCLUDE_FACES_DIR = os.path.join(os.path.dirname(__file__), 'exclude_faces')
-CONVOCATION_PHOTOS_DIR = "Z:/Downloads/Jain 15th Convocation"
+EXCLUDE_POLL_SECONDS = float(os.getenv('EXCLUDE_POLL_SECONDS', 10))  # exclude_faces/ change checks, 0 disables hot reload
+CONVOCATION_PHOTOS_DIR = os.getenv('CONVOCATION_PHOTOS_DIR') or "Z:/Downloads/Jain 15th Convocation"
+STUB_ENCODE_DELAY = float(os.getenv('STUB_ENCODE_DELAY', 0))  # simulated seconds per gallery encode (--engine stub)
+
+# Engine name -> (module, class)
+ENGINE_MODULES = {
+    'deepface': ('engines.deepface.engine', 'DeepFaceEngine'),
+    'face_recognition': ('engines.face_recognition.engine', 'FaceRecognitionEngine'),
+    'stub': ('engines.stub.engine', 'StubEngine'),  # synthetic embeddings for load tests
+}
 
 
 def select_engine():
@@ -66,19 +122,35 @@ def select_engine():
             sys.exit(0)
 
 
-def load_engine(engine_name: str, use_gpu: bool):
+def prefetch_engine(engine_name: str, use_gpu: bool) -> threading.Thread:
+    """Import the engine and its ML framework in the background while Redis is set up"""
+    def prefetch():
+        try:
+            module = importlib.import_module(ENGINE_MODULES[engine_name][0])
+            load_framework = getattr(module, 'load_framework', None)
+            if load_framework is not None:
+                load_framework(use_gpu)
+        except Exception:
+            pass  # load_engine() repeats the import and reports the error
+    
+    thread = threading.Thread(target=prefetch, name='engine-prefetch', daemon=True)
+    thread.start()
+    return thread
+
+
+def load_engine(engine_name: str, use_gpu: bool, max_workers: int, prefetch: Optional[threading.Thread] = None):
     """Dynamically load the selected engine"""
     logger.info(f"🔧 Loading {engine_name} engine...")
     
     try:
-        if engine_name == 'deepface':
-            from engines.deepface.engine import DeepFaceEngine as Engine
-        elif engine_name == 'face_recognition':
-            from engines.face_recognition.engine import FaceRecognitionEngine as Engine
-        else:
+        if engine_name not in ENGINE_MODULES:
             raise ValueError(f"Unknown engine: {engine_name}")
+        if prefetch is not None:
+            prefetch.join()
+        module_name, class_name = ENGINE_MODULES[engine_name]
+        Engine = getattr(importlib.import_module(module_name), class_name)
         
-        return Engine(use_gpu=use_gpu)
+        return Engine(use_gpu=use_gpu, max_workers=max_workers)
     except ImportError as e:
         logger.error(f"\n❌ Failed to import {engine_name} engine!")
         logger.error(f"Error: {e}")
@@ -91,7 +163,7 @@ def load_engine(engine_name: str, use_gpu: bool):
 async def main():
     """Main worker function"""
     parser = argparse.ArgumentParser(description='Face Search Worker')
-    parser.add_argument('--engine', choices=['deepface', 'face_recognition'], 
+    parser.add_argument('--engine', choices=list(ENGINE_MODULES), 
                        help='Engine to use (skip interactive selection)')
     args = parser.parse_args()
     
@@ -104,6 +176,9 @@ async def main():
     
     print()  # Blank line for spacing
     
+    # Engine/framework imports take seconds - overlap them with the Redis setup below
+    engine_prefetch = prefetch_engine(engine_name, use_gpu=not USE_CPU)
+    
     manager = None
     try:
         # Initialize metrics collector
@@ -123,22 +198,125 @@ async def main():
             metrics_collector=metrics_collector,
             logger=logger
         )
+        manager.startup_timings['imports'] = round(IMPORTED_AT - manager.process_start, 2)
+        manager.thread_budget = THREAD_BUDGET.describe()
         
         # Setup signal handlers for graceful shutdown
         manager.setup_signal_handlers()
         
         # Initialize Redis and get worker ID
-        redis_client = manager.initialize_redis()
+        with manager.startup_step('redis'):
+            redis_client = manager.initialize_redis()
         
-        # Load face recognition engine
-        engine = load_engine(engine_name, use_gpu=not USE_CPU)
+        # Advertise warm stages so cold workers can leave jobs to warm ones
+        if AFFINITY_ENABLED:
+            manager.affinity = StageAffinity(
+                redis_client,
+                manager.worker_id or 'unknown',
+                timeout_ms=AFFINITY_TIMEOUT_MS,
+                defer_ms=AFFINITY_DEFER_MS
+            )
         
-        # Register worker
+        # Register as 'warming' so the dashboard shows the worker while the model loads
         manager.register_worker()
-        
-        # Start heartbeat
         manager.start_heartbeat()
         
+        # Load face recognition engine
+        with manager.startup_step('engine_load'):
+            engine = load_engine(engine_name, use_gpu=not USE_CPU, max_workers=THREAD_BUDGET.engine_threads, prefetch=engine_prefetch)
+            THREAD_BUDGET.configure_frameworks()
+        logger.info(f"🧵 Thread budget: {THREAD_BUDGET}")
+        engine.phase_metrics = manager.phase_metrics
+        engine.affinity = manager.affinity
+        engine.selfie_cache_size = SELFIE_CACHE_SIZE
+        manager.worker_stats['engine_threads'] = engine.max_workers
+        engine.result_cache = ResultCache(ttl=RESULT_CACHE_TTL) if RESULT_CACHE_TTL > 0 else None
+        engine.prefetch_threads = PREFETCH_THREADS
+        engine.prefetch_buffer_bytes = PREFETCH_BUFFER_MB * 1024 * 1024
+        if engine_name == 'stub':
+            engine.encode_delay = STUB_ENCODE_DELAY
+        
+        # Second cache tier shared by every worker host
+        if SHARED_CACHE_ENABLED:
+            from core.shared_cache import SharedEmbeddingCache
+            engine.shared_cache = SharedEmbeddingCache(
+                manager.create_binary_client(),
+                engine.cache_namespace(),
+                ttl=SHARED_CACHE_TTL
+            )
+            engine.shared_cache.register_version(engine.cache_params())
+            logger.info(f"🗄️  Shared embedding cache enabled (namespace: {engine.cache_namespace()})\n")
+        
+        # Encodings saved by the previous run; new ones are journaled after every chunk
+        snapshot = CacheSnapshot(engine, CACHE_DIR) if SNAPSHOT_ENABLED else None
+        if snapshot is not None:
+            with manager.startup_step('snapshot_load'):
+                restored = snapshot.load()
+            if restored:
+                logger.info(f"💾 Restored {restored} cached encodings from {snapshot.path()}\n")
+            engine.checkpoint = snapshot
+        
+        # Exclude faces: loaded once here, swapped for a new version when the directory changes
+        exclude_set = ExcludeSet(engine, EXCLUDE_FACES_DIR, poll_interval=EXCLUDE_POLL_SECONDS)
+        with manager.startup_step('exclude_load'):
+            exclude_set.refresh()
+        
+        # Warm up before taking jobs: dummy inference, preloaded stages
+        if WARMUP_ENABLED:
+            warmup_stages = list(dict.fromkeys(
+                WARMUP_STAGES + most_requested_stages(redis_client, WARMUP_TOP_STAGES)
+            ))
+            with manager.startup_step('warmup'):
+                warmup_seconds = warm_up(
+                    engine,
+                    stages=warmup_stages,
+                    convocation_photos_dir=CONVOCATION_PHOTOS_DIR,
+                    affinity=manager.affinity,
+                    logger=logger
+                )
+            logger.info(f"🔥 Warm-up complete in {warmup_seconds:.1f}s\n")
+        manager.set_ready()
+
+        # Pick up exclude faces added or removed mid-event without a restart
+        if EXCLUDE_POLL_SECONDS > 0:
+            exclude_set.start()
+
+        # Optional Prometheus endpoint
+        if METRICS_PORT:
+            from core.metrics_server import MetricsServer
+            MetricsServer(manager, engine, host=METRICS_HOST, port=METRICS_PORT).start()
+            logger.info(f"📈 Metrics endpoint: http://{METRICS_HOST}:{METRICS_PORT}/metrics\n")
+        
+        # Adjust engine threads / BullMQ concurrency from throughput and headroom
+        autoscaler = None
+        if AUTOSCALE_ENABLED:
+            from core.autoscaler import ConcurrencyController
+            autoscaler = ConcurrencyController(
+                engine,
+                manager,
+                min_threads=AUTOSCALE_MIN_THREADS,
+                max_threads=AUTOSCALE_MAX_THREADS,
+                max_concurrency=AUTOSCALE_MAX_CONCURRENCY
+            )
+            autoscaler.start()
+            logger.info(f"⚖️  Autoscaling threads {AUTOSCALE_MIN_THREADS}-{AUTOSCALE_MAX_THREADS}, "
+                        f"concurrency 1-{AUTOSCALE_MAX_CONCURRENCY}\n")
+        
+        # Opt-in profiling (sample rate can be overridden at runtime via Redis)
+        profiler = JobProfiler(
+            worker_id=manager.worker_id or 'unknown',
+            redis_client=redis_client,
+            sample_rate=PROFILE_SAMPLE_RATE,
+            output_dir=PROFILE_DIR,
+            redis_ttl=PROFILE_REDIS_TTL
+        )
+        
+        # Per-stage cost estimates for cost-aware job prioritization
+        stage_costs = StageCostModel(redis_client) if STAGE_COSTS_ENABLED else None
+        
+        # Stored results so a repeat search only scores photos added since
+        search_history = SearchHistory(manager.create_binary_client(), ttl=SEARCH_HISTORY_TTL) if SEARCH_HISTORY_TTL > 0 else None
+        
         # Create job processor wrapper
         async def job_processor(job, token):
             return await process_job(
@@ -148,19 +326,31 @@ async def main():
                 redis_client=redis_client,
                 worker_id=manager.worker_id or 'unknown',
                 worker_stats=manager.worker_stats,
-                exclude_faces_dir=EXCLUDE_FACES_DIR,
+                phase_metrics=manager.phase_metrics,
+                profiler=profiler,
+                affinity=manager.affinity,
+                stage_costs=stage_costs,
+                search_history=search_history,
                 convocation_photos_dir=CONVOCATION_PHOTOS_DIR,
                 logger=logger
             )
 
+        # Cold-stage jobs are handed to a warm worker before they are processed
+        async def defer_job(job, token):
+            return await defer_to_warm_worker(job, token, manager.affinity, CONVOCATION_PHOTOS_DIR, logger)
+        
         # Synchronous wrapper for the async job processor
         def job_processor_sync(job, token):
             return asyncio.get_event_loop().create_task(job_processor(job, token))
         
+        # Pause/resume arrives over pub/sub and suspends fetching
+        pause_control = PauseControl(redis_client, manager.worker_id or 'unknown')
+        pause_control.start(asyncio.get_running_loop())
+        
         # Create BullMQ worker
         logger.info("⚙️  Starting BullMQ worker...\n")
         
-        worker = Worker(
+        worker = PausableWorker(
             name='face-search',
             processor=job_processor_sync,
             opts={
@@ -169,19 +359,40 @@ async def main():
                     'port': REDIS_PORT,
                     'password': REDIS_PASSWORD if REDIS_PASSWORD else None
                 },
-                'concurrency': WORKER_CONCURRENCY,
+                'concurrency': manager.concurrency,
                 'lockDuration': 300000,  # 5 minutes
                 'maxStalledCount': 1
-            }
+            },
+            pause_control=pause_control,
+            defer=defer_job if manager.affinity else None
         )
         
+        if autoscaler is not None:
+            autoscaler.worker = worker
+        
         logger.info("✅ Worker is running! Waiting for jobs...\n")
         logger.info("Press Ctrl+C to stop\n")
         
-        # Keep worker running
-        while manager.running:
+        # Keep worker running (a shutdown signal sets manager.draining)
+        while not manager.draining:
             await asyncio.sleep(1)
         
+        # Drain: stop fetching, let active jobs finish, return the rest to the queue
+        manager.set_draining()
+        if manager.affinity:
+            manager.affinity.withdraw()
+        if autoscaler is not None:
+            autoscaler.stop()
+        exclude_set.stop()
+        returned = await worker.drain(DRAIN_TIMEOUT)
+        pause_control.stop()
+        if snapshot is not None:
+            snapshot.save()
+        if returned:
+            # Abandoned searches are still running in executor threads - do not wait for them
+            manager.cleanup()
+            os._exit(0)
+        
     except KeyboardInterrupt:
         logger.info("\n\n⚠️  Interrupted by user")
     except Exception as e: